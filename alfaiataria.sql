@@ -76,11 +76,106 @@ create table AvisosEstoque (
 );
 
 
+-- Rollups de vendas (atualizados a cada venda pela API; recalculáveis com
+-- python -m backend.relatorios reconstruir)
+create table VendasDiarias (
+  Data DATE PRIMARY KEY,
+  QtdVendas INT NOT NULL DEFAULT 0,
+  QtdItens INT NOT NULL DEFAULT 0,
+  Receita DOUBLE NOT NULL DEFAULT 0
+);
+
+create table VendasPorProduto (
+  IDProduto INT PRIMARY KEY,
+  QtdVendas INT NOT NULL DEFAULT 0,
+  Quantidade INT NOT NULL DEFAULT 0,
+  Receita DOUBLE NOT NULL DEFAULT 0,
+  INDEX ix_VendasPorProduto_Quantidade (Quantidade),
+  INDEX ix_VendasPorProduto_Receita (Receita),
+  FOREIGN KEY (IDProduto) REFERENCES Produtos(IDProduto) ON DELETE CASCADE
+);
+
+create table VendasPorAtendente (
+  IDUsuarioAtendente INT PRIMARY KEY,
+  QtdVendas INT NOT NULL DEFAULT 0,
+  Receita DOUBLE NOT NULL DEFAULT 0,
+  FOREIGN KEY (IDUsuarioAtendente) REFERENCES usuarios(IDUsuario) ON DELETE CASCADE
+);
+
+-- Replicação das vendas para o Mongo (python -m backend.replicacao): a API
+-- grava um evento por venda na mesma transação; o worker consome o outbox
+create table OutboxVendas (
+  IDEvento INT PRIMARY KEY AUTO_INCREMENT,
+  IDVenda INT NOT NULL,
+  CriadoEm TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  INDEX ix_OutboxVendas_IDVenda (IDVenda)
+);
+
+create table CheckpointsReplicacao (
+  Nome VARCHAR(60) PRIMARY KEY,
+  UltimoEvento INT NOT NULL DEFAULT 0,
+  AtualizadoEm TIMESTAMP NULL
+);
+
+-- Vendas assíncronas (backend/fila_vendas.py): chave de idempotência de
+-- cada venda registrada a partir do diário local
+create table ChavesVenda (
+  Chave VARCHAR(64) PRIMARY KEY,
+  IDVenda INT NOT NULL,
+  CriadoEm TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Snapshots do estoque de cada produto (python -m backend.movimentacoes
+-- snapshot): estoque numa data = snapshot anterior + MovimentacoesEstoque
+create table SnapshotsEstoque (
+  IDProduto INT NOT NULL,
+  DataSnapshot DATETIME NOT NULL,
+  Estoque INT NOT NULL,
+  PRIMARY KEY (IDProduto, DataSnapshot),
+  FOREIGN KEY (IDProduto) REFERENCES Produtos(IDProduto) ON DELETE CASCADE
+);
+
+-- Arquivo de vendas (python -m backend.arquivamento): as vendas de meses
+-- fechados saem de Vendas/ItensVenda para cá, uma partição por mês (criadas
+-- pelo arquivamento, dividindo pmax). Tabelas particionadas não têm FK.
+create table VendasArquivo (
+  IDVenda INT NOT NULL,
+  DataVenda DATETIME NOT NULL,
+  IDUsuarioCliente INT NOT NULL,
+  IDUsuarioAtendente INT NOT NULL,
+  Total DOUBLE NOT NULL DEFAULT 0,
+  PRIMARY KEY (IDVenda, DataVenda),
+  INDEX ix_VendasArquivo_IDUsuarioCliente (IDUsuarioCliente),
+  INDEX ix_VendasArquivo_IDUsuarioAtendente (IDUsuarioAtendente)
+)
+PARTITION BY RANGE COLUMNS (DataVenda) (
+  PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+create table ItensVendaArquivo (
+  IDItem INT NOT NULL,
+  DataVenda DATETIME NOT NULL,
+  IDVenda INT NOT NULL,
+  IDProduto INT NOT NULL,
+  Quantidade INT NOT NULL,
+  PrecoUnitario DOUBLE NOT NULL,
+  PRIMARY KEY (IDItem, DataVenda),
+  INDEX ix_ItensVendaArquivo_IDVenda (IDVenda),
+  INDEX ix_ItensVendaArquivo_IDProduto (IDProduto)
+)
+PARTITION BY RANGE COLUMNS (DataVenda) (
+  PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+
+
 create index idx_usuarios_nome      on usuarios(Nome);
 create index idx_produtos_nome      on Produtos(Nome);
 create index idx_produtos_categoria on Produtos(Categoria);
 create index idx_vendas_data        on Vendas(DataVenda);
 create index idx_itens_venda_venda  on ItensVenda(IDVenda);
+create index idx_movimentacoes_produto_data on MovimentacoesEstoque(IDProduto, DataMovimentacao);
+create index idx_movimentacoes_data on MovimentacoesEstoque(DataMovimentacao);
 
 DELIMITER //
 
@@ -91,7 +186,9 @@ DELIMITER //
 			return (
             select ifnull(SUM(Total),0)
             from Vendas
-            Where date(DataVenda) = Curdate()
+            -- intervalo em vez de date(DataVenda): usa idx_vendas_data
+            Where DataVenda >= Curdate()
+              And DataVenda <  Curdate() + INTERVAL 1 DAY
             );
         END//
 				
@@ -119,22 +216,21 @@ DELIMITER ;
 
 DELIMITER //
 
--- 1) após inserir item: baixa estoque, registra saída e atualiza total da venda
+-- 1) após inserir item: registra a saída no razão de estoque
+--    (a baixa do estoque é feita pela API antes dos itens, com
+--    "Estoque >= quantidade", para não vender além do que há; ver
+--    backend/estoque.py; o Total da venda é gravado pela API, em
+--    backend/crud.py). Mantido igual a backend/migrar.py, que o recria
+--    em bancos já existentes. As datas dos triggers são UTC
+--    (UTC_TIMESTAMP()), como as gravadas pela API; o CURRENT_TIMESTAMP
+--    do padrão das colunas seguiria o fuso da sessão.
 DROP TRIGGER IF EXISTS trg_itensvenda_after_insert//
 CREATE TRIGGER trg_itensvenda_after_insert
 AFTER INSERT ON ItensVenda
 FOR EACH ROW
 BEGIN
-  UPDATE Produtos
-  SET Estoque = Estoque - NEW.Quantidade
-  WHERE IDProduto = NEW.IDProduto;
-
-  INSERT INTO MovimentacoesEstoque (IDProduto, TipoMovimentacao, Quantidade)
-  VALUES (NEW.IDProduto, 'Saída', NEW.Quantidade);
-
-  UPDATE Vendas
-  SET Total = Total + (NEW.Quantidade * NEW.PrecoUnitario)
-  WHERE IDVenda = NEW.IDVenda;
+  INSERT INTO MovimentacoesEstoque (IDProduto, TipoMovimentacao, Quantidade, DataMovimentacao)
+  VALUES (NEW.IDProduto, 'Saída', NEW.Quantidade, UTC_TIMESTAMP());
 END//
 
 -- 2) após atualizar produto: se estoque zerar, gera aviso
@@ -144,8 +240,8 @@ AFTER UPDATE ON Produtos
 FOR EACH ROW
 BEGIN
   IF OLD.Estoque > 0 AND NEW.Estoque <= 0 THEN
-    INSERT INTO AvisosEstoque (IDProduto, Mensagem)
-    VALUES (NEW.IDProduto, CONCAT('Estoque zerado do produto ID ', NEW.IDProduto));
+    INSERT INTO AvisosEstoque (IDProduto, Mensagem, DataAviso)
+    VALUES (NEW.IDProduto, CONCAT('Estoque zerado do produto ID ', NEW.IDProduto), UTC_TIMESTAMP());
   END IF;
 END//
 
@@ -1,63 +1,105 @@
-from fastapi import FastAPI, Depends, HTTPException
+import tempfile
+import threading
+from contextlib import asynccontextmanager
+from typing import Literal, Optional
+
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from sqlalchemy.exc import IntegrityError
-from .database import Base, engine, SessionLocal
-from . import models
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import config, database, database_mongo
+from .database import SessionLocal, get_async_db, estatisticas_pool
+from . import models, crud, cache, busca, importacao, metricas, respostas, avaliacoes, movimentacoes, arquivamento, eventos
 from .schemas import ProdutoBase, UsuarioCreate, UsuarioOut
-from . import security
+from . import security, autenticacao, replicas, fila_vendas
 
 # Roteadores
-from .routers import vendas, grupos, usuarios, produtos
+from .routers import vendas, grupos, usuarios, produtos, relatorios, exportar, dashboard, precos, estoque
+from .routers import avaliacoes as rotas_avaliacoes
+from .routers import eventos as rotas_eventos
+
+# Importar este módulo não conecta em nada: os engines e o cliente do Mongo
+# são criados no primeiro uso, e as tabelas, por ``python -m backend.migrar``.
 
 
 # ---------------------------------------------------------
-# INICIAR APP
+# SUBIDA / ENCERRAMENTO
 # ---------------------------------------------------------
-app = FastAPI(title="API Loja Alfaiataria")
+# Índice de busca de produtos (ver busca.py)
+def carregar_indice_busca():
+    db = SessionLocal()
+    try:
+        busca.indice.carregar(db)
+    except Exception as e:
+        print(f"Índice de busca não carregado na subida ({e}); será carregado na primeira busca.")
+    finally:
+        db.close()
+
+
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    # Em segundo plano: a subida não espera o banco (nem trava se ele
+    # estiver fora); até o índice ficar pronto, a busca o carrega
+    threading.Thread(target=carregar_indice_busca, name="indice-busca", daemon=True).start()
+    # Vendas assíncronas: drena o diário local (inclusive o que ficou da última execução)
+    if config.VENDAS_ASSINCRONAS:
+        fila_vendas.drenador.iniciar()
+    yield
+    fila_vendas.drenador.parar()
+    fila_vendas.diario.fechar()
+    security.servico.encerrar()
+    await database.encerrar()
+    replicas.encerrar()
+    database_mongo.encerrar()
+
+
+# Rotas definidas neste módulo (as demais ficam em routers/)
+rotas = APIRouter()
+
 
 # ---------------------------------------------------------
-# CORS
+# ROTA RAIZ
 # ---------------------------------------------------------
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+@rotas.get("/")
+async def raiz():
+    return {"status": "API Loja Online", "versao": "2.0"}
+
 
-# Criar tabelas no MySQL
-Base.metadata.create_all(bind=engine)
+# ---------------------------------------------------------
+# POOL DE CONEXÕES
+# ---------------------------------------------------------
+@rotas.get("/api/status/pool")
+async def status_pool():
+    return estatisticas_pool()
 
 
 # ---------------------------------------------------------
-# DEPENDÊNCIA DO BANCO
+# RÉPLICAS DE LEITURA
 # ---------------------------------------------------------
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@rotas.get("/api/status/replicas")
+async def status_replicas():
+    return replicas.estado()
 
 
 # ---------------------------------------------------------
-# INCLUIR ROTEADORES
+# MÉTRICAS (Prometheus)
 # ---------------------------------------------------------
-app.include_router(vendas.router, prefix="/api")
-app.include_router(grupos.router)
-app.include_router(usuarios.router, prefix="/api")
-app.include_router(produtos.router, prefix="/api")
+@rotas.get("/metrics", include_in_schema=False)
+async def metricas_prometheus():
+    return Response(
+        metricas.exportar(metricas.familias_pool(estatisticas_pool())),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
 
 
 # ---------------------------------------------------------
-# ROTA RAIZ
+# SERVIÇO DE HASH DE SENHAS
 # ---------------------------------------------------------
-@app.get("/")
-def raiz():
-    return {"status": "API Loja Online", "versao": "2.0"}
+@rotas.get("/api/status/hash")
+async def status_hash():
+    return security.servico.estatisticas()
 
 
 # ---------------------------------------------------------
@@ -67,54 +109,134 @@ class LoginRequest(BaseModel):
     usuario: str   # email
     senha: str
 
-@app.post("/api/login")
-def login(request: LoginRequest, db: Session = Depends(get_db)):
+@rotas.post("/api/login")
+async def login(request: LoginRequest, db: AsyncSession = Depends(get_async_db)):
 
-    usuario = db.query(models.Usuario).filter(
-        models.Usuario.Email == request.usuario
-    ).first()
+    usuario = await db.run_sync(crud.buscar_usuario_por_email, request.usuario)
 
     if not usuario:
         raise HTTPException(status_code=401, detail="Usuário não encontrado")
 
-    if not security.verify_password(request.senha, usuario.SenhaHash):
+    if not await security.servico.verificar(request.senha, usuario.SenhaHash):
         raise HTTPException(status_code=401, detail="Senha incorreta")
 
-    return {
+    resposta = {
         "mensagem": f"Login realizado com sucesso, {usuario.Nome}!",
         "usuario": {
             "id": usuario.IDUsuario,
             "nome": usuario.Nome,
             "email": usuario.Email,
             "grupo_id": usuario.IDGrupo
-        }
+        },
+        # Enviar em Authorization: Bearer <token> (ver autenticacao.py)
+        **autenticacao.emitir(usuario.IDUsuario, usuario.grupo.NomeGrupo, usuario.IDGrupo)
     }
 
+    # Hash legado (SHA-256) ou com custo antigo: regrava com o KDF atual
+    if security.precisa_rehash(usuario.SenhaHash):
+        novo_hash = await security.servico.hash(request.senha)
+        await db.run_sync(crud.atualizar_senha_hash, usuario.IDUsuario, novo_hash)
+
+    return resposta
+
+
+@rotas.post("/api/logout")
+async def logout(sessao: autenticacao.Sessao = Depends(autenticacao.sessao_atual)):
+    autenticacao.revogacoes.revogar_token(sessao)
+    return {"mensagem": "Sessão encerrada."}
+
 
 # ---------------------------------------------------------
 # PRODUTOS - LISTAR
 # ---------------------------------------------------------
-@app.get("/api/produtos")
-def listar_produtos(db: Session = Depends(get_db)):
-    produtos = db.query(models.Produto).all()
+LIMITE_PADRAO_PRODUTOS = 100
+LIMITE_MAXIMO_PRODUTOS = 1000
+
+
+@rotas.get("/api/produtos", dependencies=[Depends(autenticacao.autenticado)])
+async def listar_produtos(
+    request: Request,
+    cursor: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=LIMITE_MAXIMO_PRODUTOS),
+    categoria: Optional[str] = None,
+    fields: Optional[str] = None,
+    com_avaliacoes: bool = Query(False, alias="avaliacoes"),
+    db: AsyncSession = Depends(replicas.get_async_db_leitura)
+):
+    campos = crud.CAMPOS_PRODUTO_PADRAO
+    if fields:
+        campos = tuple(c.strip() for c in fields.split(",") if c.strip())
+        invalidos = [c for c in campos if c not in crud.CAMPOS_PRODUTO]
+        if invalidos:
+            raise HTTPException(status_code=400, detail=f"Campos inválidos: {', '.join(invalidos)}")
+
+    async def embutir_avaliacoes(produtos):
+        # Resumos da página inteira num só find ($in); ver avaliacoes.py
+        if com_avaliacoes:
+            resumos = await avaliacoes.consultar(avaliacoes.resumos, [p["id"] for p in produtos])
+            for produto in produtos:
+                produto["avaliacoes"] = resumos[produto["id"]]
+        return produtos
+
+    async def carregar():
+        # Sem cursor/limit: lista completa, como os clientes antigos esperam
+        if cursor is None and limit is None:
+            produtos = await db.run_sync(crud.listar_produtos, limit=None, categoria=categoria, campos=campos)
+            return await embutir_avaliacoes(produtos)
+
+        tamanho = limit or LIMITE_PADRAO_PRODUTOS
+        produtos = await db.run_sync(
+            crud.listar_produtos, apos=cursor, limit=tamanho + 1, categoria=categoria, campos=campos
+        )
+        proximo = produtos[tamanho - 1]["id"] if len(produtos) > tamanho else None
+
+        return {"produtos": await embutir_avaliacoes(produtos[:tamanho]), "proximo_cursor": proximo}
+
+    tags = ("catalogo",) if categoria is None else (f"categoria:{categoria}",)
+    chave = ("app.produtos", cursor, limit, categoria, campos, com_avaliacoes)
+    entrada = await cache.catalogo.obter_async(chave, carregar, tags)
+
+    return cache.responder(request, entrada)
+
+
+# ---------------------------------------------------------
+# PRODUTOS - BUSCA POR TEXTO
+# ---------------------------------------------------------
+@rotas.get("/api/produtos/busca", dependencies=[Depends(autenticacao.autenticado)])
+async def buscar_produtos(
+    q: str = Query(..., min_length=1, max_length=100),
+    limite: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Normalmente já carregado na subida; aqui só se a carga inicial falhou
+    if not busca.indice.pronto:
+        await db.run_sync(busca.indice.carregar)
+
+    return {"consulta": q, "produtos": busca.indice.buscar(q, limite)}
 
-    return [
-        {
-            "id": p.IDProduto,
-            "nome": p.Nome,
-            "categoria": p.Categoria,
-            "preco": p.Preco,
-            "estoque": p.Estoque,
-        }
-        for p in produtos
-    ]
+
+@rotas.get("/api/status/busca")
+async def status_busca():
+    return busca.indice.estatisticas()
+
+
+# ---------------------------------------------------------
+# PRODUTOS - ESTATÍSTICAS DO CACHE
+# ---------------------------------------------------------
+@rotas.get("/api/cache/produtos")
+async def estatisticas_cache_produtos():
+    return cache.catalogo.estatisticas()
 
 
 # ---------------------------------------------------------
 # PRODUTOS - CADASTRAR
 # ---------------------------------------------------------
-@app.post("/api/produtos")
-def adicionar_produto(produto: ProdutoBase, db: Session = Depends(get_db)):
+@rotas.post("/api/produtos", dependencies=[Depends(autenticacao.equipe)])
+async def adicionar_produto(produto: ProdutoBase, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(_adicionar_produto, produto)
+
+
+def _adicionar_produto(db: Session, produto: ProdutoBase):
     try:
         novo = models.Produto(
             Nome=produto.nome,
@@ -124,8 +246,13 @@ def adicionar_produto(produto: ProdutoBase, db: Session = Depends(get_db)):
         )
 
         db.add(novo)
+        db.flush()
+        movimentacoes.registrar(db, novo.IDProduto, None, novo.Estoque)
         db.commit()
         db.refresh(novo)
+        cache.produto_criado(novo.Categoria, novo.IDProduto)
+        busca.indice.indexar(novo.IDProduto, novo.Nome, novo.Categoria, novo.Preco, novo.Descricao)
+        eventos.estoque_alterado(novo.IDProduto, novo.Nome, None, novo.Estoque)
 
         return {"message": "Produto adicionado com sucesso!", "produto": {
             "id": novo.IDProduto,
@@ -139,19 +266,70 @@ def adicionar_produto(produto: ProdutoBase, db: Session = Depends(get_db)):
         db.rollback()
         raise HTTPException(status_code=400, detail=f"Erro ao adicionar produto: {e}")
 
+# ---------------------------------------------------------
+# PRODUTOS - IMPORTAR EM LOTE (CSV / NDJSON / JSON)
+# ---------------------------------------------------------
+@rotas.post("/api/produtos/importar", dependencies=[Depends(autenticacao.gerencia)])
+async def importar_produtos(
+    request: Request,
+    formato: Optional[Literal["csv", "ndjson", "json"]] = None,
+    chave: Literal["id", "nome"] = "id",
+    dry_run: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    formato = formato or importacao.formato_por_tipo(request.headers.get("content-type", ""))
+    if formato is None:
+        raise HTTPException(
+            status_code=415,
+            detail="Envie text/csv, application/x-ndjson ou application/json (ou informe ?formato=)."
+        )
+
+    # O corpo vai para um arquivo temporário à medida que chega; a leitura
+    # e a validação são feitas dele, em blocos
+    with tempfile.SpooledTemporaryFile(max_size=importacao.MEMORIA_MAXIMA) as arquivo:
+        tamanho = 0
+        async for pedaco in request.stream():
+            tamanho += len(pedaco)
+            if tamanho > importacao.MAX_BYTES:
+                raise HTTPException(status_code=413, detail="Arquivo maior que o limite de importação.")
+            arquivo.write(pedaco)
+        arquivo.seek(0)
+
+        try:
+            return await db.run_sync(importacao.importar, arquivo, formato, chave, dry_run)
+        except importacao.ErroImportacao as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+
 # ---------------------------------------------------------
 # PRODUTOS - EXCLUIR (substitua a sua implementação por esta)
 # ---------------------------------------------------------
-@app.delete("/api/produtos/{produto_id}")
-def excluir_produto(produto_id: int, db: Session = Depends(get_db)):
+@rotas.delete("/api/produtos/{produto_id}", dependencies=[Depends(autenticacao.gerencia)])
+async def excluir_produto(produto_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(_excluir_produto, produto_id)
+
+
+def _excluir_produto(db: Session, produto_id: int):
     produto = db.query(models.Produto).filter(models.Produto.IDProduto == produto_id).first()
 
     if not produto:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
 
+    # O arquivo de vendas não tem FK: a checagem é feita aqui
+    if arquivamento.produto_arquivado(db, produto_id):
+        raise HTTPException(
+            status_code=400,
+            detail="Não é possível excluir este produto: já existe(m) venda(s) vinculada(s) a ele."
+        )
+
     try:
+        nome = produto.Nome
+        movimentacoes.apagar(db, produto_id)
         db.delete(produto)
         db.commit()
+        cache.produto_alterado(produto_id)
+        busca.indice.remover(produto_id)
+        eventos.produto_removido(produto_id, nome)
         return {"message": "Produto excluído com sucesso!"}
     except IntegrityError as ie:
         db.rollback()
@@ -170,19 +348,9 @@ def excluir_produto(produto_id: int, db: Session = Depends(get_db)):
 # ---------------------------------------------------------
 # USUÁRIOS - LISTAR
 # ---------------------------------------------------------
-@app.get("/api/usuarios")
-def listar_usuarios(db: Session = Depends(get_db)):
-    usuarios = db.query(models.Usuario).all()
-
-    return [
-        {
-            "id": u.IDUsuario,
-            "nome": u.Nome,
-            "email": u.Email,
-            "grupo_id": u.IDGrupo
-        }
-        for u in usuarios
-    ]
+@rotas.get("/api/usuarios", dependencies=[Depends(autenticacao.gerencia)])
+async def listar_usuarios(db: AsyncSession = Depends(replicas.get_async_db_leitura)):
+    return respostas.json(await db.run_sync(crud.listar_usuarios))
 
 
 # ---------------------------------------------------------
@@ -194,8 +362,13 @@ class UsuarioCreateIn(BaseModel):
     senha: str
     grupo_id: int
 
-@app.post("/api/usuarios")
-def adicionar_usuario(payload: UsuarioCreateIn, db: Session = Depends(get_db)):
+@rotas.post("/api/usuarios", dependencies=[Depends(autenticacao.gerencia)])
+async def adicionar_usuario(payload: UsuarioCreateIn, db: AsyncSession = Depends(get_async_db)):
+    senha_hash = await security.servico.hash(payload.senha)
+    return await db.run_sync(_adicionar_usuario, payload, senha_hash)
+
+
+def _adicionar_usuario(db: Session, payload: UsuarioCreateIn, senha_hash: str):
 
     grupo = db.query(models.GrupoUsuario).filter(
         models.GrupoUsuario.IDGrupo == payload.grupo_id
@@ -212,7 +385,7 @@ def adicionar_usuario(payload: UsuarioCreateIn, db: Session = Depends(get_db)):
         novo = models.Usuario(
             Nome=payload.nome,
             Email=payload.email,
-            SenhaHash=security.hash_password(payload.senha),
+            SenhaHash=senha_hash,
             IDGrupo=payload.grupo_id
         )
 
@@ -230,8 +403,12 @@ def adicionar_usuario(payload: UsuarioCreateIn, db: Session = Depends(get_db)):
 # ---------------------------------------------------------
 # USUÁRIOS - EXCLUIR
 # ---------------------------------------------------------
-@app.delete("/api/usuarios/{id}")
-def excluir_usuario(id: int, db: Session = Depends(get_db)):
+@rotas.delete("/api/usuarios/{id}", dependencies=[Depends(autenticacao.gerencia)])
+async def excluir_usuario(id: int, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(_excluir_usuario, id)
+
+
+def _excluir_usuario(db: Session, id: int):
     usuario = db.query(models.Usuario).filter(models.Usuario.IDUsuario == id).first()
 
     if not usuario:
@@ -239,5 +416,54 @@ def excluir_usuario(id: int, db: Session = Depends(get_db)):
 
     db.delete(usuario)
     db.commit()
+    autenticacao.revogacoes.revogar_usuario(id)
 
     return {"message": "Usuário excluído com sucesso!"}
+
+
+# ---------------------------------------------------------
+# INICIAR APP
+# ---------------------------------------------------------
+def criar_app() -> FastAPI:
+    """Monta o app; ``uvicorn backend.app:criar_app --factory``."""
+    app = FastAPI(
+        title="API Loja Alfaiataria",
+        default_response_class=respostas.RESPOSTA_PADRAO,
+        lifespan=ciclo_de_vida,
+    )
+
+    # CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Métricas por rota e de SQL, expostas em /metrics
+    app.add_middleware(metricas.MiddlewareMetricas)
+
+    # Com réplicas: quem acabou de escrever lê do primário por um tempo
+    if config.DB_REPLICAS:
+        app.add_middleware(replicas.MiddlewarePrimarioAposEscrita)
+
+    # Roteadores
+    app.include_router(vendas.router, prefix="/api")
+    app.include_router(grupos.router)
+    app.include_router(usuarios.router, prefix="/api")
+    app.include_router(produtos.router, prefix="/api")
+    app.include_router(relatorios.router)
+    app.include_router(exportar.router)
+    app.include_router(rotas_avaliacoes.router)
+    app.include_router(dashboard.router)
+    app.include_router(rotas_eventos.router)
+    app.include_router(precos.router)
+    app.include_router(estoque.router)
+    app.include_router(rotas)
+
+    return app
+
+
+# ``uvicorn backend.app:app`` continua funcionando
+app = criar_app()
@@ -0,0 +1,236 @@
+"""Arquivamento das vendas de meses fechados.
+
+Vendas e ItensVenda só crescem, e com elas os índices e as checagens de FK
+de cada venda nova. Vendas com mais de ``VENDAS_ARQUIVO_MESES`` meses
+fechados (não se editam vendas de exercícios anteriores) saem das tabelas
+quentes para VendasArquivo / ItensVendaArquivo:
+
+* no MySQL, as tabelas de arquivo são particionadas por mês de DataVenda
+  (alfaiataria.sql); as partições dos meses arquivados são criadas aqui,
+  antes de mover, e uma consulta por período só lê os meses do período.
+  Tabelas particionadas não têm FK: a exclusão de produtos e usuários
+  consulta o arquivo antes (``produto_arquivado`` / ``usuario_arquivado``)
+* ItensVendaArquivo guarda a DataVenda da venda (chave de partição), então
+  os itens de um período saem sem join com as vendas
+* o movimento é feito em lotes de ``VENDAS_ARQUIVO_LOTE`` vendas, cada um
+  numa transação (copia para o arquivo e apaga das tabelas quentes): se o
+  processo parar no meio, o lote em andamento é desfeito e a próxima
+  execução continua de onde parou
+
+Quem lê vendas antigas lê as duas origens: ``buscar_venda`` (GET
+/api/vendas/{id}), a exportação (arquivo primeiro, depois as quentes; como
+as arquivadas são as mais antigas, a saída segue em ordem de IDVenda), a
+reconstrução dos rollups e a replicação para o Mongo (``vendas()`` /
+``itens()``, a união das duas).
+
+    python -m backend.arquivamento [--meses 12] [--lote 1000]
+"""
+import argparse
+import time
+from datetime import date, datetime
+
+from sqlalchemy import delete, exists, insert, or_, select, text, union_all
+from sqlalchemy.orm import Session, aliased
+
+from . import config, models
+
+COLUNAS_VENDA = ("IDVenda", "IDUsuarioCliente", "IDUsuarioAtendente", "DataVenda", "Total")
+COLUNAS_ITEM = ("IDItem", "IDVenda", "IDProduto", "Quantidade", "PrecoUnitario")
+TABELAS_ARQUIVO = ("VendasArquivo", "ItensVendaArquivo")
+
+
+# ---------------------------------------------------------
+# LEITURA (tabelas quentes + arquivo)
+# ---------------------------------------------------------
+def _uniao(quente, arquivo, colunas, nome):
+    return union_all(
+        select(*[getattr(quente, c) for c in colunas]),
+        select(*[getattr(arquivo, c) for c in colunas]),
+    ).subquery(nome)
+
+
+def vendas():
+    """Vendas + VendasArquivo, com as colunas de Vendas."""
+    return _uniao(models.Venda, models.VendaArquivada, COLUNAS_VENDA, "vendas")
+
+
+def itens():
+    """ItensVenda + ItensVendaArquivo, com as colunas de ItensVenda."""
+    return _uniao(models.ItemVenda, models.ItemVendaArquivado, COLUNAS_ITEM, "itens")
+
+
+def buscar_venda(db: Session, id_venda: int):
+    """Venda com os itens, das tabelas quentes ou do arquivo; None se não existe."""
+    uc, ua, p = aliased(models.Usuario), aliased(models.Usuario), models.Produto
+    origens = (
+        (models.Venda, models.ItemVenda, False),
+        (models.VendaArquivada, models.ItemVendaArquivado, True),
+    )
+    for v, i, arquivada in origens:
+        cabecalho = db.execute(
+            select(v.IDVenda, v.DataVenda, v.Total, uc.Nome.label("cliente"), ua.Nome.label("atendente"))
+            .outerjoin(uc, uc.IDUsuario == v.IDUsuarioCliente)
+            .outerjoin(ua, ua.IDUsuario == v.IDUsuarioAtendente)
+            .where(v.IDVenda == id_venda)
+        ).first()
+        if cabecalho is not None:
+            break
+    else:
+        return None
+
+    linhas = db.execute(
+        select(i.IDProduto, p.Nome, i.Quantidade, i.PrecoUnitario)
+        .outerjoin(p, p.IDProduto == i.IDProduto)
+        .where(i.IDVenda == id_venda)
+        .order_by(i.IDItem)
+    ).all()
+    return {
+        "id_venda": cabecalho.IDVenda,
+        "data": cabecalho.DataVenda.isoformat() if cabecalho.DataVenda else None,
+        "cliente": cabecalho.cliente,
+        "atendente": cabecalho.atendente,
+        "total": cabecalho.Total,
+        "arquivada": arquivada,
+        "itens": [
+            {
+                "id_produto": id_produto,
+                "produto": nome,
+                "quantidade": quantidade,
+                "preco_unitario": preco,
+                "subtotal": round(quantidade * preco, 2),
+            }
+            for id_produto, nome, quantidade, preco in linhas
+        ],
+    }
+
+
+def produto_arquivado(db: Session, id_produto: int) -> bool:
+    i = models.ItemVendaArquivado
+    return db.scalar(select(exists().where(i.IDProduto == id_produto)))
+
+
+def usuario_arquivado(db: Session, id_usuario: int) -> bool:
+    v = models.VendaArquivada
+    return db.scalar(select(exists().where(or_(v.IDUsuarioCliente == id_usuario, v.IDUsuarioAtendente == id_usuario))))
+
+
+# ---------------------------------------------------------
+# PARTIÇÕES MENSAIS (só MySQL)
+# ---------------------------------------------------------
+def _mes_seguinte(mes: date) -> date:
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def corte(meses: int = None, hoje: date = None) -> datetime:
+    """Início do mês mais antigo que fica nas tabelas quentes."""
+    meses = config.VENDAS_ARQUIVO_MESES if meses is None else meses
+    hoje = hoje or datetime.utcnow().date()
+    total = hoje.year * 12 + hoje.month - 1 - meses
+    return datetime(total // 12, total % 12 + 1, 1)
+
+
+def _garantir_particoes(db: Session, inicio: datetime, limite: datetime):
+    """Cria as partições dos meses em [inicio, limite) que ainda não existem.
+
+    Só acrescenta meses depois da última partição (o que é mais antigo
+    cabe nela), dividindo a ``pmax``, que fica sempre vazia. Tabelas sem
+    particionamento (criadas pelo migrar) ficam como estão.
+    """
+    if db.get_bind().dialect.name != "mysql":
+        return
+    for tabela in TABELAS_ARQUIVO:
+        nomes = db.scalars(text(
+            "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabela AND PARTITION_NAME IS NOT NULL"
+        ), {"tabela": tabela}).all()
+        if not nomes:
+            continue
+
+        meses = sorted(n for n in nomes if n != "pmax")
+        mes = (
+            _mes_seguinte(datetime.strptime(meses[-1], "p%Y%m").date())
+            if meses else date(inicio.year, inicio.month, 1)
+        )
+        novas = []
+        while mes < limite.date():
+            novas.append(f"PARTITION p{mes:%Y%m} VALUES LESS THAN ('{_mes_seguinte(mes)}')")
+            mes = _mes_seguinte(mes)
+        if novas:
+            # DDL: o MySQL faz commit implícito, por isso antes dos lotes
+            db.execute(text(
+                f"ALTER TABLE {tabela} REORGANIZE PARTITION pmax INTO "
+                f"({', '.join(novas)}, PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+            ))
+
+
+# ---------------------------------------------------------
+# MOVIMENTO EM LOTES
+# ---------------------------------------------------------
+def mover_lote(db: Session, limite_data: datetime, tamanho: int) -> int:
+    """Move até ``tamanho`` vendas anteriores a ``limite_data``; devolve quantas."""
+    v, i = models.Venda, models.ItemVenda
+    va, ia = models.VendaArquivada, models.ItemVendaArquivado
+    try:
+        # Pelo índice de DataVenda; as vendas do lote ficam travadas até o commit
+        ids = db.scalars(
+            select(v.IDVenda).where(v.DataVenda < limite_data).order_by(v.DataVenda).limit(tamanho).with_for_update()
+        ).all()
+        if not ids:
+            db.rollback()
+            return 0
+
+        db.execute(insert(va).from_select(
+            list(COLUNAS_VENDA), select(*[getattr(v, c) for c in COLUNAS_VENDA]).where(v.IDVenda.in_(ids))
+        ))
+        db.execute(insert(ia).from_select(
+            [*COLUNAS_ITEM, "DataVenda"],
+            select(*[getattr(i, c) for c in COLUNAS_ITEM], v.DataVenda)
+            .join(v, v.IDVenda == i.IDVenda)
+            .where(i.IDVenda.in_(ids)),
+        ))
+        db.execute(delete(i).where(i.IDVenda.in_(ids)).execution_options(synchronize_session=False))
+        db.execute(delete(v).where(v.IDVenda.in_(ids)).execution_options(synchronize_session=False))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(ids)
+
+
+def arquivar(db: Session, meses: int = None, tamanho: int = None, pausa: float = 0.0, progresso=None) -> int:
+    """Arquiva todas as vendas anteriores ao corte; devolve quantas."""
+    limite_data = corte(meses)
+    tamanho = tamanho or config.VENDAS_ARQUIVO_LOTE
+
+    v = models.Venda
+    inicio = db.scalar(select(v.DataVenda).where(v.DataVenda < limite_data).order_by(v.DataVenda).limit(1))
+    if inicio is None:
+        return 0
+    _garantir_particoes(db, inicio, limite_data)
+
+    total = 0
+    while movidas := mover_lote(db, limite_data, tamanho):
+        total += movidas
+        if progresso:
+            progresso(total)
+        if pausa:
+            time.sleep(pausa)  # deixa espaço para as vendas do dia
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Arquiva as vendas de meses fechados.")
+    parser.add_argument("--meses", type=int, default=config.VENDAS_ARQUIVO_MESES, help="meses que ficam nas tabelas quentes")
+    parser.add_argument("--lote", type=int, default=config.VENDAS_ARQUIVO_LOTE, help="vendas por transação")
+    parser.add_argument("--pausa", type=float, default=0.05, help="pausa (s) entre lotes")
+    args = parser.parse_args()
+
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(f"Arquivando vendas anteriores a {corte(args.meses):%Y-%m-%d}...")
+        total = arquivar(db, args.meses, args.lote, args.pausa, progresso=lambda n: print(f"  {n} vendas", flush=True))
+        print(f"{total} vendas arquivadas.")
+    finally:
+        db.close()
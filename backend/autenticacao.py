@@ -0,0 +1,163 @@
+"""Tokens de sessão assinados (JWT HS256) e guardas por grupo.
+
+O login emite um token com id do usuário, grupo, validade e um id próprio
+(``jti``). As rotas protegidas só verificam a assinatura e a validade, em
+memória: nenhuma consulta ao banco por requisição.
+
+Revogação (logout, usuário excluído) fica numa lista em memória cujas
+entradas somem quando o token revogado expiraria de qualquer jeito, então
+ela nunca passa do que foi revogado nos últimos ``JWT_EXPIRES_MINUTES``.
+A lista é por processo: com vários workers, um logout só vale no worker
+que o recebeu. Mudança de grupo vale a partir do próximo login.
+"""
+import threading
+import time
+import uuid
+from typing import Optional
+
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from jose import ExpiredSignatureError, JWTError, jwt
+
+from . import config
+
+GERENCIA = "GERENCIA"
+FUNCIONARIO = "FUNCIONARIO"
+CLIENTE = "CLIENTE"
+
+
+class Sessao:
+    __slots__ = ("id", "grupo", "grupo_id", "jti", "emitido", "expira")
+
+    def __init__(self, id, grupo, grupo_id, jti, emitido, expira):
+        self.id = id
+        self.grupo = grupo
+        self.grupo_id = grupo_id
+        self.jti = jti
+        self.emitido = emitido
+        self.expira = expira
+
+
+# ---------------------------------------------------------
+# EMISSÃO / VERIFICAÇÃO
+# ---------------------------------------------------------
+def emitir(id_usuario: int, grupo: str, grupo_id: int) -> dict:
+    agora = int(time.time())
+    expira = agora + config.JWT_EXPIRES_MINUTES * 60
+    token = jwt.encode(
+        {
+            "sub": str(id_usuario),
+            "grp": grupo,
+            "gid": grupo_id,
+            "iat": agora,
+            "exp": expira,
+            "jti": uuid.uuid4().hex,
+        },
+        config.JWT_SECRET,
+        algorithm=config.JWT_ALGORITHM,
+    )
+    return {"token": token, "tipo": "bearer", "expira_em": expira}
+
+
+def _nao_autenticado(detalhe: str):
+    return HTTPException(status_code=401, detail=detalhe, headers={"WWW-Authenticate": "Bearer"})
+
+
+def verificar(token: str) -> Sessao:
+    try:
+        dados = jwt.decode(token, config.JWT_SECRET, algorithms=[config.JWT_ALGORITHM])
+        sessao = Sessao(
+            int(dados["sub"]), dados["grp"], dados["gid"], dados["jti"], dados["iat"], dados["exp"]
+        )
+    except ExpiredSignatureError:
+        raise _nao_autenticado("Sessão expirada, faça login novamente.")
+    except (JWTError, KeyError, TypeError, ValueError):
+        raise _nao_autenticado("Token inválido.")
+
+    if revogacoes.revogado(sessao):
+        raise _nao_autenticado("Sessão encerrada, faça login novamente.")
+    return sessao
+
+
+# ---------------------------------------------------------
+# REVOGAÇÃO
+# ---------------------------------------------------------
+class Revogacoes:
+    """jti revogados e usuários com tokens anteriores a um instante."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = {}     # jti -> expiração do token
+        self._usuarios = {}   # id -> (revogado em, expiração da entrada)
+
+    def _limpar(self, agora):
+        self._tokens = {j: exp for j, exp in self._tokens.items() if exp > agora}
+        self._usuarios = {u: v for u, v in self._usuarios.items() if v[1] > agora}
+
+    def revogar_token(self, sessao: Sessao):
+        with self._lock:
+            self._limpar(time.time())
+            self._tokens[sessao.jti] = sessao.expira
+
+    def revogar_usuario(self, id_usuario: int):
+        """Invalida todos os tokens já emitidos para o usuário."""
+        agora = time.time()
+        with self._lock:
+            self._limpar(agora)
+            self._usuarios[id_usuario] = (agora, agora + config.JWT_EXPIRES_MINUTES * 60)
+
+    def revogado(self, sessao: Sessao) -> bool:
+        # Leitura sem lock: os dicts só são trocados inteiros ou ganham chaves
+        if sessao.jti in self._tokens:
+            return True
+        usuario = self._usuarios.get(sessao.id)
+        return usuario is not None and sessao.emitido <= usuario[0]
+
+    def __len__(self):
+        return len(self._tokens) + len(self._usuarios)
+
+
+revogacoes = Revogacoes()
+
+
+# ---------------------------------------------------------
+# DEPENDÊNCIAS
+# ---------------------------------------------------------
+_bearer = HTTPBearer(auto_error=False)
+
+
+async def sessao_atual(
+    credenciais: Optional[HTTPAuthorizationCredentials] = Depends(_bearer),
+) -> Sessao:
+    if credenciais is None:
+        raise _nao_autenticado("Faça login para continuar.")
+    return verificar(credenciais.credentials)
+
+
+async def sessao_stream(
+    token: Optional[str] = None,
+    credenciais: Optional[HTTPAuthorizationCredentials] = Depends(_bearer),
+) -> Sessao:
+    """Como ``sessao_atual``, mas aceita também ``?token=``: o EventSource
+    do navegador não envia o cabeçalho Authorization. Só para streams."""
+    if credenciais is not None:
+        return verificar(credenciais.credentials)
+    if token:
+        return verificar(token)
+    raise _nao_autenticado("Faça login para continuar.")
+
+
+def exigir(*grupos: str, origem=sessao_atual):
+    """Dependência que exige login e, se ``grupos`` for dado, um deles."""
+    async def dependencia(sessao: Sessao = Depends(origem)) -> Sessao:
+        if grupos and sessao.grupo not in grupos:
+            raise HTTPException(status_code=403, detail="Acesso não permitido para o seu grupo.")
+        return sessao
+
+    return dependencia
+
+
+autenticado = exigir()
+equipe = exigir(GERENCIA, FUNCIONARIO)
+gerencia = exigir(GERENCIA)
+equipe_stream = exigir(GERENCIA, FUNCIONARIO, origem=sessao_stream)
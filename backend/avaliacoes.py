@@ -0,0 +1,228 @@
+"""Avaliações de produtos (coleção ``avaliacao`` do Mongo).
+
+Cada avaliação guarda ``cliente``, ``produto`` (nome), ``nota`` (1 a 5),
+``comentario`` e ``data``, como em NoSQL/alfaiataria.avaliacao.json, mais o
+``id_produto`` do MySQL, pelo qual a API consulta.
+
+O resumo de cada produto (quantidade, soma e histograma das notas) fica na
+coleção ``avaliacao_resumos``, com ``_id`` = id do produto, e é atualizado
+com ``$inc`` a cada avaliação nova: a média sai de um documento, sem
+agregar as avaliações, e os resumos de uma página do catálogo vêm num único
+``find`` com ``$in``. Se o processo cair entre a avaliação e o ``$inc``,
+``reconstruir`` refaz os resumos a partir das avaliações.
+
+Os índices são criados no primeiro uso.
+
+    python -m backend.avaliacoes reconstruir   # id_produto nas avaliações antigas + resumos
+"""
+import argparse
+import base64
+import binascii
+import threading
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pymongo import ASCENDING, DESCENDING, ReplaceOne, UpdateMany
+from pymongo.errors import PyMongoError
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import database_mongo, models
+
+COLECAO_RESUMOS = "avaliacao_resumos"
+NOTAS = range(1, 6)
+
+_lock = threading.Lock()
+_preparado = False
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def _colecoes():
+    """(avaliacoes, resumos), criando os índices no primeiro uso."""
+    global _preparado
+    db = database_mongo.obter_db()
+    avaliacoes, resumos = db[database_mongo.COLECOES["col_avaliacao"]], db[COLECAO_RESUMOS]
+    if not _preparado:
+        with _lock:
+            if not _preparado:
+                # Página de um produto: filtro por id_produto, ordem por data
+                avaliacoes.create_index(
+                    [("id_produto", ASCENDING), ("data", DESCENDING), ("_id", DESCENDING)],
+                    name="ix_produto_data",
+                )
+                _preparado = True
+    return avaliacoes, resumos
+
+
+async def consultar(funcao, *args):
+    """Roda uma função deste módulo no threadpool (o pymongo bloqueia).
+
+    Mongo fora do ar vira 503: o restante da API continua respondendo.
+    """
+    try:
+        return await run_in_threadpool(funcao, *args)
+    except PyMongoError:
+        raise HTTPException(status_code=503, detail="Avaliações indisponíveis no momento.")
+
+
+# ---------------------------------------------------------
+# RESUMOS
+# ---------------------------------------------------------
+def _formatar_resumo(documento):
+    quantidade = documento.get("quantidade", 0) if documento else 0
+    notas = (documento or {}).get("notas", {})
+    return {
+        "quantidade": quantidade,
+        "media": round(documento["soma"] / quantidade, 2) if quantidade else None,
+        "notas": {str(n): notas.get(str(n), 0) for n in NOTAS},
+    }
+
+
+def resumo(id_produto: int):
+    _, resumos = _colecoes()
+    return _formatar_resumo(resumos.find_one({"_id": id_produto}))
+
+
+def resumos(ids_produtos) -> dict:
+    """Resumos de vários produtos com um só ``find``; id -> resumo."""
+    ids = list(ids_produtos)
+    if not ids:
+        return {}
+    _, colecao = _colecoes()
+    encontrados = {d["_id"]: d for d in colecao.find({"_id": {"$in": ids}})}
+    return {i: _formatar_resumo(encontrados.get(i)) for i in ids}
+
+
+# ---------------------------------------------------------
+# AVALIAÇÕES
+# ---------------------------------------------------------
+def _formatar(documento):
+    return {
+        "id": str(documento["_id"]),
+        "cliente": documento.get("cliente"),
+        "nota": documento.get("nota"),
+        "comentario": documento.get("comentario"),
+        "data": documento["data"].isoformat() if documento.get("data") else None,
+    }
+
+
+def _cursor(documento) -> str:
+    texto = f"{documento['data'].isoformat()}|{documento['_id']}"
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip("=")
+
+
+def _ler_cursor(cursor: str):
+    try:
+        texto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        data, id_ = texto.split("|")
+        return datetime.fromisoformat(data), ObjectId(id_)
+    except (binascii.Error, UnicodeDecodeError, ValueError, InvalidId):
+        raise CursorInvalido(cursor)
+
+
+def listar(id_produto: int, cursor: str = None, limite: int = 20):
+    """Avaliações do produto, mais novas primeiro, paginadas por data.
+
+    O cursor é a (data, _id) da última avaliação da página anterior: várias
+    avaliações no mesmo dia não se perdem nem se repetem entre páginas.
+    """
+    avaliacoes, _ = _colecoes()
+    filtro = {"id_produto": id_produto}
+    if cursor:
+        data, id_ = _ler_cursor(cursor)
+        filtro["$or"] = [{"data": {"$lt": data}}, {"data": data, "_id": {"$lt": id_}}]
+
+    documentos = list(
+        avaliacoes.find(filtro).sort([("data", DESCENDING), ("_id", DESCENDING)]).limit(limite + 1)
+    )
+    proximo = _cursor(documentos[limite - 1]) if len(documentos) > limite else None
+
+    return {
+        "avaliacoes": [_formatar(d) for d in documentos[:limite]],
+        "proximo_cursor": proximo,
+    }
+
+
+def avaliar(id_produto: int, produto: str, cliente: str, nota: int, comentario: str = None):
+    """Grava a avaliação e soma a nota no resumo do produto."""
+    avaliacoes, resumos = _colecoes()
+    agora = datetime.utcnow()
+    documento = {
+        "cliente": cliente,
+        "produto": produto,
+        "id_produto": id_produto,
+        "nota": nota,
+        "comentario": comentario,
+        "data": agora,
+    }
+    avaliacoes.insert_one(documento)
+    resumos.update_one(
+        {"_id": id_produto},
+        {"$inc": {"quantidade": 1, "soma": nota, f"notas.{nota}": 1}, "$set": {"atualizado_em": agora}},
+        upsert=True,
+    )
+    return _formatar(documento)
+
+
+# ---------------------------------------------------------
+# MANUTENÇÃO
+# ---------------------------------------------------------
+def vincular_produtos(db: Session) -> int:
+    """Preenche id_produto nas avaliações antigas, pelo nome do produto."""
+    avaliacoes, _ = _colecoes()
+    nomes = avaliacoes.distinct("produto", {"id_produto": {"$exists": False}})
+    if not nomes:
+        return 0
+
+    p = models.Produto
+    ids = dict(db.execute(select(p.Nome, p.IDProduto).where(p.Nome.in_(nomes))).all())
+    operacoes = [
+        UpdateMany({"produto": nome, "id_produto": {"$exists": False}}, {"$set": {"id_produto": id_produto}})
+        for nome, id_produto in ids.items()
+    ]
+    return avaliacoes.bulk_write(operacoes, ordered=False).modified_count if operacoes else 0
+
+
+def reconstruir():
+    """Refaz todos os resumos a partir das avaliações; devolve quantos."""
+    avaliacoes, colecao = _colecoes()
+    grupos = avaliacoes.aggregate([
+        {"$match": {"id_produto": {"$exists": True}, "nota": {"$in": list(NOTAS)}}},
+        {"$group": {"_id": {"produto": "$id_produto", "nota": "$nota"}, "quantidade": {"$sum": 1}}},
+    ])
+
+    novos = {}
+    for grupo in grupos:
+        id_produto, nota = grupo["_id"]["produto"], grupo["_id"]["nota"]
+        documento = novos.setdefault(id_produto, {"_id": id_produto, "quantidade": 0, "soma": 0, "notas": {}})
+        documento["quantidade"] += grupo["quantidade"]
+        documento["soma"] += nota * grupo["quantidade"]
+        documento["notas"][str(nota)] = grupo["quantidade"]
+
+    agora = datetime.utcnow()
+    operacoes = [ReplaceOne({"_id": i}, {**d, "atualizado_em": agora}, upsert=True) for i, d in novos.items()]
+    if operacoes:
+        colecao.bulk_write(operacoes, ordered=False)
+    colecao.delete_many({"_id": {"$nin": list(novos)}})
+    return len(novos)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manutenção das avaliações de produtos.")
+    parser.add_argument("comando", choices=["reconstruir"])
+    parser.parse_args()
+
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(f"{vincular_produtos(db)} avaliações vinculadas a produtos.")
+    finally:
+        db.close()
+    print(f"{reconstruir()} resumos reconstruídos.")
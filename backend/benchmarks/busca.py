@@ -0,0 +1,88 @@
+"""Benchmark da busca de produtos: latência por consulta num catálogo grande.
+
+Gera um catálogo sintético (nomes de roupa em português, com acentos) num
+SQLite em memória, carrega o índice de busca.py como na subida da API e
+mede p50/p95/p99 de uma mistura de consultas: prefixos curtos, termos
+completos, várias palavras e erros de digitação.
+
+Uso:
+    python -m backend.benchmarks.busca --produtos 100000 --consultas 5000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from .. import models
+from ..busca import IndiceProdutos
+
+PECAS = ["Terno", "Camisa", "Calça", "Blazer", "Colete", "Gravata", "Vestido", "Saia", "Paletó", "Sobretudo"]
+CORTES = ["Slim", "Social", "Alfaiataria", "Clássico", "Midi", "Reto", "Acinturado", "Oversize"]
+CORES = ["Preto", "Azul", "Marinho", "Bege", "Cinza", "Branco", "Vinho", "Caramelo", "Grafite"]
+TECIDOS = ["lã fria", "linho", "algodão egípcio", "tricoline", "veludo", "sarja", "seda"]
+
+CONSULTAS = [
+    "ca", "cal", "calc", "camisa", "terno slim", "blazer marinho", "palito",
+    "calsa", "camsia azul", "gravata vinho", "vestdo midi", "sobretudo la",
+    "algodao", "linho bege", "paleto grafite", "terno slim preto 4",
+]
+
+
+def gerar(n, rnd):
+    for i in range(n):
+        peca = rnd.choice(PECAS)
+        yield {
+            "Nome": f"{peca} {rnd.choice(CORTES)} {rnd.choice(CORES)} {i % 97}",
+            "Categoria": peca,
+            "Descricao": f"{peca} em {rnd.choice(TECIDOS)}, modelagem {rnd.choice(CORTES).lower()}",
+            "Preco": round(rnd.uniform(49, 1999), 2),
+            "Estoque": rnd.randint(0, 50),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--produtos", type=int, default=100_000)
+    parser.add_argument("--consultas", type=int, default=5000)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.semente)
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(bind=engine, tables=[models.Produto.__table__])
+    with engine.begin() as conn:
+        conn.execute(insert(models.Produto), list(gerar(args.produtos, rnd)))
+
+    indice = IndiceProdutos()
+    db = sessionmaker(bind=engine)()
+    inicio = time.perf_counter()
+    indice.carregar(db)
+    db.close()
+    print(f"carga: {args.produtos} produtos em {time.perf_counter() - inicio:.2f}s {indice.estatisticas()}")
+
+    latencias = []
+    por_consulta = {}
+    for n in range(args.consultas):
+        consulta = CONSULTAS[n % len(CONSULTAS)]
+        inicio = time.perf_counter()
+        resultado = indice.buscar(consulta)
+        ms = (time.perf_counter() - inicio) * 1000
+        latencias.append(ms)
+        por_consulta.setdefault(consulta, (ms, len(resultado), resultado[:1]))
+
+    latencias.sort()
+    print(
+        f"{len(latencias)} consultas: p50={statistics.median(latencias):.2f}ms "
+        f"p95={latencias[int(len(latencias) * 0.95) - 1]:.2f}ms "
+        f"p99={latencias[int(len(latencias) * 0.99) - 1]:.2f}ms max={latencias[-1]:.2f}ms"
+    )
+    for consulta, (ms, total, primeiro) in por_consulta.items():
+        nome = primeiro[0]["nome"] if primeiro else "-"
+        print(f"  {consulta!r:<22} {ms:7.2f}ms  {total:>3} resultados  1º: {nome}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark de concorrência: requisições em voo x latência.
+
+Dispara requisições contra uma API já em execução, mantendo N requisições
+simultâneas em cada nível, e mede vazão e latência (p50/p95/p99).
+
+Rode uma vez com cada modo do banco e compare:
+
+    DB_ASYNC=0 uvicorn backend.app:app --port 8000
+    python -m backend.benchmarks.concorrencia --rotulo sync
+
+    DB_ASYNC=1 uvicorn backend.app:app --port 8000
+    python -m backend.benchmarks.concorrencia --rotulo async
+
+Requer ``httpx`` (só para o benchmark). Use uma rota que chegue ao banco
+(o padrão, /api/usuarios, não passa pelo cache do catálogo).
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    k = max(0, min(len(ordenados) - 1, round(p / 100 * len(ordenados)) - 1))
+    return ordenados[k]
+
+
+async def nivel(cliente, url, concorrencia, total):
+    latencias = []
+    erros = 0
+    restantes = total
+
+    async def trabalhador():
+        nonlocal restantes, erros
+        while restantes > 0:
+            restantes -= 1
+            inicio = time.perf_counter()
+            try:
+                resp = await cliente.get(url)
+                if resp.status_code >= 400:
+                    erros += 1
+            except httpx.HTTPError:
+                erros += 1
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+
+    return {
+        "em_voo": concorrencia,
+        "requisicoes": len(latencias),
+        "erros": erros,
+        "req_s": round(len(latencias) / duracao, 1),
+        "p50_ms": round(statistics.median(latencias), 2),
+        "p95_ms": round(percentil(latencias, 95), 2),
+        "p99_ms": round(percentil(latencias, 99), 2),
+    }
+
+
+async def executar(args):
+    niveis = [int(n) for n in args.niveis.split(",")]
+    limites = httpx.Limits(max_connections=max(niveis), max_keepalive_connections=max(niveis))
+    resultados = []
+
+    async with httpx.AsyncClient(base_url=args.base, limits=limites, timeout=args.timeout) as cliente:
+        await cliente.get(args.rota)  # aquecimento
+        for n in niveis:
+            resultado = await nivel(cliente, args.rota, n, max(args.requisicoes, n * 5))
+            resultados.append(resultado)
+            print(
+                f"{args.rotulo:<6} em_voo={n:<4} {resultado['req_s']:>8} req/s  "
+                f"p50={resultado['p50_ms']}ms p95={resultado['p95_ms']}ms "
+                f"p99={resultado['p99_ms']}ms erros={resultado['erros']}"
+            )
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump({"modo": args.rotulo, "rota": args.rota, "niveis": resultados}, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base", default="http://127.0.0.1:8000")
+    parser.add_argument("--rota", default="/api/usuarios")
+    parser.add_argument("--niveis", default="1,8,32,64,128,256")
+    parser.add_argument("--requisicoes", type=int, default=500, help="requisições por nível (mínimo)")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--rotulo", default="api", help="nome do modo (ex.: sync, async)")
+    parser.add_argument("--saida", help="grava os resultados em JSON")
+    asyncio.run(executar(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark da exportação de vendas: memória e vazão por tamanho.
+
+Popula um SQLite temporário com vendas sintéticas e consome a exportação
+inteira (descartando os bytes, como um cliente lento faria aos poucos),
+medindo o pico de memória alocada com tracemalloc. O pico deve ficar
+praticamente igual para qualquer quantidade de linhas. (O tracemalloc
+deixa a exportação bem mais lenta; a vazão medida serve só para comparar
+formatos entre si.)
+
+Uso:
+    python -m backend.benchmarks.exportacao --linhas 10000,1000000 --formato csv --gzip
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+
+from .. import models
+from ..exportacao import exportar
+
+ITENS_POR_VENDA = 3
+
+
+def popular(engine, itens, rnd):
+    inicio = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(models.GrupoUsuario), [{"IDGrupo": 1, "NomeGrupo": "FUNCIONARIO"}])
+        conn.execute(insert(models.Usuario), [{"IDUsuario": 1, "Nome": "Caixa", "IDGrupo": 1}])
+        conn.execute(insert(models.Produto), [
+            {"IDProduto": i, "Nome": f"Produto {i}", "Preco": 10.0 + i, "Estoque": 0} for i in range(1, 101)
+        ])
+
+        vendas = itens // ITENS_POR_VENDA
+        for base in range(0, vendas, 50_000):
+            ids = range(base + 1, min(base + 50_000, vendas) + 1)
+            conn.execute(insert(models.Venda), [
+                {"IDVenda": v, "IDUsuarioCliente": 1, "IDUsuarioAtendente": 1,
+                 "DataVenda": inicio + timedelta(minutes=v), "Total": 0}
+                for v in ids
+            ])
+            conn.execute(insert(models.ItemVenda), [
+                {"IDVenda": v, "IDProduto": rnd.randint(1, 100), "Quantidade": rnd.randint(1, 3),
+                 "PrecoUnitario": round(rnd.uniform(10, 500), 2)}
+                for v in ids for _ in range(ITENS_POR_VENDA)
+            ])
+
+
+def medir(engine, formato, gzip):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    total = 0
+    for parte in exportar("itens", formato, gzip=gzip, bind=engine):
+        total += len(parte)
+    duracao = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return total, duracao, pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--linhas", default="10000,1000000", help="itens por rodada, separados por vírgula")
+    parser.add_argument("--formato", choices=["csv", "ndjson", "parquet"], default="csv")
+    parser.add_argument("--gzip", action="store_true")
+    args = parser.parse_args()
+
+    for linhas in (int(n) for n in args.linhas.split(",")):
+        fd, caminho = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        engine = create_engine(f"sqlite:///{caminho}")
+        try:
+            models.Base.metadata.create_all(bind=engine)
+            popular(engine, linhas, random.Random(linhas))
+            total, duracao, pico = medir(engine, args.formato, args.gzip)
+            print(
+                f"{linhas:>10} itens  {total / 2**20:8.1f} MiB em {duracao:6.2f}s "
+                f"({linhas / duracao:,.0f} linhas/s)  pico de memória {pico / 2**20:.1f} MiB"
+            )
+        finally:
+            engine.dispose()
+            os.remove(caminho)
+
+
+if __name__ == "__main__":
+    main()
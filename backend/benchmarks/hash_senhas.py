@@ -0,0 +1,74 @@
+"""Benchmark do serviço de hash: logins/s por custo do scrypt.
+
+Para cada valor de N, gera um hash e dispara verificações simultâneas pelo
+ServicoHash (o mesmo caminho do /api/login), medindo vazão e latência.
+Escolha o maior N cujo p95 caiba no orçamento de latência do login.
+
+Uso:
+    python -m backend.benchmarks.hash_senhas --custos 12,13,14,15 --concorrencia 32
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from .. import security
+
+
+async def medir(n, r, p, workers, concorrencia, total):
+    servico = security.ServicoHash(n=n, r=r, p=p, workers=workers, fila_max=concorrencia)
+    senha = "senha-de-teste"
+    hash_senha = security.hash_password(senha, n, r, p)
+
+    await servico.verificar(senha, hash_senha)  # sobe os processos do pool
+
+    latencias = []
+    restantes = total
+
+    async def cliente():
+        nonlocal restantes
+        while restantes > 0:
+            restantes -= 1
+            inicio = time.perf_counter()
+            assert await servico.verificar(senha, hash_senha)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+    estatisticas = servico.estatisticas()
+    servico.encerrar()
+
+    latencias.sort()
+    return {
+        "n": n,
+        "logins_s": round(len(latencias) / duracao, 1),
+        "p50_ms": round(statistics.median(latencias), 1),
+        "p95_ms": round(latencias[int(len(latencias) * 0.95) - 1], 1),
+        "kdf_ms": estatisticas["kdf_medio_ms"],
+    }
+
+
+async def executar(args):
+    print(f"r={args.r} p={args.p} workers={args.workers} concorrencia={args.concorrencia}")
+    for expoente in (int(c) for c in args.custos.split(",")):
+        r = await medir(2 ** expoente, args.r, args.p, args.workers, args.concorrencia, args.logins)
+        print(
+            f"N=2^{expoente:<3} {r['logins_s']:>8} logins/s  p50={r['p50_ms']}ms "
+            f"p95={r['p95_ms']}ms  kdf={r['kdf_ms']}ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--custos", default="12,13,14,15", help="expoentes de N (N = 2^x)")
+    parser.add_argument("--r", type=int, default=8)
+    parser.add_argument("--p", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=None, help="processos (padrão: HASH_WORKERS)")
+    parser.add_argument("--concorrencia", type=int, default=32)
+    parser.add_argument("--logins", type=int, default=200, help="verificações por custo")
+    asyncio.run(executar(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
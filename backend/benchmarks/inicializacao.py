@@ -0,0 +1,104 @@
+"""Tempo de importação e de subida do app com o banco fora do ar.
+
+Cada repetição roda num processo novo (importações frias), com DB_HOST e
+MONGO_URL apontando para um endereço que não responde, e mede:
+
+* importacao  ``import backend.app``
+* subida      lifespan/startup do app (TestClient como contexto)
+* primeira    GET / (rota que não usa o banco)
+
+Se uma etapa falha (ex.: a importação tentando conectar), registra o
+tempo até a falha e a última linha do erro.
+
+Uso:
+    python -m backend.benchmarks.inicializacao --repeticoes 5
+    python -m backend.benchmarks.inicializacao --host 10.255.255.1 --timeout 120
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ETAPAS = r"""
+import json, time
+inicio = time.perf_counter()
+import backend.app as modulo
+importacao = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(modulo.app) as cliente:
+    subida = time.perf_counter()
+    status = cliente.get("/").status_code
+    primeira = time.perf_counter()
+print(json.dumps({
+    "importacao_s": importacao - inicio,
+    "subida_s": subida - importacao,
+    "primeira_s": primeira - subida,
+    "status": status,
+}))
+"""
+
+
+def rodar(args):
+    env = dict(os.environ)
+    env.pop("DATABASE_URL", None)
+    env.pop("ASYNC_DATABASE_URL", None)
+    env.update({
+        "DB_HOST": args.host,
+        "MONGO_URL": f"mongodb://{args.host}:27017/?serverSelectionTimeoutMS=2000",
+        "DB_ECHO": "0",
+    })
+
+    inicio = time.perf_counter()
+    try:
+        processo = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", ETAPAS],
+            cwd=RAIZ, env=env, capture_output=True, text=True, timeout=args.timeout,
+        )
+    except subprocess.TimeoutExpired:
+        return {"erro": f"sem resposta em {args.timeout}s", "total_s": args.timeout}
+
+    total = time.perf_counter() - inicio
+    if processo.returncode != 0:
+        linhas = processo.stderr.strip().splitlines() or ["?"]
+        erro = next((l for l in reversed(linhas) if "Error" in l), linhas[-1])
+        return {"erro": erro[:200], "total_s": total}
+    return {**json.loads(processo.stdout.strip().splitlines()[-1]), "total_s": total}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="10.255.255.1", help="endereço sem banco (não deve responder)")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    resultados = []
+    for n in range(args.repeticoes):
+        resultado = rodar(args)
+        resultados.append(resultado)
+        if "erro" in resultado:
+            print(f"#{n + 1}: falhou após {resultado['total_s']:.2f}s: {resultado['erro']}")
+        else:
+            print(
+                f"#{n + 1}: importação {resultado['importacao_s'] * 1000:.0f}ms  "
+                f"subida {resultado['subida_s'] * 1000:.0f}ms  "
+                f"GET / {resultado['primeira_s'] * 1000:.1f}ms  "
+                f"(processo {resultado['total_s']:.2f}s)"
+            )
+
+    ok = [r for r in resultados if "erro" not in r]
+    if ok:
+        print(
+            f"mediana: importação {statistics.median(r['importacao_s'] for r in ok) * 1000:.0f}ms  "
+            f"subida {statistics.median(r['subida_s'] for r in ok) * 1000:.0f}ms  "
+            f"({len(ok)}/{len(resultados)} ok)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""CPU por requisição dos endpoints de listagem (serialização JSON).
+
+Sobe o ``app`` no próprio processo (httpx + ASGITransport) sobre um SQLite
+temporário populado como em api.py e, para cada endpoint de lista, faz
+requisições em sequência medindo o tempo de CPU do processo (inclui as
+threads do threadpool) e a latência. Rode uma vez com e outra sem
+``API_JSON_RAPIDO`` para comparar:
+
+    python -m backend.benchmarks.serializacao --produtos 20000 --usuarios 5000
+    API_JSON_RAPIDO=1 python -m backend.benchmarks.serializacao --produtos 20000 --usuarios 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from .api import SENHA, popular
+
+ENDPOINTS = {
+    "produtos": "/api/produtos",                    # lista completa (vem do cache)
+    "produtos_pagina": "/api/produtos?limit=1000",
+    "usuarios": "/api/usuarios",
+    "grupos": "/api/grupos/",
+}
+
+
+async def medir(cliente, caminho, requisicoes):
+    for _ in range(3):
+        resposta = await cliente.get(caminho)  # aquecimento (cache, pool)
+        resposta.raise_for_status()
+
+    latencias = []
+    cpu = time.process_time()
+    for _ in range(requisicoes):
+        inicio = time.perf_counter()
+        await cliente.get(caminho)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    cpu = time.process_time() - cpu
+
+    return {
+        "bytes": len(resposta.content),
+        "cpu_ms_req": round(cpu / requisicoes * 1000, 3),
+        "p50_ms": round(statistics.median(latencias), 3),
+    }
+
+
+async def executar(args, app):
+    resultados = {}
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=60) as cliente:
+        sessao = await cliente.post("/api/login", json={"usuario": "bench1@exemplo.com", "senha": SENHA})
+        sessao.raise_for_status()
+        cliente.headers["Authorization"] = f"Bearer {sessao.json()['token']}"
+
+        for nome, caminho in ENDPOINTS.items():
+            resultados[nome] = await medir(cliente, caminho, args.requisicoes)
+            r = resultados[nome]
+            print(f"{nome:<16} {r['bytes']:>10} bytes  cpu={r['cpu_ms_req']:>8}ms/req  p50={r['p50_ms']}ms")
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--produtos", type=int, default=20000)
+    parser.add_argument("--usuarios", type=int, default=5000)
+    parser.add_argument("--requisicoes", type=int, default=50)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--saida", help="grava os resultados em JSON")
+    args = parser.parse_args()
+    args.vendas = 0
+
+    fd, caminho = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    os.environ["DATABASE_URL"] = f"sqlite:///{caminho}?timeout=60"
+    os.environ.setdefault("DB_ECHO", "0")
+    os.environ.setdefault("DB_ASYNC", "0")
+
+    # Só agora: o engine é criado na importação, a partir de DATABASE_URL
+    from ..app import app
+    from .. import config, security
+    from ..database import engine
+
+    try:
+        popular(args, random.Random(args.semente))
+        print(f"API_JSON_RAPIDO={int(getattr(config, 'API_JSON_RAPIDO', False))}: "
+              f"{args.produtos} produtos, {args.usuarios} usuários, {args.requisicoes} requisições por endpoint")
+        resultados = asyncio.run(executar(args, app))
+    finally:
+        security.servico.encerrar()
+        engine.dispose()
+        for sufixo in ("", "-wal", "-shm"):
+            if os.path.exists(caminho + sufixo):
+                os.remove(caminho + sufixo)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""Busca de produtos por texto (índice invertido em memória).
+
+Indexa Nome, Categoria e Descricao de Produtos sem acento e em minúsculas
+("Calça" e "calca" são o mesmo termo). Cada termo da consulta casa com:
+
+* o termo exato;
+* termos que começam com ele (busca enquanto digita), via ``bisect`` na
+  lista ordenada de termos;
+* termos a até 1 edição (2 a partir de 8 letras), pela vizinhança de
+  deleções: cada termo indexado guarda as variantes com uma/duas letras a
+  menos, e a consulta só compara com os termos que compartilham alguma.
+
+Um produto precisa casar com todos os termos da consulta. A pontuação é a
+soma, por termo, do melhor (peso do campo x qualidade do casamento). Como
+só há poucos valores possíveis por termo, cada termo vira alguns conjuntos
+de ids por nível de pontuação, e a consulta é feita com operações de
+conjunto (em C), sem percorrer produto a produto: a latência quase não
+cresce com o tamanho do catálogo.
+
+O índice é carregado na subida da API e atualizado pelos caminhos de
+escrita de produtos. Como o cache do catálogo, vale por processo. As
+escritas que chegam durante uma recarga são anotadas e reaplicadas no
+índice novo antes da troca, para não se perderem.
+"""
+import bisect
+import heapq
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from itertools import combinations, product
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Pontuações inteiras (peso x qualidade / 10) para somar e agrupar sem
+# problemas de ponto flutuante
+PESOS_CAMPOS = {"nome": 3, "categoria": 2, "descricao": 1}
+
+EXATO = 10
+PREFIXO = 7
+APROXIMADO = 5
+
+MIN_PREFIXO = 2       # "c" sozinho não expande para todos os termos com c
+MAX_EXPANSOES = 64    # termos por prefixo
+MAX_TERMOS_CONSULTA = 6
+
+
+def normalizar(texto) -> str:
+    decomposto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).casefold()
+
+
+def termos(texto) -> list:
+    return re.findall(r"[^\W_]+", normalizar(texto))
+
+
+def _max_erros(termo: str) -> int:
+    if len(termo) < 4:
+        return 0
+    return 1 if len(termo) < 8 else 2
+
+
+def _delecoes(termo: str, erros: int) -> set:
+    variantes = {termo}
+    for n in range(1, erros + 1):
+        for posicoes in combinations(range(len(termo)), n):
+            variantes.add("".join(c for i, c in enumerate(termo) if i not in posicoes))
+    return variantes
+
+
+def _distancia(a: str, b: str, limite: int) -> int:
+    """Distância de edição com transposição; para cedo acima de ``limite``."""
+    if abs(len(a) - len(b)) > limite:
+        return limite + 1
+
+    anterior2 = None
+    anterior = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        atual = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            custo = a[i - 1] != b[j - 1]
+            atual[j] = min(anterior[j] + 1, atual[j - 1] + 1, anterior[j - 1] + custo)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                atual[j] = min(atual[j], anterior2[j - 2] + 1)
+        if min(atual) > limite:
+            return limite + 1
+        anterior2, anterior = anterior, atual
+    return anterior[-1]
+
+
+def _intersecao(conjuntos):
+    if len(conjuntos) == 1:
+        return conjuntos[0]
+    conjuntos = sorted(conjuntos, key=len)
+    return conjuntos[0].intersection(*conjuntos[1:])
+
+
+# ---------------------------------------------------------
+# ÍNDICE
+# ---------------------------------------------------------
+class IndiceProdutos:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._produtos = {}                  # id -> dados exibidos no resultado
+        self._descricoes = {}                # id -> descrição (para reindexar)
+        self._termos_produto = {}            # id -> {termo: peso}
+        self._postings = {}                  # termo -> {peso: {ids}}
+        self._ordenados = []                 # termos em ordem, para prefixo
+        self._variantes = defaultdict(set)   # deleção -> termos
+        self._recarga = threading.Lock()     # uma recarga por vez
+        self._durante_recarga = None         # escritas a reaplicar: [(método, args)]
+        self.pronto = False
+
+    # --- escrita ---
+
+    def carregar(self, db: Session):
+        """Reconstrói o índice a partir de Produtos (troca atômica no fim)."""
+        with self._recarga:
+            with self._lock:
+                self._durante_recarga = []
+            try:
+                p = models.Produto
+                novo = IndiceProdutos()
+                linhas = db.execute(
+                    select(p.IDProduto, p.Nome, p.Categoria, p.Descricao, p.Preco)
+                    .execution_options(yield_per=5000)
+                )
+                for id_produto, nome, categoria, descricao, preco in linhas:
+                    novo._indexar(id_produto, nome, categoria, descricao, preco, ordenar=False)
+                novo._ordenados = sorted(novo._postings)
+
+                with self._lock:
+                    # Escritas feitas enquanto a consulta rodava (reaplicar é
+                    # idempotente, mesmo que a consulta já as tenha visto)
+                    for metodo, args in self._durante_recarga:
+                        getattr(novo, metodo)(*args)
+                    for atributo in (
+                        "_produtos", "_descricoes", "_termos_produto", "_postings", "_ordenados", "_variantes"
+                    ):
+                        setattr(self, atributo, getattr(novo, atributo))
+                    self.pronto = True
+            finally:
+                with self._lock:
+                    self._durante_recarga = None
+
+    def indexar(self, id_produto: int, nome, categoria, preco, descricao=None):
+        """Inclui ou atualiza um produto. ``descricao=None`` mantém a atual."""
+        with self._lock:
+            self._anotar("indexar", id_produto, nome, categoria, preco, descricao)
+            if descricao is None:
+                descricao = self._descricoes.get(id_produto)
+            self._remover(id_produto)
+            self._indexar(id_produto, nome, categoria, descricao, preco)
+
+    def remover(self, id_produto: int):
+        with self._lock:
+            self._anotar("remover", id_produto)
+            self._remover(id_produto)
+
+    def atualizar_precos(self, precos: dict):
+        """Só o preço (id -> preço): não mexe nos termos, sem reindexar."""
+        with self._lock:
+            self._anotar("atualizar_precos", precos)
+            for id_produto, preco in precos.items():
+                produto = self._produtos.get(id_produto)
+                if produto is not None:
+                    produto["preco"] = preco
+
+    def _anotar(self, metodo, *args):
+        # Com o lock: a recarga em andamento reaplica a escrita no índice novo
+        if self._durante_recarga is not None:
+            self._durante_recarga.append((metodo, args))
+
+    def _indexar(self, id_produto, nome, categoria, descricao, preco, ordenar=True):
+        pesos = {}
+        for campo, texto in (("nome", nome), ("categoria", categoria), ("descricao", descricao)):
+            for termo in termos(texto):
+                pesos[termo] = max(pesos.get(termo, 0), PESOS_CAMPOS[campo])
+
+        for termo, peso in pesos.items():
+            posting = self._postings.get(termo)
+            if posting is None:
+                posting = self._postings[termo] = {}
+                for variante in _delecoes(termo, _max_erros(termo)):
+                    self._variantes[variante].add(termo)
+                if ordenar:
+                    bisect.insort(self._ordenados, termo)
+            posting.setdefault(peso, set()).add(id_produto)
+
+        self._termos_produto[id_produto] = pesos
+        self._descricoes[id_produto] = descricao
+        self._produtos[id_produto] = {"id": id_produto, "nome": nome, "categoria": categoria, "preco": preco}
+
+    def _remover(self, id_produto):
+        for termo, peso in self._termos_produto.pop(id_produto, {}).items():
+            posting = self._postings[termo]
+            posting[peso].discard(id_produto)
+            if not posting[peso]:
+                del posting[peso]
+            if posting:
+                continue
+            del self._postings[termo]
+            del self._ordenados[bisect.bisect_left(self._ordenados, termo)]
+            for variante in _delecoes(termo, _max_erros(termo)):
+                termos_variante = self._variantes[variante]
+                termos_variante.discard(termo)
+                if not termos_variante:
+                    del self._variantes[variante]
+        self._descricoes.pop(id_produto, None)
+        self._produtos.pop(id_produto, None)
+
+    # --- consulta ---
+
+    def buscar(self, consulta: str, limite: int = 20) -> list:
+        termos_consulta = list(dict.fromkeys(termos(consulta)))[:MAX_TERMOS_CONSULTA]
+        if not termos_consulta:
+            return []
+
+        with self._lock:
+            # Conjuntos de cada termo, do termo mais raro para o mais comum
+            casamentos = sorted(
+                (self._casamentos(t) for t in termos_consulta),
+                key=lambda c: sum(len(ids) for _, ids in c),
+            )
+
+            # Produtos que casam com todos os termos: parte do termo mais
+            # raro e só intersecta (custo proporcional ao menor conjunto)
+            casam = set().union(*(ids for _, ids in casamentos[0])) if len(casamentos) > 1 else None
+            for casamento in casamentos[1:]:
+                casam = set().union(*(casam & ids for _, ids in casamento))
+                if not casam:
+                    return []
+
+            # O termo mais raro já está contido em ``casam`` por construção
+            niveis = [self._niveis(casamentos[0])]
+            niveis += [self._niveis(casamento, casam) for casamento in casamentos[1:]]
+
+            # Combinações de níveis, da maior soma para a menor; empates por id
+            combinacoes = defaultdict(list)
+            for combinacao in product(*niveis):
+                combinacoes[sum(v for v, _ in combinacao)].append([ids for _, ids in combinacao])
+
+            resultado = []
+            for total in sorted(combinacoes, reverse=True):
+                grupos = [_intersecao(conjuntos) for conjuntos in combinacoes[total]]
+                grupo = grupos[0] if len(grupos) == 1 else set().union(*grupos)
+                for id_produto in heapq.nsmallest(limite - len(resultado), grupo):
+                    resultado.append({**self._produtos[id_produto], "pontuacao": total / 10})
+                if len(resultado) >= limite:
+                    break
+            return resultado
+
+    def _casamentos(self, termo: str) -> list:
+        """(pontuação, {ids}) de cada termo do índice que casa com ``termo``.
+
+        Os conjuntos são os do próprio índice (não copiados).
+        """
+        casamentos = []
+
+        def somar(termo_indice, qualidade):
+            casamentos.extend((peso * qualidade, ids) for peso, ids in self._postings[termo_indice].items())
+
+        if termo in self._postings:
+            somar(termo, EXATO)
+
+        if len(termo) >= MIN_PREFIXO:
+            inicio = bisect.bisect_right(self._ordenados, termo)
+            for termo_indice in self._ordenados[inicio:inicio + MAX_EXPANSOES]:
+                if not termo_indice.startswith(termo):
+                    break
+                somar(termo_indice, PREFIXO)
+
+        erros = _max_erros(termo)
+        if erros:
+            vizinhos = set()
+            for variante in _delecoes(termo, erros):
+                vizinhos.update(self._variantes.get(variante, ()))
+            vizinhos.discard(termo)
+            for termo_indice in vizinhos:
+                if _distancia(termo, termo_indice, erros) <= erros:
+                    somar(termo_indice, APROXIMADO)
+
+        return casamentos
+
+    @staticmethod
+    def _niveis(casamentos, casam=None) -> list:
+        """Agrupa por pontuação (só entre os ids de ``casam``, se dado).
+
+        Lista de (pontuação, {ids}) em ordem decrescente; cada produto fica
+        só no nível da sua melhor pontuação.
+        """
+        por_valor = defaultdict(set)
+        for valor, ids in casamentos:
+            por_valor[valor] |= ids if casam is None else ids & casam
+
+        niveis, vistos = [], set()
+        for valor in sorted(por_valor, reverse=True):
+            ids = por_valor[valor] - vistos if vistos else por_valor[valor]
+            if ids:
+                niveis.append((valor, ids))
+                vistos |= ids
+        return niveis
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "pronto": self.pronto,
+                "produtos": len(self._produtos),
+                "termos": len(self._postings),
+                "variantes": len(self._variantes),
+            }
+
+
+indice = IndiceProdutos()
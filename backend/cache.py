@@ -0,0 +1,268 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import Request, Response
+
+from . import config, respostas
+
+
+# ---------------------------------------------------------
+# CACHE DO CATÁLOGO DE PRODUTOS
+# ---------------------------------------------------------
+# Cada entrada guarda um conjunto de "tags" que dizem de que ela depende:
+#   produto:<id>     -> a entrada contém esse produto
+#   categoria:<nome> -> listagem filtrada por essa categoria
+#   catalogo         -> listagem sem filtro (muda quando entra produto novo)
+# As escritas invalidam só as tags que afetam, em vez de limpar tudo.
+#
+# Com réplicas de leitura, uma carga logo depois da escrita pode vir de uma
+# réplica que ainda não a recebeu; por isso as tags são invalidadas de novo
+# ``reinvalidar_apos`` segundos depois (o atraso máximo aceito).
+
+class Entrada:
+    __slots__ = ("valor", "corpo", "etag", "expira_em", "tags")
+
+    def __init__(self, valor, corpo, etag, expira_em, tags):
+        self.valor = valor
+        self.corpo = corpo      # JSON já renderizado: um hit não serializa nada
+        self.etag = etag
+        self.expira_em = expira_em
+        self.tags = tags
+
+
+class CacheCatalogo:
+    def __init__(self, max_itens: int = 256, ttl: float = 60.0, reinvalidar_apos: float = 0.0):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self.reinvalidar_apos = reinvalidar_apos
+        self._pendentes: list[tuple[float, tuple]] = []  # (quando, tags), em ordem
+        self._lock = threading.Lock()
+        self._itens: "OrderedDict[tuple, Entrada]" = OrderedDict()
+        self._por_tag: dict[str, set] = {}
+        self._geracao = 0
+        self.modificado_em = time.time()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirados = 0
+        self.invalidacoes = 0
+
+    def obter(self, chave: tuple, carregar, tags=()):
+        """Devolve a entrada da chave, chamando ``carregar()`` no miss.
+
+        ``tags`` fixas da entrada; ids de produto presentes no valor
+        carregado (campo ``id``) viram tags ``produto:<id>`` automaticamente.
+        """
+        entrada, geracao = self._consultar(chave)
+        if entrada is not None:
+            return entrada
+        return self._guardar(chave, carregar(), tags, geracao)
+
+    async def obter_async(self, chave: tuple, carregar, tags=()):
+        """Igual a ``obter``, mas ``carregar`` é uma corrotina."""
+        entrada, geracao = self._consultar(chave)
+        if entrada is not None:
+            return entrada
+        return self._guardar(chave, await carregar(), tags, geracao)
+
+    def _consultar(self, chave):
+        agora = time.monotonic()
+        with self._lock:
+            while self._pendentes and self._pendentes[0][0] <= agora:
+                self._invalidar(self._pendentes.pop(0)[1])
+            entrada = self._itens.get(chave)
+            if entrada is not None:
+                if entrada.expira_em > agora:
+                    self._itens.move_to_end(chave)
+                    self.hits += 1
+                    return entrada, None
+                self._remover(chave)
+                self.expirados += 1
+            self.misses += 1
+            return None, self._geracao
+
+    def _guardar(self, chave, valor, tags, geracao):
+        corpo = respostas.renderizar(valor)
+        entrada = Entrada(
+            valor, corpo, _etag(corpo), time.monotonic() + self.ttl, set(tags) | _tags_produtos(valor)
+        )
+
+        with self._lock:
+            # Uma escrita no meio da carga pode ter deixado o valor velho
+            if geracao == self._geracao:
+                self._itens[chave] = entrada
+                for tag in entrada.tags:
+                    self._por_tag.setdefault(tag, set()).add(chave)
+                while len(self._itens) > self.max_itens:
+                    self._remover(next(iter(self._itens)))
+                    self.evictions += 1
+
+        return entrada
+
+    def invalidar(self, *tags: str):
+        with self._lock:
+            self._invalidar(tags)
+            if self.reinvalidar_apos:
+                self._pendentes.append((time.monotonic() + self.reinvalidar_apos, tags))
+
+    def _invalidar(self, tags):
+        self._geracao += 1
+        self.invalidacoes += 1
+        self.modificado_em = time.time()
+        for tag in tags:
+            for chave in list(self._por_tag.get(tag, ())):
+                self._remover(chave)
+
+    def limpar(self):
+        with self._lock:
+            self._geracao += 1
+            self.modificado_em = time.time()
+            self._itens.clear()
+            self._por_tag.clear()
+            self._pendentes.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "itens": len(self._itens),
+                "max_itens": self.max_itens,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_acerto": round(self.hits / consultas, 4) if consultas else None,
+                "evictions": self.evictions,
+                "expirados": self.expirados,
+                "invalidacoes": self.invalidacoes,
+            }
+
+    def _remover(self, chave):
+        entrada = self._itens.pop(chave, None)
+        if entrada is None:
+            return
+        for tag in entrada.tags:
+            chaves = self._por_tag.get(tag)
+            if chaves is not None:
+                chaves.discard(chave)
+                if not chaves:
+                    del self._por_tag[tag]
+
+
+def _etag(corpo: bytes) -> str:
+    return '"' + hashlib.sha1(corpo).hexdigest() + '"'
+
+
+def _tags_produtos(valor) -> set:
+    if isinstance(valor, dict):
+        valor = valor.get("produtos", [valor])
+    if not isinstance(valor, list):
+        return set()
+    return {f"produto:{item['id']}" for item in valor if isinstance(item, dict) and "id" in item}
+
+
+catalogo = CacheCatalogo(
+    max_itens=int(os.getenv("CACHE_PRODUTOS_MAX", "256")),
+    ttl=float(os.getenv("CACHE_PRODUTOS_TTL", "60")),
+    reinvalidar_apos=config.DB_REPLICA_ATRASO_MAX_S if config.DB_REPLICAS else 0.0,
+)
+
+
+# ---------------------------------------------------------
+# VALOR ÚNICO COM TTL (ex.: resumo do painel)
+# ---------------------------------------------------------
+class ValorTemporario:
+    """Um valor recalculado no máximo a cada ``ttl`` segundos.
+
+    Recálculo single-flight: quando expira, só a primeira requisição roda
+    ``calcular``; as que chegam enquanto isso esperam e levam o mesmo
+    resultado, em vez de cada uma refazer as consultas.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._valor = None
+        self._expira_em = 0.0
+        self._lock = None  # asyncio.Lock, criado no loop que o usar
+
+        self.calculos = 0
+
+    async def obter(self, calcular):
+        if time.monotonic() < self._expira_em:
+            return self._valor
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # Outra requisição pode ter recalculado enquanto esta esperava
+            if time.monotonic() < self._expira_em:
+                return self._valor
+            self._valor = await calcular()
+            self._expira_em = time.monotonic() + self.ttl
+            self.calculos += 1
+            return self._valor
+
+    def invalidar(self):
+        self._expira_em = 0.0
+
+
+# ---------------------------------------------------------
+# INVALIDAÇÃO (chamada pelos caminhos de escrita)
+# ---------------------------------------------------------
+def produto_criado(categoria, produto_id: int = None):
+    # Um GET anterior do mesmo id pode ter guardado o 404 (entrada None,
+    # com a tag produto:<id>)
+    tags = ["catalogo", f"categoria:{categoria}"]
+    if produto_id is not None:
+        tags.append(f"produto:{produto_id}")
+    catalogo.invalidar(*tags)
+
+
+def produto_alterado(produto_id: int, categoria_nova=None):
+    tags = [f"produto:{produto_id}"]
+    if categoria_nova is not None:
+        tags.append(f"categoria:{categoria_nova}")
+    catalogo.invalidar(*tags)
+
+
+def produtos_alterados(produto_ids):
+    catalogo.invalidar(*[f"produto:{i}" for i in produto_ids])
+
+
+# ---------------------------------------------------------
+# RESPOSTAS CONDICIONAIS (ETag / Last-Modified)
+# ---------------------------------------------------------
+def responder(request: Request, entrada: Entrada):
+    """Devolve o corpo da entrada ou um 304 se o cliente já o tem."""
+    cabecalhos = {
+        "ETag": entrada.etag,
+        "Last-Modified": formatdate(catalogo.modificado_em, usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+
+    if _nao_modificado(request, entrada):
+        return Response(status_code=304, headers=cabecalhos)
+
+    return respostas.bruta(entrada.corpo, headers=cabecalhos)
+
+
+def _nao_modificado(request: Request, entrada: Entrada) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etags = {e.strip().removeprefix("W/") for e in if_none_match.split(",")}
+        return "*" in etags or entrada.etag in etags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            desde = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(catalogo.modificado_em) <= desde
+
+    return False
@@ -0,0 +1,146 @@
+import os
+import secrets
+
+from dotenv import load_dotenv
+
+# Variáveis de ambiente (ou de um arquivo .env no diretório de execução)
+load_dotenv()
+
+
+def _bool(nome: str, padrao: bool) -> bool:
+    valor = os.getenv(nome)
+    if valor is None:
+        return padrao
+    return valor.strip().lower() in ("1", "true", "sim", "yes", "on")
+
+
+# ---------------------------------------------------------
+# BANCO (MySQL)
+# ---------------------------------------------------------
+DB_USER = os.getenv("DB_USER", "david")
+DB_PASS = os.getenv("DB_PASS", "beckgerencia!")
+DB_HOST = os.getenv("DB_HOST", "26.130.166.26")
+DB_PORT = int(os.getenv("DB_PORT", "3306"))
+DB_NAME = os.getenv("DB_NAME", "alfaiataria")
+
+# URL SQLAlchemy completa; se definida, substitui as DB_* acima (ex.: um
+# MySQL local ou sqlite:///bench.db para os benchmarks)
+DATABASE_URL = os.getenv("DATABASE_URL")
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+# MongoDB (database_mongo.py)
+MONGO_URL = os.getenv("MONGO_URL", "mongodb://localhost:27017/")
+MONGO_DB = os.getenv("MONGO_DB", "alfaiataria")
+
+# Endpoints async sobre o engine assíncrono (aiomysql); 0 = sessões síncronas
+# executadas no threadpool
+DB_ASYNC = _bool("DB_ASYNC", False)
+
+# Pool de conexões (vale para o engine síncrono e para o assíncrono)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = _bool("DB_POOL_PRE_PING", True)
+# Log de todo SQL (muito verboso; use só para depurar)
+DB_ECHO = _bool("DB_ECHO", False)
+# Consultas acima disso vão para o log "metricas" (ver metricas.py)
+DB_CONSULTA_LENTA_MS = float(os.getenv("DB_CONSULTA_LENTA_MS", "200"))
+
+# Réplicas de leitura (ver replicas.py): URLs SQLAlchemy separadas por
+# vírgula. Vazio = tudo no primário.
+DB_REPLICAS = [url.strip() for url in os.getenv("DB_REPLICAS", "").split(",") if url.strip()]
+# Réplica com atraso maior que isso sai do rodízio (leitura vai ao primário)
+DB_REPLICA_ATRASO_MAX_S = float(os.getenv("DB_REPLICA_ATRASO_MAX_S", "5"))
+# Intervalo entre as medições do atraso de cada réplica
+DB_REPLICA_VERIFICACAO_S = float(os.getenv("DB_REPLICA_VERIFICACAO_S", "5"))
+# Depois de uma escrita, o cliente lê do primário por esse tempo
+DB_PRIMARIO_APOS_ESCRITA_S = float(os.getenv("DB_PRIMARIO_APOS_ESCRITA_S", "10"))
+
+
+# ---------------------------------------------------------
+# SENHAS (scrypt)
+# ---------------------------------------------------------
+HASH_SCRYPT_N = int(os.getenv("HASH_SCRYPT_N", str(2 ** 14)))
+HASH_SCRYPT_R = int(os.getenv("HASH_SCRYPT_R", "8"))
+HASH_SCRYPT_P = int(os.getenv("HASH_SCRYPT_P", "1"))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 2)))
+HASH_FILA_MAX = int(os.getenv("HASH_FILA_MAX", "64"))
+HASH_TIMEOUT = float(os.getenv("HASH_TIMEOUT", "10"))
+
+
+# ---------------------------------------------------------
+# SESSÕES (tokens JWT, ver autenticacao.py)
+# ---------------------------------------------------------
+# Sem JWT_SECRET, a chave é sorteada na subida: os tokens caem a cada
+# reinício e não valem entre workers. Em produção, defina-a no .env.
+JWT_SECRET = os.getenv("JWT_SECRET") or secrets.token_urlsafe(32)
+JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
+JWT_EXPIRES_MINUTES = int(os.getenv("JWT_EXPIRES_MINUTES", "60"))
+
+
+# ---------------------------------------------------------
+# RESPOSTAS JSON (ver respostas.py)
+# ---------------------------------------------------------
+# 1 = serializa com orjson (pip install orjson)
+API_JSON_RAPIDO = _bool("API_JSON_RAPIDO", False)
+
+
+# ---------------------------------------------------------
+# DIA COMERCIAL (rollups, relatórios e painel)
+# ---------------------------------------------------------
+# As datas são gravadas em UTC; "o dia" das vendas é o deste fuso (IANA)
+FUSO_HORARIO = os.getenv("FUSO_HORARIO", "America/Sao_Paulo")
+
+
+# ---------------------------------------------------------
+# VENDAS ASSÍNCRONAS (ver fila_vendas.py)
+# ---------------------------------------------------------
+# 1 = POST /api/vendas grava a venda num diário local e responde 202; um
+# drenador em segundo plano a registra no MySQL
+VENDAS_ASSINCRONAS = _bool("VENDAS_ASSINCRONAS", False)
+VENDAS_DIARIO = os.getenv("VENDAS_DIARIO", "vendas_pendentes.db")
+# Vendas por transação na drenagem (até crud.MAX_VENDAS_LOTE)
+VENDAS_LOTE = int(os.getenv("VENDAS_LOTE", "200"))
+VENDAS_DRENO_INTERVALO_S = float(os.getenv("VENDAS_DRENO_INTERVALO_S", "0.5"))
+# Falhas de uma mesma venda antes de recusá-la (só as que não são transitórias:
+# conexão, deadlock e lock wait timeout não contam)
+VENDAS_MAX_TENTATIVAS = int(os.getenv("VENDAS_MAX_TENTATIVAS", "5"))
+# Vendas já registradas ficam no diário (para consulta pela chave) por esse tempo
+VENDAS_DIARIO_RETENCAO_H = float(os.getenv("VENDAS_DIARIO_RETENCAO_H", "24"))
+
+
+# ---------------------------------------------------------
+# PAINEL (GET /api/dashboard, ver dashboard.py)
+# ---------------------------------------------------------
+# Por quanto tempo o resumo calculado é servido a todos os painéis abertos
+DASHBOARD_TTL_S = float(os.getenv("DASHBOARD_TTL_S", "5"))
+# Produtos com estoque até esse valor entram em "estoque baixo"
+DASHBOARD_ESTOQUE_BAIXO = int(os.getenv("DASHBOARD_ESTOQUE_BAIXO", "5"))
+
+
+# ---------------------------------------------------------
+# EVENTOS DE ESTOQUE (SSE, ver eventos.py)
+# ---------------------------------------------------------
+# Eventos na fila de cada cliente; quem passar disso é desconectado
+EVENTOS_FILA_MAX = int(os.getenv("EVENTOS_FILA_MAX", "100"))
+# Últimos eventos guardados para quem reconecta com Last-Event-ID
+EVENTOS_HISTORICO = int(os.getenv("EVENTOS_HISTORICO", "256"))
+EVENTOS_HEARTBEAT_S = float(os.getenv("EVENTOS_HEARTBEAT_S", "15"))
+
+
+# ---------------------------------------------------------
+# RAZÃO DE ESTOQUE (snapshots, ver movimentacoes.py)
+# ---------------------------------------------------------
+# O corte de cada snapshot fica esse tempo no passado, para não deixar de
+# fora movimentações de transações ainda abertas
+ESTOQUE_SNAPSHOT_MARGEM_S = int(os.getenv("ESTOQUE_SNAPSHOT_MARGEM_S", "300"))
+
+
+# ---------------------------------------------------------
+# ARQUIVO DE VENDAS (python -m backend.arquivamento)
+# ---------------------------------------------------------
+# Meses fechados que ficam em Vendas/ItensVenda; os anteriores vão para o arquivo
+VENDAS_ARQUIVO_MESES = int(os.getenv("VENDAS_ARQUIVO_MESES", "12"))
+# Vendas movidas por transação
+VENDAS_ARQUIVO_LOTE = int(os.getenv("VENDAS_ARQUIVO_LOTE", "1000"))
@@ -1,12 +1,58 @@
-from sqlalchemy.orm import Session
-from . import models, schemas, security
+from typing import Optional
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, joinedload
+from . import models, schemas, security, cache, relatorios, estoque, replicacao, busca, eventos, movimentacoes
 
 
 # ---------------------------------------------------------
 # PRODUTOS (MySQL)
 # ---------------------------------------------------------
-def listar_produtos(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Produto).offset(skip).limit(limit).all()
+# Campos expostos pela API -> colunas da tabela Produtos
+CAMPOS_PRODUTO = {
+    "id": models.Produto.IDProduto,
+    "nome": models.Produto.Nome,
+    "categoria": models.Produto.Categoria,
+    "descricao": models.Produto.Descricao,
+    "preco": models.Produto.Preco,
+    "estoque": models.Produto.Estoque,
+}
+CAMPOS_PRODUTO_PADRAO = ("id", "nome", "categoria", "preco", "estoque")
+
+
+def _como_dicts(query):
+    # Colunas já rotuladas com os nomes da API: sem objeto ORM nem schema por linha
+    return [dict(row._mapping) for row in query]
+
+
+def listar_produtos(
+    db: Session,
+    apos: Optional[int] = None,
+    limit: Optional[int] = 100,
+    categoria: Optional[str] = None,
+    campos=CAMPOS_PRODUTO_PADRAO,
+):
+    """Lista produtos com paginação por chave (IDProduto > apos).
+
+    Seleciona só as colunas pedidas em ``campos`` (o id vai sempre, pois é
+    o cursor) e devolve dicts já no formato da API. ``limit=None`` traz
+    tudo.
+    """
+    if "id" not in campos:
+        campos = ("id", *campos)
+
+    query = db.query(*[CAMPOS_PRODUTO[c].label(c) for c in campos])
+
+    if categoria is not None:
+        query = query.filter(models.Produto.Categoria == categoria)
+    if apos is not None:
+        query = query.filter(models.Produto.IDProduto > apos)
+
+    query = query.order_by(models.Produto.IDProduto)
+    if limit is not None:
+        query = query.limit(limit)
+
+    return _como_dicts(query)
 
 
 def criar_produto(db: Session, produto: schemas.ProdutoBase):
@@ -18,8 +64,13 @@ def criar_produto(db: Session, produto: schemas.ProdutoBase):
         Estoque=produto.estoque or 0
     )
     db.add(db_obj)
+    db.flush()
+    movimentacoes.registrar(db, db_obj.IDProduto, None, db_obj.Estoque)
     db.commit()
     db.refresh(db_obj)
+    cache.produto_criado(db_obj.Categoria, db_obj.IDProduto)
+    busca.indice.indexar(db_obj.IDProduto, db_obj.Nome, db_obj.Categoria, db_obj.Preco, db_obj.Descricao)
+    eventos.estoque_alterado(db_obj.IDProduto, db_obj.Nome, None, db_obj.Estoque)
     return db_obj
 
 
@@ -30,20 +81,30 @@ def buscar_produto(db: Session, id_produto: int):
 def atualizar_produto(db: Session, id_produto: int, produto: schemas.ProdutoBase):
     db_obj = buscar_produto(db, id_produto)
     if db_obj:
+        estoque_anterior = db_obj.Estoque
         db_obj.Nome = produto.nome
         db_obj.Categoria = produto.categoria
         db_obj.Preco = produto.preco
         db_obj.Estoque = produto.estoque
+        movimentacoes.registrar(db, id_produto, estoque_anterior, db_obj.Estoque)
         db.commit()
         db.refresh(db_obj)
+        cache.produto_alterado(id_produto, db_obj.Categoria)
+        busca.indice.indexar(id_produto, db_obj.Nome, db_obj.Categoria, db_obj.Preco, db_obj.Descricao)
+        eventos.estoque_alterado(id_produto, db_obj.Nome, estoque_anterior, db_obj.Estoque)
     return db_obj
 
 
 def remover_produto(db: Session, id_produto: int):
     db_obj = buscar_produto(db, id_produto)
     if db_obj:
+        nome = db_obj.Nome
+        movimentacoes.apagar(db, id_produto)
         db.delete(db_obj)
         db.commit()
+        cache.produto_alterado(id_produto)
+        busca.indice.remover(id_produto)
+        eventos.produto_removido(id_produto, nome)
     return db_obj
 
 
@@ -51,7 +112,8 @@ def remover_produto(db: Session, id_produto: int):
 # GRUPOS
 # ---------------------------------------------------------
 def listar_grupos(db: Session):
-    return db.query(models.GrupoUsuario).all()
+    g = models.GrupoUsuario
+    return _como_dicts(db.query(g.IDGrupo.label("id"), g.NomeGrupo.label("nome"), g.Descricao.label("descricao")))
 
 
 def buscar_grupo_por_id(db: Session, id_grupo: int):
@@ -62,7 +124,11 @@ def buscar_grupo_por_id(db: Session, id_grupo: int):
 # USUÁRIOS (MySQL)
 # ---------------------------------------------------------
 def listar_usuarios(db: Session):
-    return db.query(models.Usuario).all()
+    """Usuários no formato de schemas.UsuarioOut (sem SenhaHash)."""
+    u = models.Usuario
+    return _como_dicts(db.query(
+        u.IDUsuario.label("id"), u.Nome.label("nome"), u.Email.label("email"), u.IDGrupo.label("grupo_id")
+    ))
 
 
 def criar_usuario(db: Session, usuario: schemas.UsuarioCreate):
@@ -84,40 +150,191 @@ def criar_usuario(db: Session, usuario: schemas.UsuarioCreate):
 
 
 def buscar_usuario_por_email(db: Session, email: str):
-    return db.query(models.Usuario).filter(models.Usuario.Email == email).first()
+    # Com o grupo: o login grava o nome dele no token
+    return (
+        db.query(models.Usuario)
+        .options(joinedload(models.Usuario.grupo))
+        .filter(models.Usuario.Email == email)
+        .first()
+    )
 
 
 def buscar_usuario_por_id(db: Session, id_usuario: int):
     return db.query(models.Usuario).filter(models.Usuario.IDUsuario == id_usuario).first()
 
 
+def atualizar_senha_hash(db: Session, id_usuario: int, senha_hash: str):
+    db.query(models.Usuario).filter(models.Usuario.IDUsuario == id_usuario).update(
+        {models.Usuario.SenhaHash: senha_hash}, synchronize_session=False
+    )
+    db.commit()
+
+
 # ---------------------------------------------------------
 # VENDAS
 # ---------------------------------------------------------
+MAX_VENDAS_LOTE = 500
+
+
+def _linhas_itens(id_venda: int, itens):
+    return [
+        {
+            "IDVenda": id_venda,
+            "IDProduto": item.id,
+            "Quantidade": item.quantidade,
+            "PrecoUnitario": item.preco
+        }
+        for item in itens
+    ]
+
+
 def criar_venda(db: Session, venda: schemas.VendaCreate):
+    """Registra a venda numa transação; levanta estoque.EstoqueInsuficiente."""
+
+    # Baixa o estoque primeiro (ver estoque.py sobre a ordem das travas)
+    try:
+        saldo = estoque.reservar(db, venda.itens, com_saldo=bool(eventos.estoque.assinantes))
+    except Exception:
+        db.rollback()
+        raise
 
     # Calcula total
     total = sum(item.preco * item.quantidade for item in venda.itens)
 
-    # Cria venda principal
+    # Cria venda principal (flush só para obter o IDVenda, sem commit)
     nova_venda = models.Venda(
         IDUsuarioCliente=venda.id_usuario,
         IDUsuarioAtendente=venda.id_usuario,
         Total=total
     )
     db.add(nova_venda)
-    db.commit()
-    db.refresh(nova_venda)
+    db.flush()
 
-    # Cria itens da venda
-    for item in venda.itens:
-        novo_item = models.ItemVenda(
-            IDVenda=nova_venda.IDVenda,
-            IDProduto=item.id,
-            Quantidade=item.quantidade,
-            PrecoUnitario=item.preco
-        )
-        db.add(novo_item)
+    # Cria itens da venda num único INSERT multi-linha
+    if venda.itens:
+        db.execute(insert(models.ItemVenda), _linhas_itens(nova_venda.IDVenda, venda.itens))
+
+    relatorios.registrar(db, [
+        (relatorios.dia_comercial(nova_venda.DataVenda), nova_venda.IDUsuarioAtendente, venda.itens)
+    ])
+    replicacao.enfileirar(db, [nova_venda.IDVenda])
 
     db.commit()
+
+    cache.produtos_alterados({item.id for item in venda.itens})
+    eventos.estoque_vendido(db, saldo)
     return nova_venda
+
+
+def validar_venda(venda: schemas.VendaCreate, usuarios: set = None, produtos: set = None):
+    """Devolve o erro da venda ou None; sem os conjuntos, não checa existência."""
+    if not venda.itens:
+        return "Venda sem itens."
+    if usuarios is not None and venda.id_usuario not in usuarios:
+        return f"Usuário {venda.id_usuario} não encontrado."
+    for item in venda.itens:
+        if item.quantidade <= 0:
+            return f"Quantidade inválida para o produto {item.id}."
+        if item.preco < 0:
+            return f"Preço inválido para o produto {item.id}."
+        if produtos is not None and item.id not in produtos:
+            return f"Produto {item.id} não encontrado."
+    return None
+
+
+def criar_vendas_lote(db: Session, vendas: list[schemas.VendaCreate], chaves: list[str] = None):
+    """Registra várias vendas numa única transação.
+
+    Retorna um resultado por venda, na ordem recebida, com o IDVenda
+    gerado ou o erro que impediu o registro.
+
+    ``chaves`` (uma por venda) são as chaves de idempotência do registro
+    assíncrono (fila_vendas.py): entram em ChavesVenda na mesma transação, e
+    uma falha ao gravar é levantada, para o lote ser tentado de novo.
+    """
+    resultados = [{"indice": i, "id_venda": None, "erro": None} for i in range(len(vendas))]
+
+    # Valida tudo com duas consultas, em vez de uma por venda/item
+    ids_usuarios = {v.id_usuario for v in vendas}
+    ids_produtos = {item.id for v in vendas for item in v.itens}
+
+    usuarios = {
+        row[0] for row in
+        db.query(models.Usuario.IDUsuario).filter(models.Usuario.IDUsuario.in_(ids_usuarios))
+    } if ids_usuarios else set()
+    produtos = {
+        row[0] for row in
+        db.query(models.Produto.IDProduto).filter(models.Produto.IDProduto.in_(ids_produtos))
+    } if ids_produtos else set()
+
+    validas = []
+    for i, venda in enumerate(vendas):
+        erro = validar_venda(venda, usuarios, produtos)
+        if erro:
+            resultados[i]["erro"] = erro
+        else:
+            validas.append((i, venda))
+
+    if not validas:
+        return resultados
+
+    try:
+        # Reserva o estoque do lote inteiro antes de gravar qualquer venda
+        faltas, saldo = estoque.reservar_lote(db, [venda.itens for _, venda in validas])
+        reservadas = []
+        for (i, venda), falta in zip(validas, faltas):
+            if falta:
+                resultados[i]["erro"] = estoque.descrever(falta)
+                resultados[i]["faltas"] = falta
+            else:
+                reservadas.append((i, venda))
+        validas = reservadas
+
+        if not validas:
+            db.rollback()
+            return resultados
+
+        cabecalhos = [
+            models.Venda(
+                IDUsuarioCliente=venda.id_usuario,
+                IDUsuarioAtendente=venda.id_usuario,
+                Total=sum(item.preco * item.quantidade for item in venda.itens)
+            )
+            for _, venda in validas
+        ]
+        db.add_all(cabecalhos)
+        db.flush()
+
+        itens = []
+        for cabecalho, (_, venda) in zip(cabecalhos, validas):
+            itens.extend(_linhas_itens(cabecalho.IDVenda, venda.itens))
+        db.execute(insert(models.ItemVenda), itens)
+
+        relatorios.registrar(db, [
+            (relatorios.dia_comercial(cabecalho.DataVenda), cabecalho.IDUsuarioAtendente, venda.itens)
+            for cabecalho, (_, venda) in zip(cabecalhos, validas)
+        ])
+
+        ids = [cabecalho.IDVenda for cabecalho in cabecalhos]
+        replicacao.enfileirar(db, ids)
+        if chaves is not None:
+            db.execute(insert(models.ChaveVenda), [
+                {"Chave": chaves[i], "IDVenda": id_venda} for id_venda, (i, _) in zip(ids, validas)
+            ])
+        db.commit()
+
+    except Exception as e:
+        db.rollback()
+        if chaves is not None:
+            raise
+        for i, _ in validas:
+            resultados[i]["erro"] = f"Erro ao gravar lote: {e}"
+        return resultados
+
+    cache.produtos_alterados({item.id for _, venda in validas for item in venda.itens})
+    eventos.estoque_vendido(db, saldo)
+
+    for id_venda, (i, _) in zip(ids, validas):
+        resultados[i]["id_venda"] = id_venda
+
+    return resultados
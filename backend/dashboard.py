@@ -0,0 +1,102 @@
+"""Resumo do painel da gerência (GET /api/dashboard).
+
+Tudo sai de consultas agregadas, sem trazer as listas de produtos e
+usuários para contar fora do banco:
+
+* produtos    quantidade, estoque total (como ``qtd_produtos_disponivel()``)
+              e quantos estão com estoque baixo, numa só varredura
+* usuarios    total e por grupo
+* vendas_hoje quantidade e receita de hoje (dia comercial, como nos
+              relatórios), com intervalo em DataVenda (usa
+              idx_vendas_data; ``DATE(DataVenda) = ...`` não usaria)
+* estoque_baixo / avisos  os primeiros produtos com estoque baixo e os
+              últimos avisos de AvisosEstoque
+
+As datas saem em ISO com "Z" (são UTC), para o navegador convertê-las.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from . import config, models, relatorios
+
+LIMITE_LISTAS = 10
+
+
+def _produtos(db: Session, limite: int):
+    p = models.Produto
+    quantidade, estoque, baixo = db.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(p.Estoque), 0),
+            func.coalesce(func.sum(case((p.Estoque <= limite, 1), else_=0)), 0),
+        )
+    ).one()
+    return {"quantidade": quantidade, "estoque_total": int(estoque), "estoque_baixo": int(baixo)}
+
+
+def _usuarios(db: Session):
+    g, u = models.GrupoUsuario, models.Usuario
+    linhas = db.execute(
+        select(g.NomeGrupo, func.count(u.IDUsuario))
+        .outerjoin(u, u.IDGrupo == g.IDGrupo)
+        .group_by(g.IDGrupo, g.NomeGrupo)
+        .order_by(g.IDGrupo)
+    ).all()
+    return {
+        "quantidade": sum(n for _, n in linhas),
+        "grupos": len(linhas),
+        "por_grupo": {nome: n for nome, n in linhas},
+    }
+
+
+def _vendas_do_dia(db: Session, dia):
+    # DataVenda é gravada em UTC (models.Venda); o dia é o comercial
+    v = models.Venda
+    quantidade, receita = db.execute(
+        select(func.count(), func.coalesce(func.sum(v.Total), 0))
+        .where(
+            v.DataVenda >= relatorios.inicio_do_dia(dia),
+            v.DataVenda < relatorios.inicio_do_dia(dia + timedelta(days=1)),
+        )
+    ).one()
+    return {"data": str(dia), "quantidade": quantidade, "receita": round(float(receita), 2)}
+
+
+def _estoque_baixo(db: Session, limite: int):
+    p = models.Produto
+    linhas = db.execute(
+        select(p.IDProduto.label("id"), p.Nome.label("nome"), p.Estoque.label("estoque"))
+        .where(p.Estoque <= limite)
+        .order_by(p.Estoque, p.IDProduto)
+        .limit(LIMITE_LISTAS)
+    )
+    return [dict(linha._mapping) for linha in linhas]
+
+
+def _avisos(db: Session):
+    a, p = models.AvisoEstoque, models.Produto
+    linhas = db.execute(
+        select(
+            a.IDAviso.label("id"), a.IDProduto.label("id_produto"), p.Nome.label("produto"),
+            a.Mensagem.label("mensagem"), a.DataAviso.label("data"),
+        )
+        .join(p, p.IDProduto == a.IDProduto)
+        .order_by(a.IDAviso.desc())
+        .limit(LIMITE_LISTAS)
+    )
+    return [{**linha._mapping, "data": linha.data.isoformat() + "Z" if linha.data else None} for linha in linhas]
+
+
+def resumo(db: Session):
+    limite = config.DASHBOARD_ESTOQUE_BAIXO
+    agora = datetime.utcnow()
+    return {
+        "produtos": _produtos(db, limite),
+        "usuarios": _usuarios(db),
+        "vendas_hoje": _vendas_do_dia(db, relatorios.hoje()),
+        "estoque_baixo": {"limite": limite, "itens": _estoque_baixo(db, limite)},
+        "avisos": _avisos(db),
+        "gerado_em": agora.isoformat(timespec="seconds") + "Z",
+    }
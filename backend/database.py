@@ -1,19 +1,161 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import threading
+import time
 
-DB_USER = "david"
-DB_PASS = "beckgerencia!"  
-DB_HOST = "26.130.166.26"
-DB_NAME = "alfaiataria"
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, exc
+from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 
-DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}/{DB_NAME}"
+from . import config
+
+DB_USER = config.DB_USER
+DB_PASS = config.DB_PASS
+DB_HOST = config.DB_HOST
+DB_NAME = config.DB_NAME
+
+DATABASE_URL = (
+    config.DATABASE_URL
+    or f"mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{config.DB_PORT}/{DB_NAME}"
+)
+ASYNC_DATABASE_URL = (
+    config.ASYNC_DATABASE_URL
+    or DATABASE_URL.replace("mysql+pymysql://", "mysql+aiomysql://", 1)
+)
+
+
+# ---------------------------------------------------------
+# POOL COM MEDIÇÃO
+# ---------------------------------------------------------
+class MedidasPool:
+    """Contadores de checkout do pool (tempo inclui abrir conexão nova)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+
+    def registrar(self, segundos: float, timeout: bool = False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timeout
+            self.espera_total += segundos
+            self.espera_max = max(self.espera_max, segundos)
+
+
+class _PoolMedido:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.medidas = MedidasPool()
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexao = super()._do_get()
+        except exc.TimeoutError:
+            self.medidas.registrar(time.perf_counter() - inicio, timeout=True)
+            raise
+        self.medidas.registrar(time.perf_counter() - inicio)
+        return conexao
+
+    def recreate(self):
+        # Mantém os contadores quando o pool é recriado (ex.: dispose)
+        novo = super().recreate()
+        novo.medidas = self.medidas
+        return novo
+
+
+class PoolMedido(_PoolMedido, QueuePool):
+    pass
+
+
+class PoolMedidoAsync(_PoolMedido, AsyncAdaptedQueuePool):
+    pass
+
+
+OPCOES_POOL = dict(
+    pool_size=config.DB_POOL_SIZE,
+    max_overflow=config.DB_MAX_OVERFLOW,
+    pool_timeout=config.DB_POOL_TIMEOUT,
+    pool_recycle=config.DB_POOL_RECYCLE,
+    pool_pre_ping=config.DB_POOL_PRE_PING,
+)
+
+
+# ---------------------------------------------------------
+# ENGINES E SESSÕES
+# ---------------------------------------------------------
+# Os engines são criados no primeiro uso, não na importação: importar o
+# pacote (workers, testes, CLIs) não depende do banco estar no ar. Nem o
+# primeiro uso conecta; a primeira conexão sai na primeira consulta.
+# ``database.engine`` continua funcionando (ver __getattr__ no fim).
 
-engine = create_engine(DATABASE_URL, echo=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 Base = declarative_base()
 
+_lock = threading.Lock()
+_engine = None
+_async_engine = None
+
+
+class _FabricaSessoes(sessionmaker):
+    """sessionmaker que cria o engine na primeira sessão, se preciso."""
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            obter_engine()
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _FabricaSessoes(autoflush=False, autocommit=False)
+AsyncSessionLocal = None
+
+
+def obter_engine():
+    global _engine
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                definir_engine(
+                    create_engine(DATABASE_URL, echo=config.DB_ECHO, poolclass=PoolMedido, **OPCOES_POOL)
+                )
+    return _engine
+
+
+def definir_engine(engine):
+    """Usa ``engine`` no lugar do configurado (testes, benchmarks)."""
+    global _engine
+    _engine = engine
+    SessionLocal.configure(bind=engine)
+
+
+def obter_async_engine():
+    global _async_engine, AsyncSessionLocal
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+        with _lock:
+            if _async_engine is None:
+                _async_engine = create_async_engine(
+                    ASYNC_DATABASE_URL, echo=config.DB_ECHO, poolclass=PoolMedidoAsync, **OPCOES_POOL
+                )
+                # expire_on_commit=False: atributos lidos depois do commit não
+                # podem disparar IO fora do run_sync
+                AsyncSessionLocal = async_sessionmaker(
+                    bind=_async_engine, autoflush=False, expire_on_commit=False
+                )
+    return _async_engine
+
+
+async def encerrar():
+    """Fecha os pools (no shutdown do app)."""
+    global _async_engine, AsyncSessionLocal
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = AsyncSessionLocal = None
+    if _engine is not None:
+        await run_in_threadpool(_engine.dispose)
 
-from sqlalchemy.orm import Session
 
 def get_db():
     db = SessionLocal()
@@ -21,3 +163,113 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_raw_db():
+    """Conexão DBAPI crua emprestada do pool do engine (para SQL manual)."""
+    conn = obter_engine().raw_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------
+# DEPENDÊNCIA ASSÍNCRONA
+# ---------------------------------------------------------
+# Os endpoints async fazem o acesso ao banco com ``await db.run_sync(fn)``,
+# onde ``fn(session)`` é código ORM comum (o mesmo do crud).
+#   DB_ASYNC=1 -> AsyncSession: fn roda sobre o driver aiomysql, sem thread
+#   DB_ASYNC=0 -> SessaoSync: fn roda numa Session comum, no threadpool
+
+class SessaoSync:
+    """Session síncrona com a interface ``run_sync`` do AsyncSession."""
+
+    def __init__(self, db: Session):
+        self.sync_session = db
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+
+async def get_async_db():
+    if config.DB_ASYNC:
+        obter_async_engine()
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield SessaoSync(db)
+        finally:
+            await run_in_threadpool(db.close)
+
+
+# ---------------------------------------------------------
+# UPSERT (MySQL / SQLite)
+# ---------------------------------------------------------
+def upsert(db: Session, tabela, linhas, atualizar):
+    """Insere ``linhas`` (lista de dicts) atualizando as que já existem.
+
+    ``atualizar(novos)`` devolve o dict de colunas do SET, onde ``novos``
+    dá acesso aos valores da linha que tentou entrar (``novos.Coluna``).
+    Vira ``INSERT ... ON DUPLICATE KEY UPDATE`` no MySQL e
+    ``INSERT ... ON CONFLICT DO UPDATE`` no SQLite.
+    """
+    if not linhas:
+        return
+
+    if db.get_bind().dialect.name == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(tabela)
+        stmt = stmt.on_duplicate_key_update(atualizar(stmt.inserted))
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(tabela)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(tabela.primary_key.columns), set_=atualizar(stmt.excluded)
+        )
+
+    db.execute(stmt, linhas)
+
+
+# ---------------------------------------------------------
+# ESTATÍSTICAS DO POOL
+# ---------------------------------------------------------
+def _estatisticas(pool):
+    medidas = getattr(pool, "medidas", None)
+    dados = {
+        "tamanho": pool.size(),
+        "em_uso": pool.checkedout(),
+        "ociosas": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        "max_overflow": config.DB_MAX_OVERFLOW,
+    }
+    if medidas is not None:
+        dados.update({
+            "checkouts": medidas.checkouts,
+            "timeouts": medidas.timeouts,
+            "espera_media_ms": round(medidas.espera_total / medidas.checkouts * 1000, 3)
+            if medidas.checkouts else 0.0,
+            "espera_max_ms": round(medidas.espera_max * 1000, 3),
+        })
+    return dados
+
+
+def estatisticas_pool():
+    # Só os engines já criados
+    dados = {}
+    if _engine is not None:
+        dados["sync"] = _estatisticas(_engine.pool)
+    if _async_engine is not None:
+        dados["async"] = _estatisticas(_async_engine.sync_engine.pool)
+    return dados
+
+
+def __getattr__(nome):
+    # Compatibilidade: database.engine / database.async_engine criam sob demanda
+    if nome == "engine":
+        return obter_engine()
+    if nome == "async_engine":
+        return obter_async_engine() if config.DB_ASYNC else None
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
@@ -1,19 +1,55 @@
-from pymongo import MongoClient
+import threading
+
+from . import config
 
 # URL padrão do MongoDB local
-MONGO_URL = "mongodb://localhost:27017/"
+MONGO_URL = config.MONGO_URL
 
 # Nome da base
-DATABASE_NAME = "alfaiataria"
+DATABASE_NAME = config.MONGO_DB
+
+# Coleções do banco (acessíveis como database_mongo.col_<nome>)
+COLECOES = {
+    "col_usuarios": "usuarios",
+    "col_produtos": "produtos",
+    "col_grupos": "grupos",
+    "col_vendas": "vendas",
+    "col_avaliacao": "avaliacao",
+}
+
+# O cliente é criado no primeiro uso, e não na importação: o MongoClient
+# abre threads e conexões em segundo plano
+_lock = threading.Lock()
+_client = None
+
+
+def obter_cliente():
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                from pymongo import MongoClient
+                _client = MongoClient(MONGO_URL)
+    return _client
+
+
+def obter_db():
+    return obter_cliente()[DATABASE_NAME]
+
 
-client = MongoClient(MONGO_URL)
+def encerrar():
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
 
-# Conexão com o banco
-mongo_db = client[DATABASE_NAME]
 
-# Coleções do banco
-col_usuarios = mongo_db["usuarios"]
-col_produtos = mongo_db["produtos"]
-col_grupos = mongo_db["grupos"]
-col_vendas = mongo_db["vendas"]
-col_avaliacao = mongo_db["avaliacao"]
+def __getattr__(nome):
+    if nome == "client":
+        return obter_cliente()
+    if nome == "mongo_db":
+        return obter_db()
+    if nome in COLECOES:
+        return obter_db()[COLECOES[nome]]
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
@@ -0,0 +1,140 @@
+"""Reserva (baixa) de estoque das vendas.
+
+A baixa é feita por decremento condicional (``Estoque >= quantidade``) num
+único UPDATE por venda, em vez do decremento cego do trigger de ItensVenda.
+As linhas de Produtos são sempre travadas em ordem crescente de IDProduto
+(o UPDATE ... WHERE IDProduto IN (...) percorre a chave primária em ordem),
+então duas vendas concorrentes nunca se travam em ordem cruzada.
+
+A reserva deve ser o primeiro passo da transação da venda: a FK de
+ItensVenda põe trava compartilhada no produto, e pedir a exclusiva depois
+disso é que gera deadlock entre dois caixas.
+"""
+from collections import defaultdict
+
+from sqlalchemy import case, select, update
+from sqlalchemy.orm import Session
+
+from . import models
+
+
+class EstoqueInsuficiente(Exception):
+    def __init__(self, faltas):
+        self.faltas = faltas
+        super().__init__(descrever(faltas))
+
+
+def descrever(faltas) -> str:
+    partes = [
+        f"produto {f['id']} (solicitado {f['solicitado']}, disponível {f['disponivel']})"
+        for f in faltas
+    ]
+    return "Estoque insuficiente: " + "; ".join(partes)
+
+
+def quantidades(itens) -> dict:
+    """Soma as quantidades por produto (o mesmo produto pode vir repetido)."""
+    total = defaultdict(int)
+    for item in itens:
+        if item.quantidade <= 0:
+            raise ValueError(f"Quantidade inválida para o produto {item.id}.")
+        total[item.id] += item.quantidade
+    return dict(sorted(total.items()))
+
+
+def _baixar(db: Session, pedidos: dict) -> int:
+    """UPDATE único com decremento condicional; devolve as linhas baixadas."""
+    p = models.Produto
+    qtd = case(pedidos, value=p.IDProduto)
+
+    resultado = db.execute(
+        update(p)
+        .where(p.IDProduto.in_(list(pedidos)), p.Estoque >= qtd)
+        .values(Estoque=p.Estoque - qtd)
+        .execution_options(synchronize_session=False)
+    )
+    return resultado.rowcount
+
+
+def _disponivel(db: Session, ids, travar: bool = False) -> dict:
+    p = models.Produto
+    consulta = select(p.IDProduto, p.Estoque).where(p.IDProduto.in_(list(ids))).order_by(p.IDProduto)
+    if travar:
+        consulta = consulta.with_for_update()
+    return dict(db.execute(consulta).all())
+
+
+def _faltas(pedidos: dict, disponivel: dict):
+    return [
+        {"id": i, "solicitado": q, "disponivel": disponivel.get(i, 0)}
+        for i, q in pedidos.items()
+        if disponivel.get(i, 0) < q
+    ]
+
+
+# ---------------------------------------------------------
+# UMA VENDA
+# ---------------------------------------------------------
+def reservar(db: Session, itens, com_saldo: bool = False):
+    """Baixa o estoque dos itens de uma venda (sem commit).
+
+    Com ``com_saldo``, devolve o estoque de cada produto logo após a baixa,
+    lido na mesma transação, com as linhas ainda travadas (é o saldo que
+    esta venda deixou, mesmo com outras vendas concorrentes); senão, None.
+
+    Levanta ``EstoqueInsuficiente`` com o que falta por produto; nesse caso
+    nada foi baixado e cabe a quem chamou fazer rollback.
+    """
+    pedidos = quantidades(itens)
+    if not pedidos:
+        return {} if com_saldo else None
+
+    # Savepoint: se faltar algum produto, desfaz a baixa parcial antes de
+    # ler o que de fato há disponível
+    savepoint = db.begin_nested()
+    if _baixar(db, pedidos) == len(pedidos):
+        savepoint.commit()
+        return _disponivel(db, pedidos) if com_saldo else None
+
+    savepoint.rollback()
+    faltas = _faltas(pedidos, _disponivel(db, pedidos))
+    raise EstoqueInsuficiente(faltas or [
+        {"id": i, "solicitado": q, "disponivel": None} for i, q in pedidos.items()
+    ])
+
+
+# ---------------------------------------------------------
+# LOTE DE VENDAS
+# ---------------------------------------------------------
+def reservar_lote(db: Session, vendas):
+    """Reserva estoque para várias vendas numa transação (sem commit).
+
+    Trava de uma vez, em ordem de IDProduto, todos os produtos do lote,
+    distribui o estoque entre as vendas na ordem recebida e baixa o total
+    das que couberem num único UPDATE. Devolve ``(resultados, saldo)``:
+    por venda, ``None`` se a reserva deu certo ou a lista de faltas, e o
+    estoque que ficou em cada produto baixado.
+    """
+    pedidos_por_venda = [quantidades(itens) for itens in vendas]
+    ids = {i for pedidos in pedidos_por_venda for i in pedidos}
+    if not ids:
+        return [None] * len(vendas), {}
+
+    disponivel = _disponivel(db, ids, travar=True)
+    total = defaultdict(int)
+    resultados = []
+
+    for pedidos in pedidos_por_venda:
+        faltas = _faltas(pedidos, disponivel)
+        if faltas:
+            resultados.append(faltas)
+            continue
+        for i, q in pedidos.items():
+            disponivel[i] -= q
+            total[i] += q
+        resultados.append(None)
+
+    if total:
+        _baixar(db, dict(sorted(total.items())))
+
+    return resultados, {i: disponivel[i] for i in sorted(total)}
@@ -0,0 +1,186 @@
+"""Barramento de eventos em processo e stream SSE de estoque.
+
+Os caminhos de escrita publicam, depois do commit:
+
+* ``estoque``         estoque atual de um produto (venda, cadastro, edição)
+* ``estoque_zerado``  o estoque chegou a zero (o caso em que o trigger
+                      trg_produtos_after_update grava em AvisosEstoque)
+* ``produto_removido`` o produto foi excluído (não é estoque zerado: o
+                      cliente só tira o produto da lista)
+
+e GET /api/eventos/estoque entrega os eventos por Server-Sent Events a
+todos os clientes conectados, sem ninguém consultar vw_avisos_estoque.
+
+* Cada evento é renderizado uma vez, não uma por assinante.
+* Cada assinante tem uma fila limitada (``EVENTOS_FILA_MAX``). Um cliente
+  que não consome a tempo é desconectado, em vez de acumular memória; o
+  EventSource do navegador reconecta sozinho e, pelo Last-Event-ID, recebe
+  o que perdeu dos últimos ``EVENTOS_HISTORICO`` eventos.
+* Sem eventos, um comentário a cada ``EVENTOS_HEARTBEAT_S`` mantém a
+  conexão (e proxies no caminho) abertos.
+* Um assinante parado custa uma fila vazia e um timer no event loop, sem
+  thread. ``publicar`` pode ser chamado de qualquer thread (as escritas
+  rodam no threadpool); a entrega é agendada no loop dos assinantes.
+
+É em processo: com vários workers, cada um entrega o que ele mesmo
+publicou.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import config, models
+
+
+class Evento:
+    __slots__ = ("id", "tipo", "dados", "texto")
+
+    def __init__(self, id_evento: int, tipo: str, dados: dict):
+        self.id = id_evento
+        self.tipo = tipo
+        self.dados = dados
+        corpo = json.dumps(dados, ensure_ascii=False, separators=(",", ":"))
+        self.texto = f"id: {id_evento}\nevent: {tipo}\ndata: {corpo}\n\n".encode()
+
+
+class Assinante:
+    __slots__ = ("loop", "fila", "descartado")
+
+    def __init__(self, loop, tamanho: int):
+        self.loop = loop
+        self.fila = asyncio.Queue(tamanho)
+        self.descartado = False
+
+
+class Barramento:
+    def __init__(self, tamanho_fila: int = 100, historico: int = 256):
+        self.tamanho_fila = tamanho_fila
+        self._lock = threading.Lock()
+        self._assinantes: set[Assinante] = set()
+        self._historico: deque[Evento] = deque(maxlen=historico)
+        self._proximo_id = 1
+
+        self.publicados = 0
+        self.descartados = 0
+
+    @property
+    def assinantes(self) -> int:
+        return len(self._assinantes)
+
+    def publicar(self, tipo: str, dados: dict):
+        with self._lock:
+            evento = Evento(self._proximo_id, tipo, dados)
+            self._proximo_id += 1
+            self._historico.append(evento)
+            self.publicados += 1
+            loops = {a.loop for a in self._assinantes}
+
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._entregar, loop, evento)
+            except RuntimeError:
+                pass  # loop já encerrado
+
+    def _entregar(self, loop, evento: Evento):
+        # Roda no event loop, a mesma thread que assina e cancela
+        for assinante in list(self._assinantes):
+            if assinante.loop is not loop or assinante.descartado:
+                continue
+            try:
+                assinante.fila.put_nowait(evento)
+            except asyncio.QueueFull:
+                self._descartar(assinante)
+
+    def _descartar(self, assinante: Assinante):
+        # Cliente lento: esvazia a fila e deixa só a marca de fim
+        assinante.descartado = True
+        self.descartados += 1
+        while not assinante.fila.empty():
+            assinante.fila.get_nowait()
+        assinante.fila.put_nowait(None)
+
+    def assinar(self, ultimo_id: int = None) -> Assinante:
+        """Novo assinante; com ``ultimo_id``, recebe antes o que perdeu."""
+        assinante = Assinante(asyncio.get_running_loop(), self.tamanho_fila)
+        with self._lock:
+            if ultimo_id is not None:
+                for evento in self._historico:
+                    if evento.id > ultimo_id and not assinante.fila.full():
+                        assinante.fila.put_nowait(evento)
+            self._assinantes.add(assinante)
+        return assinante
+
+    def cancelar(self, assinante: Assinante):
+        with self._lock:
+            self._assinantes.discard(assinante)
+
+    def estatisticas(self):
+        return {
+            "assinantes": self.assinantes,
+            "publicados": self.publicados,
+            "descartados": self.descartados,
+            "ultimo_id": self._proximo_id - 1,
+        }
+
+
+estoque = Barramento(config.EVENTOS_FILA_MAX, config.EVENTOS_HISTORICO)
+
+
+async def transmitir(barramento: Barramento, assinante: Assinante, expira: float = None):
+    """Corpo do StreamingResponse SSE; termina no fim da sessão (``expira``)."""
+    try:
+        yield b"retry: 3000\n\n"
+        while expira is None or time.time() < expira:
+            try:
+                evento = await asyncio.wait_for(assinante.fila.get(), config.EVENTOS_HEARTBEAT_S)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            if evento is None:
+                return  # descartado por lentidão: o cliente reconecta
+            yield evento.texto
+    finally:
+        barramento.cancelar(assinante)
+
+
+# ---------------------------------------------------------
+# PUBLICAÇÃO (chamada pelos caminhos de escrita, após o commit)
+# ---------------------------------------------------------
+def _dados(id_produto, nome, estoque_atual):
+    return {"id_produto": id_produto, "nome": nome, "estoque": estoque_atual}
+
+
+def estoque_alterado(id_produto: int, nome: str, antes, depois):
+    if antes == depois:
+        return
+    estoque.publicar("estoque", _dados(id_produto, nome, depois))
+    if antes is not None and depois <= 0 < antes:
+        estoque.publicar("estoque_zerado", _dados(id_produto, nome, depois))
+
+
+def produto_removido(id_produto: int, nome: str):
+    estoque.publicar("produto_removido", {"id_produto": id_produto, "nome": nome})
+
+
+def estoque_vendido(db: Session, saldo):
+    """Publica o estoque dos produtos vendidos (sem assinantes, nem consulta).
+
+    ``saldo`` (id -> estoque) é o que a reserva deixou, lido na transação da
+    venda (``estoque.reservar``); reler depois do commit mostraria o efeito
+    de vendas concorrentes, e duas vendas publicariam o mesmo zerado. A
+    reserva só baixa quando ``Estoque >= quantidade``, então saldo zero é
+    sempre estoque que esta venda acabou de zerar.
+    """
+    if not estoque.assinantes or not saldo:
+        return
+    p = models.Produto
+    nomes = dict(db.execute(select(p.IDProduto, p.Nome).where(p.IDProduto.in_(list(saldo)))).all())
+    for id_produto, estoque_atual in sorted(saldo.items()):
+        estoque.publicar("estoque", _dados(id_produto, nomes.get(id_produto), estoque_atual))
+        if estoque_atual <= 0:
+            estoque.publicar("estoque_zerado", _dados(id_produto, nomes.get(id_produto), estoque_atual))
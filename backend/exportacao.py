@@ -0,0 +1,219 @@
+"""Exportação das vendas (pedidos e itens) em fluxo contínuo.
+
+As linhas vêm de um cursor no servidor (``stream_results``; no MySQL, um
+SSCursor) em blocos de ``TAMANHO_BLOCO``, e cada bloco é convertido e
+entregue antes de buscar o próximo. Com a compressão feita no mesmo passo
+(zlib), a memória usada não depende do tamanho da exportação.
+
+A conexão é aberta e fechada dentro do gerador, e não na dependência da
+requisição: o corpo da resposta é consumido depois que o endpoint retorna.
+
+As vendas arquivadas (arquivamento.py) saem primeiro, de VendasArquivo /
+ItensVendaArquivo, e depois as das tabelas quentes, com uma consulta para
+cada origem: as arquivadas são as mais antigas, então o arquivo continua
+em ordem de IDVenda sem ordenar a união no banco.
+"""
+import csv
+import io
+import json
+import zlib
+from itertools import chain
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Float, Integer, select
+
+from . import database, models, relatorios
+
+TAMANHO_BLOCO = 5000
+
+FORMATOS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+# ---------------------------------------------------------
+# CONSULTAS (as mesmas colunas de vw_pedidos / vw_itens_pedido)
+# ---------------------------------------------------------
+def _consulta_pedidos(v):
+    uc = models.Usuario.__table__.alias("uc")
+    ua = models.Usuario.__table__.alias("ua")
+    return (
+        select(
+            v.c.IDVenda,
+            v.c.DataVenda,
+            uc.c.Nome.label("Cliente"),
+            ua.c.Nome.label("Atendente"),
+            v.c.Total,
+        )
+        .select_from(
+            v.join(uc, uc.c.IDUsuario == v.c.IDUsuarioCliente)
+            .join(ua, ua.c.IDUsuario == v.c.IDUsuarioAtendente)
+        )
+        .order_by(v.c.IDVenda)
+    )
+
+
+def _consulta_itens(i, v=None):
+    # Os itens arquivados têm a DataVenda: sem join com as vendas
+    p = models.Produto.__table__
+    origem, data = (i, i.c.DataVenda) if v is None else (i.join(v, v.c.IDVenda == i.c.IDVenda), v.c.DataVenda)
+    return (
+        select(
+            i.c.IDVenda,
+            data,
+            i.c.IDProduto,
+            p.c.Nome.label("Produto"),
+            i.c.Quantidade,
+            i.c.PrecoUnitario,
+            (i.c.Quantidade * i.c.PrecoUnitario).label("Subtotal"),
+        )
+        .select_from(origem.join(p, p.c.IDProduto == i.c.IDProduto))
+        .order_by(i.c.IDVenda, i.c.IDItem)
+    )
+
+
+def consultas(tipo: str, inicio: date = None, fim: date = None):
+    """SELECTs do tipo pedido (arquivo e tabelas quentes), com DataVenda em [inicio, fim]."""
+    va, ia = models.VendaArquivada.__table__, models.ItemVendaArquivado.__table__
+    v, i = models.Venda.__table__, models.ItemVenda.__table__
+    if tipo == "pedidos":
+        origens = [(_consulta_pedidos(va), va), (_consulta_pedidos(v), v)]
+    else:
+        origens = [(_consulta_itens(ia), ia), (_consulta_itens(i, v), v)]
+
+    queries = []
+    for query, tabela in origens:
+        # Intervalo aberto no fim, para usar o índice de DataVenda (e, no
+        # arquivo, ler só as partições do período); dias comerciais, como
+        # nos relatórios
+        data = tabela.c.DataVenda
+        if inicio is not None:
+            query = query.where(data >= relatorios.inicio_do_dia(inicio))
+        if fim is not None:
+            query = query.where(data < relatorios.inicio_do_dia(fim + timedelta(days=1)))
+        queries.append(query)
+    return queries
+
+
+def blocos(query, tamanho: int = TAMANHO_BLOCO, bind=None):
+    """Gera as linhas em blocos, com uma conexão só para isso."""
+    with (bind or database.engine).connect() as conn:
+        resultado = conn.execution_options(stream_results=True, yield_per=tamanho).execute(query)
+        yield from resultado.partitions()
+
+
+# ---------------------------------------------------------
+# FORMATOS
+# ---------------------------------------------------------
+def _valor_json(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return str(valor)
+
+
+def gerar_csv(colunas, fonte):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+
+    for linhas in chain([[colunas]], fonte):
+        escritor.writerows(linhas)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def gerar_ndjson(colunas, fonte):
+    for linhas in fonte:
+        yield "".join(
+            json.dumps(dict(zip(colunas, linha)), ensure_ascii=False, default=_valor_json) + "\n"
+            for linha in linhas
+        ).encode("utf-8")
+
+
+class _Saida:
+    """Arquivo só de escrita cujo conteúdo é retirado a cada bloco."""
+
+    closed = False
+
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        self._posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self._posicao
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def retirar(self) -> bytes:
+        dados = b"".join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+def _esquema_parquet(query):
+    import pyarrow as pa
+
+    def tipo(coluna):
+        if isinstance(coluna.type, Integer):
+            return pa.int64()
+        if isinstance(coluna.type, Float):
+            return pa.float64()
+        if coluna.name.startswith("Data"):
+            return pa.timestamp("us")
+        return pa.string()
+
+    return pa.schema([(c.name, tipo(c)) for c in query.selected_columns])
+
+
+def gerar_parquet(esquema, fonte, compressao: str = "snappy"):
+    """Um row group por bloco; o rodapé sai ao final."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    saida = _Saida()
+    escritor = pq.ParquetWriter(saida, esquema, compression=compressao)
+
+    for linhas in fonte:
+        colunas = list(zip(*linhas))
+        escritor.write_table(pa.Table.from_arrays(
+            [pa.array(valores, type=campo.type) for valores, campo in zip(colunas, esquema)],
+            schema=esquema,
+        ))
+        yield saida.retirar()
+
+    escritor.close()
+    yield saida.retirar()
+
+
+def comprimir_gzip(partes, nivel: int = 6):
+    compressor = zlib.compressobj(nivel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for parte in partes:
+        comprimido = compressor.compress(parte)
+        if comprimido:
+            yield comprimido
+    yield compressor.flush()
+
+
+def exportar(tipo: str, formato: str, inicio: date = None, fim: date = None, gzip: bool = False, bind=None):
+    """Gerador dos bytes da exportação (já comprimidos, se ``gzip``)."""
+    queries = consultas(tipo, inicio, fim)
+    colunas = [c.name for c in queries[0].selected_columns]
+    fonte = chain.from_iterable(blocos(query, bind=bind) for query in queries)
+
+    if formato == "parquet":
+        # Parquet comprime por coluna; gzip por fora só atrapalharia
+        return gerar_parquet(_esquema_parquet(queries[0]), fonte, "gzip" if gzip else "snappy")
+
+    partes = gerar_csv(colunas, fonte) if formato == "csv" else gerar_ndjson(colunas, fonte)
+    return comprimir_gzip(partes) if gzip else partes
@@ -0,0 +1,395 @@
+"""Registro assíncrono (write-behind) das vendas.
+
+Com ``VENDAS_ASSINCRONAS=1``, o POST /api/vendas não espera o MySQL: a
+venda vai para um diário local (SQLite em modo WAL, ``VENDAS_DIARIO``),
+gravado com fsync antes da resposta 202, e um drenador em segundo plano a
+registra no MySQL em lotes de até ``VENDAS_LOTE`` (``crud.criar_vendas_lote``,
+uma transação por lote). O caixa espera só a escrita local, e as vendas
+continuam sendo aceitas enquanto o banco estiver lento ou fora do ar.
+
+Idempotência: cada venda tem uma chave (cabeçalho ``Idempotency-Key`` ou
+gerada aqui). Repetir o POST com a mesma chave devolve a situação da venda
+em vez de registrar outra. A chave entra em ChavesVenda na mesma transação
+da venda: se o drenador cair entre o commit no MySQL e a baixa no diário
+(ou dois workers drenarem o mesmo diário), o lote reaplicado reconhece as
+vendas já registradas.
+
+Situações no diário: ``pendente`` -> ``registrada`` (com o id_venda) ou
+``recusada`` (validação ou estoque; o erro fica em
+GET /api/vendas/pendentes/{chave}). Falhas transitórias (conexão caída,
+deadlock, lock wait timeout: ``OperationalError`` em geral) mantêm o lote
+pendente, sem contar tentativa, e o drenador tenta de novo com espera
+crescente; são o que um produto disputado por vários caixas produz, e a
+venda não tem nada de errado. Qualquer outra falha do lote (IntegrityError,
+DataError...) faz o drenador refazê-lo venda a venda, cada uma na sua
+transação: as boas são registradas e a que falhou conta uma tentativa, e é
+recusada (com o último erro) depois de ``VENDAS_MAX_TENTATIVAS``. Assim uma
+venda que o banco nunca aceita não trava a fila.
+
+    python -m backend.fila_vendas --uma-vez   # esvazia o diário e sai
+"""
+import argparse
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+
+from pydantic import ValidationError
+from sqlalchemy import exc, select
+
+from . import config, crud, models, schemas
+from .database import SessionLocal
+
+log = logging.getLogger("fila_vendas")
+
+PENDENTE, REGISTRADA, RECUSADA = "pendente", "registrada", "recusada"
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS vendas (
+    chave       TEXT PRIMARY KEY,
+    venda       TEXT NOT NULL,
+    situacao    TEXT NOT NULL DEFAULT 'pendente',
+    recebida_em REAL NOT NULL,
+    tentativas  INTEGER NOT NULL DEFAULT 0,
+    id_venda    INTEGER,
+    erro        TEXT,
+    concluida_em REAL
+);
+CREATE INDEX IF NOT EXISTS ix_vendas_situacao ON vendas (situacao, recebida_em);
+"""
+
+
+class ChaveEmUso(Exception):
+    """A chave de idempotência já foi usada com outra venda."""
+
+
+def nova_chave() -> str:
+    return uuid.uuid4().hex
+
+
+# ---------------------------------------------------------
+# DIÁRIO LOCAL
+# ---------------------------------------------------------
+class Diario:
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _conexao(self):
+        # Aberto no primeiro uso; autocommit: cada venda aceita é um commit
+        if self._conn is None:
+            conn = sqlite3.connect(self.caminho, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")  # fsync do WAL a cada commit
+            conn.execute("PRAGMA busy_timeout=5000")  # outros workers no mesmo arquivo
+            conn.executescript(_ESQUEMA)
+            self._conn = conn
+        return self._conn
+
+    def acrescentar(self, chave: str, venda: schemas.VendaCreate):
+        """Grava a venda; devolve (nova, situação).
+
+        Com uma chave já conhecida, devolve a situação registrada, ou levanta
+        ``ChaveEmUso`` se a venda não for a mesma.
+        """
+        corpo = venda.model_dump_json()
+        with self._lock:
+            conn = self._conexao()
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO vendas (chave, venda, recebida_em) VALUES (?, ?, ?)",
+                (chave, corpo, time.time()),
+            )
+            linha = conn.execute("SELECT * FROM vendas WHERE chave = ?", (chave,)).fetchone()
+
+        if cursor.rowcount == 0 and linha["venda"] != corpo:
+            raise ChaveEmUso(chave)
+        return cursor.rowcount == 1, _situacao(linha)
+
+    def situacao(self, chave: str):
+        with self._lock:
+            linha = self._conexao().execute("SELECT * FROM vendas WHERE chave = ?", (chave,)).fetchone()
+        return _situacao(linha) if linha else None
+
+    def proximas(self, limite: int):
+        """Até ``limite`` vendas pendentes, na ordem de chegada.
+
+        Uma venda que não é mais lida pelo schema atual é recusada aqui.
+        """
+        while True:
+            with self._lock:
+                linhas = self._conexao().execute(
+                    "SELECT chave, venda FROM vendas WHERE situacao = ? ORDER BY recebida_em LIMIT ?",
+                    (PENDENTE, limite),
+                ).fetchall()
+
+            lote, ilegiveis = [], {}
+            for linha in linhas:
+                try:
+                    lote.append((linha["chave"], schemas.VendaCreate.model_validate_json(linha["venda"])))
+                except ValidationError as e:
+                    ilegiveis[linha["chave"]] = f"Venda ilegível no diário: {e.errors()[0]['msg']}"
+            if ilegiveis:
+                self.concluir({}, ilegiveis)
+            if lote or not linhas:
+                return lote
+
+    def concluir(self, registradas: dict, recusadas: dict):
+        """Baixa o lote drenado: chave -> id_venda e chave -> erro."""
+        agora = time.time()
+        with self._lock:
+            conn = self._conexao()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "UPDATE vendas SET situacao = ?, id_venda = ?, concluida_em = ? WHERE chave = ?",
+                    [(REGISTRADA, id_venda, agora, chave) for chave, id_venda in registradas.items()],
+                )
+                conn.executemany(
+                    "UPDATE vendas SET situacao = ?, erro = ?, concluida_em = ? WHERE chave = ?",
+                    [(RECUSADA, erro, agora, chave) for chave, erro in recusadas.items()],
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def falhou(self, chave: str, erro: str) -> bool:
+        """Conta uma tentativa da venda; True se ela foi recusada por isso."""
+        with self._lock:
+            conn = self._conexao()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("UPDATE vendas SET tentativas = tentativas + 1, erro = ? WHERE chave = ?", (erro, chave))
+                recusada = conn.execute(
+                    "UPDATE vendas SET situacao = ?, concluida_em = ? "
+                    "WHERE chave = ? AND situacao = ? AND tentativas >= ?",
+                    (RECUSADA, time.time(), chave, PENDENTE, config.VENDAS_MAX_TENTATIVAS),
+                ).rowcount == 1
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return recusada
+
+    def limpar(self, antes_de: float) -> int:
+        """Apaga as vendas concluídas antes de ``antes_de`` (epoch)."""
+        with self._lock:
+            return self._conexao().execute(
+                "DELETE FROM vendas WHERE situacao != ? AND concluida_em < ?", (PENDENTE, antes_de)
+            ).rowcount
+
+    def estatisticas(self):
+        with self._lock:
+            conn = self._conexao()
+            contagens = dict(conn.execute("SELECT situacao, COUNT(*) FROM vendas GROUP BY situacao").fetchall())
+            mais_antiga = conn.execute(
+                "SELECT MIN(recebida_em) FROM vendas WHERE situacao = ?", (PENDENTE,)
+            ).fetchone()[0]
+        return {
+            "pendentes": contagens.get(PENDENTE, 0),
+            "registradas": contagens.get(REGISTRADA, 0),
+            "recusadas": contagens.get(RECUSADA, 0),
+            "atraso_s": round(time.time() - mais_antiga, 1) if mais_antiga else 0.0,
+        }
+
+    def fechar(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def _situacao(linha):
+    return {
+        "chave": linha["chave"],
+        "situacao": linha["situacao"],
+        "id_venda": linha["id_venda"],
+        "erro": linha["erro"],
+        "tentativas": linha["tentativas"],
+    }
+
+
+# ---------------------------------------------------------
+# DRENAGEM PARA O MYSQL
+# ---------------------------------------------------------
+def _transitoria(erro: Exception) -> bool:
+    """Falha que passa sozinha (conexão, deadlock 1213, lock wait 1205...):
+    não conta tentativa contra a venda."""
+    return isinstance(erro, (exc.OperationalError, exc.InterfaceError, exc.TimeoutError)) or getattr(
+        erro, "connection_invalidated", False
+    )
+
+
+def _registrar_uma_a_uma(db, diario: Diario, novas, registradas: dict, recusadas: dict):
+    """Refaz um lote que falhou, uma transação por venda, para isolar a culpada."""
+    for chave, venda in novas:
+        try:
+            resultado = crud.criar_vendas_lote(db, [venda], chaves=[chave])[0]
+        except Exception as e:
+            db.rollback()
+            if _transitoria(e):
+                raise
+            erro = f"Erro ao gravar: {str(e).splitlines()[0][:200]}"
+            if diario.falhou(chave, erro):
+                log.error("venda %s recusada após %d tentativas: %s", chave, config.VENDAS_MAX_TENTATIVAS, erro)
+            continue
+        if resultado["id_venda"] is not None:
+            registradas[chave] = resultado["id_venda"]
+        else:
+            recusadas[chave] = resultado["erro"]
+
+
+def drenar_lote(diario: Diario, limite: int):
+    """Registra no MySQL até ``limite`` vendas pendentes; None se não há."""
+    lote = diario.proximas(limite)
+    if not lote:
+        return None
+
+    inicio = time.perf_counter()
+    db = SessionLocal()
+    try:
+        # Vendas de um lote que caiu depois do commit já estão no MySQL
+        c = models.ChaveVenda
+        registradas = dict(db.execute(
+            select(c.Chave, c.IDVenda).where(c.Chave.in_([chave for chave, _ in lote]))
+        ).all())
+        novas = [(chave, venda) for chave, venda in lote if chave not in registradas]
+
+        recusadas = {}
+        if novas:
+            try:
+                resultados = crud.criar_vendas_lote(
+                    db, [venda for _, venda in novas], chaves=[chave for chave, _ in novas]
+                )
+            except Exception as e:
+                db.rollback()
+                if _transitoria(e):
+                    raise
+                log.warning("lote de %d vendas falhou (%s); registrando uma a uma", len(novas), e)
+                _registrar_uma_a_uma(db, diario, novas, registradas, recusadas)
+            else:
+                for (chave, _), resultado in zip(novas, resultados):
+                    if resultado["id_venda"] is not None:
+                        registradas[chave] = resultado["id_venda"]
+                    else:
+                        recusadas[chave] = resultado["erro"]
+    finally:
+        db.close()
+
+    diario.concluir(registradas, recusadas)
+    return {
+        "vendas": len(lote),
+        "registradas": len(registradas),
+        "recusadas": len(recusadas),
+        "duracao_ms": round((time.perf_counter() - inicio) * 1000, 1),
+    }
+
+
+class Drenador:
+    """Thread que esvazia o diário enquanto o app está no ar."""
+
+    def __init__(self, diario: Diario, limite: int, intervalo: float):
+        self.diario = diario
+        self.limite = limite
+        self.intervalo = intervalo
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread = None
+        self._limpeza = 0.0
+
+        self.erro = None
+        self.falhas = 0
+        self.ultimo_lote = None
+
+    def iniciar(self):
+        if self._thread is None:
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._executar, name="fila-vendas", daemon=True)
+            self._thread.start()
+
+    def parar(self, timeout: float = 10.0):
+        if self._thread is not None:
+            self._parar.set()
+            self._acordar.set()
+            self._thread.join(timeout)
+            self._thread = None
+
+    def acordar(self):
+        """Chamado a cada venda aceita: drena sem esperar o intervalo."""
+        self._acordar.set()
+
+    def _executar(self):
+        espera = self.intervalo
+        while not self._parar.is_set():
+            self._acordar.clear()
+            try:
+                metricas = drenar_lote(self.diario, self.limite)
+            except Exception as e:
+                self.erro, self.falhas = str(e).splitlines()[0][:200], self.falhas + 1
+                log.exception("falha ao drenar vendas; tentando de novo em %.1fs", espera)
+                self._parar.wait(espera)
+                espera = min(espera * 2, 30)
+                continue
+
+            espera, self.erro = self.intervalo, None
+            if metricas:
+                self.ultimo_lote = metricas
+                log.info(
+                    "lote: %(vendas)d vendas (%(registradas)d registradas, %(recusadas)d recusadas) "
+                    "em %(duracao_ms)sms", metricas,
+                )
+                if metricas["vendas"] == self.limite:
+                    continue  # ainda há fila: sem pausa
+            self._limpar()
+            self._acordar.wait(self.intervalo)
+
+    def _limpar(self):
+        agora = time.monotonic()
+        if agora - self._limpeza >= 3600:
+            self._limpeza = agora
+            self.diario.limpar(time.time() - config.VENDAS_DIARIO_RETENCAO_H * 3600)
+
+    def estatisticas(self):
+        return {
+            "ativo": self._thread is not None,
+            "ultimo_lote": self.ultimo_lote,
+            "falhas": self.falhas,
+            "erro": self.erro,
+        }
+
+
+diario = Diario(config.VENDAS_DIARIO)
+drenador = Drenador(diario, config.VENDAS_LOTE, config.VENDAS_DRENO_INTERVALO_S)
+
+
+def receber(venda: schemas.VendaCreate, chave: str):
+    """Grava a venda no diário e acorda o drenador; devolve (nova, situação)."""
+    nova, situacao = diario.acrescentar(chave, venda)
+    if nova:
+        drenador.acordar()
+    return nova, situacao
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Registra no MySQL as vendas do diário local.")
+    parser.add_argument("--lote", type=int, default=config.VENDAS_LOTE, help="vendas por transação")
+    parser.add_argument("--uma-vez", action="store_true", help="esvazia o diário e sai")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    if args.uma_vez:
+        while (metricas := drenar_lote(diario, args.lote)) is not None:
+            print(json.dumps(metricas))
+    else:
+        drenador.limite = args.lote
+        drenador.iniciar()
+        try:
+            while True:
+                time.sleep(60)
+        except KeyboardInterrupt:
+            drenador.parar()
@@ -0,0 +1,357 @@
+"""Importação em lote de produtos (CSV, NDJSON ou JSON).
+
+O corpo da requisição é copiado para um arquivo temporário (em memória até
+``MEMORIA_MAXIMA``, depois em disco) e lido em fluxo: os registros são
+validados contra ``schemas.ProdutoImportacao`` em blocos de
+``TAMANHO_BLOCO`` e cada bloco vira um único INSERT ... ON DUPLICATE KEY
+UPDATE multi-linha (``database.upsert``). Registros inválidos entram no
+relatório com o número da linha (CSV) ou do registro (JSON) e não impedem
+os demais. Tudo roda numa transação; com ``dry_run`` ela é desfeita no fim.
+Mudanças de estoque entram no razão (``movimentacoes``) na mesma transação
+e viram eventos de estoque depois do commit, como numa edição avulsa.
+Depois do commit, só os produtos importados são reindexados na busca e só
+as tags de cache deles são invalidadas (sem recarregar o catálogo).
+
+Chave do upsert:
+
+* ``id`` (padrão): registros com id atualizam esse produto (ou o criam com
+  esse id); sem id, sempre inserem (um INSERT multi-linha por bloco; os
+  ids gerados são lidos em seguida, para lançar o estoque inicial no
+  razão);
+* ``nome``: registros sem id atualizam o produto de mesmo Nome, se houver
+  exatamente um.
+
+Aceita o JSON estendido exportado do Mongo (NoSQL/alfaiataria.produtos.json):
+``_id`` e campos desconhecidos são ignorados, e ``{"$numberDouble": "..."}``
+e afins viram números. No CSV, o separador (vírgula, ponto e vírgula ou
+tab) é detectado e preços como "1.234,56" são aceitos.
+"""
+import csv
+import io
+import json
+import re
+from collections import defaultdict
+
+from pydantic import ValidationError
+from sqlalchemy import func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from . import busca, cache, eventos, models, movimentacoes, schemas
+from .database import upsert
+
+TAMANHO_BLOCO = 500
+MEMORIA_MAXIMA = 1 << 20        # acima disso o upload vai para disco
+MAX_BYTES = 50 << 20
+MAX_ERROS_RELATORIO = 1000
+
+# Campos que podem faltar no arquivo -> colunas de Produtos
+OPCIONAIS = {"categoria": "Categoria", "descricao": "Descricao", "estoque": "Estoque"}
+
+TIPOS_CONTEUDO = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/json": "json",
+}
+
+# Nomes de coluna aceitos -> campos de ProdutoImportacao
+APELIDOS = {
+    "idproduto": "id",
+    "produto": "nome",
+    "preço": "preco",
+    "precounitario": "preco",
+    "descrição": "descricao",
+    "quantidade": "estoque",
+}
+
+
+class ErroImportacao(Exception):
+    """Arquivo ilegível (não dá para seguir para os próximos registros)."""
+
+
+def formato_por_tipo(content_type: str):
+    return TIPOS_CONTEUDO.get(content_type.split(";")[0].strip().lower())
+
+
+# ---------------------------------------------------------
+# LEITURA
+# ---------------------------------------------------------
+def _chaves(registro: dict) -> dict:
+    normalizado = {}
+    for chave, valor in registro.items():
+        if chave is None:
+            continue  # colunas a mais numa linha do CSV
+        chave = chave.strip().lower()
+        normalizado[APELIDOS.get(chave, chave)] = valor
+    return normalizado
+
+
+def _numero_br(valor: str) -> str:
+    valor = valor.strip().removeprefix("R$").strip()
+    if "," in valor:
+        valor = valor.replace(".", "").replace(",", ".")
+    return valor
+
+
+def ler_csv(arquivo):
+    """Gera (número da linha, registro) de um CSV com cabeçalho."""
+    texto = io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+    amostra = texto.read(4096)
+    texto.seek(0)
+
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=",;\t")
+    except csv.Error:
+        dialeto = csv.excel
+
+    leitor = csv.reader(texto, dialeto)
+    cabecalho = next(leitor, None)
+    if cabecalho is None:
+        return
+
+    for linha in leitor:
+        if not any(campo.strip() for campo in linha):
+            continue
+        registro = _chaves(dict(zip(cabecalho, linha)))
+        registro = {c: v for c, v in registro.items() if v.strip()}  # vazio = ausente
+        for campo in ("preco", "estoque"):
+            if campo in registro:
+                registro[campo] = _numero_br(registro[campo])
+        yield leitor.line_num, registro
+
+
+def _json_estendido(objeto: dict):
+    if len(objeto) == 1:
+        chave, valor = next(iter(objeto.items()))
+        if chave in ("$numberInt", "$numberLong"):
+            return int(valor)
+        if chave in ("$numberDouble", "$numberDecimal"):
+            return float(valor)
+        if chave in ("$oid", "$date"):
+            return valor
+    return objeto
+
+
+_SEPARADORES = re.compile(r"[\s,\[\]]*")
+
+
+def ler_json(arquivo, tamanho: int = 1 << 16):
+    """Gera (número do registro, registro) de um array JSON ou de NDJSON.
+
+    Decodifica um objeto por vez com ``raw_decode``, lendo mais do arquivo
+    só quando o objeto atual ainda não está completo no buffer.
+    """
+    texto = io.TextIOWrapper(arquivo, encoding="utf-8-sig")
+    decodificador = json.JSONDecoder(object_hook=_json_estendido)
+    buffer, posicao, numero, acabou = "", 0, 0, False
+
+    while True:
+        posicao = _SEPARADORES.match(buffer, posicao).end()
+        try:
+            if posicao == len(buffer):
+                raise ValueError("fim do buffer")
+            registro, posicao = decodificador.raw_decode(buffer, posicao)
+        except ValueError as e:
+            if acabou:
+                if posicao < len(buffer):
+                    raise ErroImportacao(f"JSON inválido após o registro {numero}: {e}")
+                return
+            pedaco = texto.read(tamanho)
+            acabou = not pedaco
+            buffer, posicao = buffer[posicao:] + pedaco, 0
+            continue
+
+        numero += 1
+        yield numero, _chaves(registro) if isinstance(registro, dict) else registro
+
+
+def _em_blocos(registros, tamanho):
+    bloco = []
+    for registro in registros:
+        bloco.append(registro)
+        if len(bloco) == tamanho:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+
+# ---------------------------------------------------------
+# GRAVAÇÃO
+# ---------------------------------------------------------
+def _erro(relatorio, numero, mensagens):
+    relatorio["total_erros"] += 1
+    if len(relatorio["erros"]) < MAX_ERROS_RELATORIO:
+        relatorio["erros"].append({"linha": numero, "erros": mensagens})
+
+
+def _validar(relatorio, bloco):
+    validos = []
+    for numero, registro in bloco:
+        relatorio["linhas"] += 1
+        if not isinstance(registro, dict):
+            _erro(relatorio, numero, ["Registro não é um objeto."])
+            continue
+        try:
+            validos.append((numero, schemas.ProdutoImportacao.model_validate(registro)))
+        except ValidationError as e:
+            _erro(relatorio, numero, [
+                f"{'.'.join(str(p) for p in erro['loc']) or 'registro'}: {erro['msg']}" for erro in e.errors()
+            ])
+    return validos
+
+
+def _gravar_bloco(db: Session, validos, chave: str, relatorio, alteracoes, importados):
+    p = models.Produto
+    ids = {produto.id for _, produto in validos if produto.id}
+    nomes = {produto.nome for _, produto in validos if produto.id is None} if chave == "nome" else set()
+
+    existentes, por_nome = {}, defaultdict(list)   # existentes: id -> estoque atual
+    if ids or nomes:
+        for id_produto, nome, estoque_atual in db.execute(
+            select(p.IDProduto, p.Nome, p.Estoque).where(or_(p.IDProduto.in_(ids), p.Nome.in_(nomes)))
+        ):
+            if id_produto in ids:
+                existentes[id_produto] = estoque_atual
+            if nome in nomes:
+                por_nome[nome].append(id_produto)
+                existentes[id_produto] = estoque_atual
+
+    # Uma linha por produto: a última ocorrência no bloco vale
+    linhas = {}
+    for numero, produto in validos:
+        id_produto = produto.id
+        if id_produto is None and chave == "nome":
+            encontrados = por_nome.get(produto.nome, [])
+            if len(encontrados) > 1:
+                _erro(relatorio, numero, [f"nome: {len(encontrados)} produtos com o nome '{produto.nome}'."])
+                continue
+            if encontrados:
+                id_produto = encontrados[0]
+
+        linha = {"IDProduto": id_produto, "Nome": produto.nome, "Preco": produto.preco}
+        for campo, coluna in OPCIONAIS.items():
+            valor = getattr(produto, campo)
+            if campo in produto.model_fields_set and not (campo == "estoque" and valor is None):
+                linha[coluna] = valor
+
+        identificador = id_produto or (produto.nome if chave == "nome" else ("linha", numero))
+        linhas[identificador] = (id_produto in existentes, linha)
+
+    # Campos ausentes no arquivo mantêm o valor atual (e o padrão ao
+    # inserir): um upsert por combinação de colunas presentes. Linhas sem
+    # id nunca colidem: INSERT simples, também por combinação de colunas.
+    grupos, inseridos = defaultdict(list), defaultdict(list)
+    for existe, linha in linhas.values():
+        relatorio["atualizados" if existe else "inseridos"] += 1
+        colunas = tuple(c for c in OPCIONAIS.values() if c in linha)
+        if linha["IDProduto"] is None:
+            inseridos[colunas].append(linha)
+        else:
+            grupos[colunas].append(linha)
+
+    for colunas, grupo in grupos.items():
+        upsert(db, p.__table__, grupo, lambda novos, colunas=colunas: {
+            c: getattr(novos, c) for c in ("Nome", "Preco", *colunas)
+        })
+    if inseridos:
+        _inserir_novos(db, inseridos.values())
+
+    # Razão de estoque (na mesma transação); os eventos saem após o commit
+    for existe, linha in linhas.values():
+        if linha["IDProduto"] is None:
+            continue  # não encontrado depois do INSERT (não deveria acontecer)
+        importados[linha["IDProduto"]] = importados.get(linha["IDProduto"], False) or not existe
+        if "Estoque" in linha or not existe:
+            antes = existentes[linha["IDProduto"]] if existe else None
+            _lancar(db, alteracoes, linha["IDProduto"], linha["Nome"], antes, linha.get("Estoque", 0))
+
+
+def _inserir_novos(db: Session, grupos):
+    """INSERT multi-linha (um por combinação de colunas) das linhas sem id;
+    preenche ``IDProduto`` em cada uma.
+
+    Os ids gerados são maiores que o maior id visto antes do INSERT e
+    crescem na ordem das linhas; os produtos novos com esses nomes, em
+    ordem de id, são casados com as linhas na ordem em que entraram.
+    Roda depois do upsert do bloco, então os ids explícitos já ficam
+    abaixo do maior.
+    """
+    p = models.Produto
+    maior = db.scalar(select(func.max(p.IDProduto))) or 0
+    pendentes = defaultdict(list)
+    for grupo in grupos:
+        db.execute(insert(p.__table__), [{c: v for c, v in linha.items() if c != "IDProduto"} for linha in grupo])
+        for linha in grupo:
+            pendentes[linha["Nome"]].append(linha)
+    for nome in pendentes:
+        pendentes[nome].reverse()   # pop() devolve a primeira inserida
+    for id_produto, nome in db.execute(
+        select(p.IDProduto, p.Nome)
+        .where(p.IDProduto > maior, p.Nome.in_(list(pendentes)))
+        .order_by(p.IDProduto)
+    ):
+        if pendentes.get(nome):
+            pendentes[nome].pop()["IDProduto"] = id_produto
+
+
+def _reindexar(db: Session, importados: dict):
+    """Busca e cache só dos produtos importados (após o commit)."""
+    p = models.Produto
+    ids = sorted(importados)
+    tags = {"catalogo"} if any(importados.values()) else set()
+    for inicio in range(0, len(ids), TAMANHO_BLOCO):
+        for id_produto, nome, categoria, descricao, preco in db.execute(
+            select(p.IDProduto, p.Nome, p.Categoria, p.Descricao, p.Preco)
+            .where(p.IDProduto.in_(ids[inicio:inicio + TAMANHO_BLOCO]))
+        ):
+            busca.indice.indexar(id_produto, nome, categoria, preco, descricao or "")
+            tags.update((f"produto:{id_produto}", f"categoria:{categoria}"))
+    if tags:
+        cache.catalogo.invalidar(*tags)
+
+
+def _lancar(db: Session, alteracoes, id_produto: int, nome: str, antes, depois):
+    if (antes or 0) != depois:
+        movimentacoes.registrar(db, id_produto, antes, depois)
+        alteracoes.append((id_produto, nome, antes, depois))
+
+
+def importar(db: Session, arquivo, formato: str, chave: str = "id", dry_run: bool = False):
+    """Importa produtos de ``arquivo`` (binário) e devolve o relatório."""
+    relatorio = {
+        "dry_run": dry_run,
+        "linhas": 0,
+        "inseridos": 0,
+        "atualizados": 0,
+        "total_erros": 0,
+        "erros": [],
+    }
+    alteracoes = []     # (id, nome, estoque antes, depois), publicadas após o commit
+    importados = {}     # id -> produto novo?
+    registros = ler_csv(arquivo) if formato == "csv" else ler_json(arquivo)
+
+    try:
+        for bloco in _em_blocos(registros, TAMANHO_BLOCO):
+            validos = _validar(relatorio, bloco)
+            if validos:
+                _gravar_bloco(db, validos, chave, relatorio, alteracoes, importados)
+    except UnicodeDecodeError as e:
+        db.rollback()
+        raise ErroImportacao(f"Arquivo não está em UTF-8: {e}")
+    except Exception:
+        db.rollback()
+        raise
+
+    if dry_run:
+        db.rollback()
+        return relatorio
+
+    db.commit()
+
+    _reindexar(db, importados)
+    for alteracao in alteracoes:
+        eventos.estoque_alterado(*alteracao)
+
+    return relatorio
@@ -0,0 +1,271 @@
+"""Métricas da API no formato de texto do Prometheus (GET /metrics).
+
+* ``MiddlewareMetricas`` (ASGI puro): requisições por rota/método/status,
+  histograma de latência e requisições em andamento por rota. A rota é o
+  molde do caminho (``/api/produtos/{produto_id}``), não a URL, para não
+  criar uma série por id.
+* Eventos do SQLAlchemy (em ``Engine``, valem para todos os engines):
+  quantidade e tempo das consultas, por requisição (via ``ContextVar``) e
+  no total, e log das consultas acima de ``DB_CONSULTA_LENTA_MS``.
+
+Tudo fica em memória, por processo; com vários workers, cada um expõe o
+seu /metrics.
+"""
+import bisect
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+
+from . import config
+
+log = logging.getLogger("metricas")
+
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+ROTA_DESCONHECIDA = "desconhecida"
+
+
+# ---------------------------------------------------------
+# TIPOS DE MÉTRICA
+# ---------------------------------------------------------
+class _Familia:
+    tipo = ""
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _cabecalho(self):
+        return [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+
+    def _rotulos(self, valores, extra=""):
+        pares = [f'{r}="{_escapar(v)}"' for r, v in zip(self.rotulos, valores)]
+        if extra:
+            pares.append(extra)
+        return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class Contador(_Familia):
+    tipo = "counter"
+
+    def inc(self, *rotulos, valor=1.0):
+        with self._lock:
+            self._series[rotulos] = self._series.get(rotulos, 0.0) + valor
+
+    def exportar(self):
+        with self._lock:
+            series = list(self._series.items())
+        return self._cabecalho() + [f"{self.nome}{self._rotulos(r)} {_numero(v)}" for r, v in series]
+
+
+class Medidor(Contador):
+    tipo = "gauge"
+
+    def dec(self, *rotulos):
+        self.inc(*rotulos, valor=-1.0)
+
+
+class Histograma(_Familia):
+    tipo = "histogram"
+
+    def __init__(self, nome, ajuda, rotulos=(), buckets=BUCKETS_SEGUNDOS):
+        super().__init__(nome, ajuda, rotulos)
+        self.buckets = tuple(buckets)
+
+    def observar(self, valor, *rotulos):
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(rotulos)
+            if serie is None:
+                serie = self._series[rotulos] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][indice] += 1
+            serie[1] += valor
+
+    def exportar(self):
+        with self._lock:
+            series = [(r, list(contagens), soma) for r, (contagens, soma) in self._series.items()]
+
+        linhas = self._cabecalho()
+        for rotulos, contagens, soma in series:
+            acumulado = 0
+            limites = [_numero(limite) for limite in self.buckets] + ["+Inf"]
+            for limite, contagem in zip(limites, contagens):
+                acumulado += contagem
+                le = 'le="%s"' % limite
+                linhas.append(f"{self.nome}_bucket{self._rotulos(rotulos, le)} {acumulado}")
+            linhas.append(f"{self.nome}_sum{self._rotulos(rotulos)} {_numero(soma)}")
+            linhas.append(f"{self.nome}_count{self._rotulos(rotulos)} {acumulado}")
+        return linhas
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _numero(valor) -> str:
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+# ---------------------------------------------------------
+# MÉTRICAS
+# ---------------------------------------------------------
+requisicoes = Contador(
+    "http_requisicoes_total", "Requisições HTTP atendidas.", ("metodo", "rota", "status")
+)
+latencia = Histograma(
+    "http_requisicao_segundos", "Latência das requisições HTTP.", ("metodo", "rota")
+)
+em_andamento = Medidor(
+    "http_requisicoes_em_andamento", "Requisições HTTP em andamento.", ("metodo", "rota")
+)
+consultas = Contador("db_consultas_total", "Consultas SQL executadas.")
+consultas_lentas = Contador(
+    "db_consultas_lentas_total", f"Consultas SQL acima de {config.DB_CONSULTA_LENTA_MS} ms."
+)
+tempo_consulta = Histograma("db_consulta_segundos", "Duração das consultas SQL.")
+consultas_requisicao = Histograma(
+    "db_consultas_por_requisicao", "Consultas SQL por requisição HTTP.", ("rota",), BUCKETS_CONSULTAS
+)
+tempo_db_requisicao = Histograma(
+    "db_tempo_por_requisicao_segundos", "Tempo total de banco por requisição HTTP.", ("rota",)
+)
+
+FAMILIAS = (
+    requisicoes, latencia, em_andamento,
+    consultas, consultas_lentas, tempo_consulta, consultas_requisicao, tempo_db_requisicao,
+)
+
+
+# ---------------------------------------------------------
+# SQL POR REQUISIÇÃO
+# ---------------------------------------------------------
+class _BancoRequisicao:
+    __slots__ = ("rota", "consultas", "tempo")
+
+    def __init__(self, rota):
+        self.rota = rota
+        self.consultas = 0
+        self.tempo = 0.0
+
+
+_requisicao: ContextVar = ContextVar("metricas_requisicao", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _antes_consulta(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metricas_inicio", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _depois_consulta(conn, cursor, statement, parameters, context, executemany):
+    duracao = time.perf_counter() - conn.info["metricas_inicio"].pop()
+
+    consultas.inc()
+    tempo_consulta.observar(duracao)
+
+    banco = _requisicao.get()
+    if banco is not None:
+        banco.consultas += 1
+        banco.tempo += duracao
+
+    if duracao * 1000 >= config.DB_CONSULTA_LENTA_MS:
+        consultas_lentas.inc()
+        log.warning(
+            "consulta lenta: %.1f ms (rota %s): %s",
+            duracao * 1000, banco.rota if banco else "-", " ".join(statement.split())[:500],
+        )
+
+
+# ---------------------------------------------------------
+# MIDDLEWARE
+# ---------------------------------------------------------
+def _rotas(app):
+    for rota in getattr(getattr(app, "router", None), "routes", ()):
+        # FastAPI recente guarda cada router incluído como um nó só
+        efetivas = getattr(rota, "effective_route_contexts", None)
+        yield from efetivas() if efetivas else (rota,)
+
+
+def _rota(scope) -> str:
+    """Molde da rota, como o roteador do Starlette a escolheria."""
+    parcial = ROTA_DESCONHECIDA
+    for rota in _rotas(scope.get("app")):
+        correspondencia, _ = rota.matches(scope)
+        if correspondencia == Match.FULL:
+            return getattr(rota, "path", ROTA_DESCONHECIDA)
+        if correspondencia == Match.PARTIAL and parcial == ROTA_DESCONHECIDA:
+            parcial = getattr(rota, "path", ROTA_DESCONHECIDA)  # método errado (405)
+    return parcial
+
+
+class MiddlewareMetricas:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metodo = scope["method"]
+        rota = _rota(scope)
+        status = 500
+
+        async def enviar(mensagem):
+            nonlocal status
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+            await send(mensagem)
+
+        banco = _BancoRequisicao(rota)
+        token = _requisicao.set(banco)
+        em_andamento.inc(metodo, rota)
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            duracao = time.perf_counter() - inicio
+            em_andamento.dec(metodo, rota)
+            _requisicao.reset(token)
+
+            requisicoes.inc(metodo, rota, str(status))
+            latencia.observar(duracao, metodo, rota)
+            consultas_requisicao.observar(banco.consultas, rota)
+            tempo_db_requisicao.observar(banco.tempo, rota)
+
+
+# ---------------------------------------------------------
+# EXPOSIÇÃO
+# ---------------------------------------------------------
+def familias_pool(estatisticas: dict):
+    """Medidas de ``database.estatisticas_pool()`` como famílias Prometheus."""
+    conexoes = Medidor("db_pool_conexoes", "Conexões do pool por estado.", ("engine", "estado"))
+    checkouts = Contador("db_pool_checkouts_total", "Conexões retiradas do pool.", ("engine",))
+    timeouts = Contador("db_pool_timeouts_total", "Esperas por conexão que estouraram o timeout.", ("engine",))
+    espera = Medidor("db_pool_espera_max_segundos", "Maior espera por uma conexão do pool.", ("engine",))
+
+    for nome, dados in estatisticas.items():
+        for estado in ("em_uso", "ociosas", "overflow"):
+            conexoes.inc(nome, estado, valor=dados[estado])
+        if "checkouts" in dados:
+            checkouts.inc(nome, valor=dados["checkouts"])
+            timeouts.inc(nome, valor=dados["timeouts"])
+            espera.inc(nome, valor=dados["espera_max_ms"] / 1000)
+    return conexoes, checkouts, timeouts, espera
+
+
+def exportar(extra=()) -> str:
+    """Texto do /metrics; ``extra`` são famílias calculadas na hora."""
+    linhas = []
+    for familia in (*FAMILIAS, *extra):
+        linhas.extend(familia.exportar())
+    return "\n".join(linhas) + "\n"
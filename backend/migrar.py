@@ -0,0 +1,105 @@
+"""Cria no banco configurado (DATABASE_URL ou DB_*) as tabelas que faltam.
+
+Substitui o ``create_all`` que rodava na importação do app: rode-o no
+deploy, antes de subir os workers. Tabelas que já existem não são
+alteradas; views e dados iniciais continuam em alfaiataria.sql.
+
+No MySQL, os triggers que a API pressupõe (``TRIGGERS``) são recriados a
+cada execução (DROP TRIGGER IF EXISTS + CREATE). Bancos criados com uma
+versão antiga de alfaiataria.sql têm um trg_itensvenda_after_insert que
+também baixa o estoque e soma o total da venda; com a baixa em
+estoque.py e o total gravado por crud.py, cada venda contaria duas vezes.
+Os triggers atuais também gravam as datas em UTC, como a API, e não no
+fuso da sessão.
+
+    python -m backend.migrar
+    python -m backend.migrar --sql     # só mostra o DDL, sem conectar
+"""
+import argparse
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from . import models  # noqa: F401  (registra as tabelas em Base.metadata)
+from .database import Base, obter_engine
+
+
+# Mantidos iguais aos de alfaiataria.sql. As datas são gravadas em UTC
+# (UTC_TIMESTAMP()), como as que a API grava (datetime.utcnow): o
+# CURRENT_TIMESTAMP do padrão das colunas segue o fuso da sessão.
+TRIGGERS = {
+    # Só registra a saída: a baixa do estoque é feita pela API antes dos
+    # itens (estoque.py), e o Total da venda já é gravado por crud.py
+    "trg_itensvenda_after_insert": """
+CREATE TRIGGER trg_itensvenda_after_insert
+AFTER INSERT ON ItensVenda
+FOR EACH ROW
+BEGIN
+  INSERT INTO MovimentacoesEstoque (IDProduto, TipoMovimentacao, Quantidade, DataMovimentacao)
+  VALUES (NEW.IDProduto, 'Saída', NEW.Quantidade, UTC_TIMESTAMP());
+END""",
+    "trg_produtos_after_update": """
+CREATE TRIGGER trg_produtos_after_update
+AFTER UPDATE ON Produtos
+FOR EACH ROW
+BEGIN
+  IF OLD.Estoque > 0 AND NEW.Estoque <= 0 THEN
+    INSERT INTO AvisosEstoque (IDProduto, Mensagem, DataAviso)
+    VALUES (NEW.IDProduto, CONCAT('Estoque zerado do produto ID ', NEW.IDProduto), UTC_TIMESTAMP());
+  END IF;
+END""",
+}
+
+
+def migrar(engine=None):
+    """Cria as tabelas ausentes e devolve os nomes criados."""
+    engine = engine or obter_engine()
+    inspetor = inspect(engine)
+    faltando = [t for t in Base.metadata.sorted_tables if not inspetor.has_table(t.name)]
+    Base.metadata.create_all(bind=engine, tables=faltando)
+    return [t.name for t in faltando]
+
+
+def recriar_triggers(engine=None):
+    """Recria os triggers (só MySQL); devolve os nomes."""
+    engine = engine or obter_engine()
+    if engine.dialect.name != "mysql":
+        return []
+    with engine.begin() as conn:
+        for nome, corpo in TRIGGERS.items():
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {nome}"))
+            conn.execute(text(corpo.strip()))
+    return list(TRIGGERS)
+
+
+def ddl(engine=None):
+    dialeto = (engine or obter_engine()).dialect
+    for tabela in Base.metadata.sorted_tables:
+        yield f"{str(CreateTable(tabela).compile(dialect=dialeto)).strip()};"
+        for indice in sorted(tabela.indexes, key=lambda i: i.name):
+            yield f"{CreateIndex(indice).compile(dialect=dialeto)};"
+    if dialeto.name == "mysql":
+        yield "DELIMITER //"
+        for nome, corpo in TRIGGERS.items():
+            yield f"DROP TRIGGER IF EXISTS {nome}//\n{corpo.strip()}//"
+        yield "DELIMITER ;"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sql", action="store_true", help="mostra o DDL em vez de executar")
+    args = parser.parse_args()
+
+    if args.sql:
+        print("\n\n".join(ddl()))
+        return
+
+    criadas = migrar()
+    print(f"Tabelas criadas: {', '.join(criadas)}." if criadas else "Nenhuma tabela a criar.")
+    triggers = recriar_triggers()
+    if triggers:
+        print(f"Triggers recriados: {', '.join(triggers)}.")
+
+
+if __name__ == "__main__":
+    main()
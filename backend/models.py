@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Double, Text, TIMESTAMP
+from sqlalchemy import Column, Integer, String, ForeignKey, Double, Text, TIMESTAMP, Date, DateTime, Enum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -75,3 +75,123 @@ class ItemVenda(Base):
     PrecoUnitario = Column(Double, nullable=False)
 
     Venda = relationship("Venda", back_populates="Itens")
+
+
+# ---------------------------------------------------
+# TABELA: AvisosEstoque (gravada pelo trigger trg_produtos_after_update)
+# ---------------------------------------------------
+class AvisoEstoque(Base):
+    __tablename__ = "AvisosEstoque"
+
+    IDAviso = Column(Integer, primary_key=True, autoincrement=True)
+    IDProduto = Column(Integer, ForeignKey("Produtos.IDProduto"), nullable=False)
+    Mensagem = Column(String(255), nullable=False)
+    DataAviso = Column(TIMESTAMP, default=datetime.utcnow)
+
+
+# ---------------------------------------------------
+# ROLLUPS DE VENDAS (mantidos por relatorios.py)
+# ---------------------------------------------------
+class VendaDiaria(Base):
+    __tablename__ = "VendasDiarias"
+
+    Data = Column(Date, primary_key=True)
+    QtdVendas = Column(Integer, nullable=False, default=0)
+    QtdItens = Column(Integer, nullable=False, default=0)
+    Receita = Column(Double, nullable=False, default=0)
+
+
+class VendaPorProduto(Base):
+    __tablename__ = "VendasPorProduto"
+
+    IDProduto = Column(Integer, ForeignKey("Produtos.IDProduto", ondelete="CASCADE"), primary_key=True)
+    QtdVendas = Column(Integer, nullable=False, default=0)
+    Quantidade = Column(Integer, nullable=False, default=0, index=True)
+    Receita = Column(Double, nullable=False, default=0, index=True)
+
+
+class VendaPorAtendente(Base):
+    __tablename__ = "VendasPorAtendente"
+
+    IDUsuarioAtendente = Column(Integer, ForeignKey("usuarios.IDUsuario", ondelete="CASCADE"), primary_key=True)
+    QtdVendas = Column(Integer, nullable=False, default=0)
+    Receita = Column(Double, nullable=False, default=0)
+
+
+# ---------------------------------------------------
+# REPLICAÇÃO DE VENDAS PARA O MONGO (ver replicacao.py)
+# ---------------------------------------------------
+class OutboxVenda(Base):
+    __tablename__ = "OutboxVendas"
+
+    IDEvento = Column(Integer, primary_key=True, autoincrement=True)
+    IDVenda = Column(Integer, nullable=False, index=True)
+    CriadoEm = Column(TIMESTAMP, default=datetime.utcnow, nullable=False)
+
+
+class CheckpointReplicacao(Base):
+    __tablename__ = "CheckpointsReplicacao"
+
+    Nome = Column(String(60), primary_key=True)
+    UltimoEvento = Column(Integer, nullable=False, default=0)
+    AtualizadoEm = Column(TIMESTAMP, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# ---------------------------------------------------
+# VENDAS ASSÍNCRONAS (ver fila_vendas.py)
+# ---------------------------------------------------
+class ChaveVenda(Base):
+    __tablename__ = "ChavesVenda"
+
+    Chave = Column(String(64), primary_key=True)
+    IDVenda = Column(Integer, nullable=False)
+    CriadoEm = Column(TIMESTAMP, default=datetime.utcnow, nullable=False)
+
+
+# ---------------------------------------------------
+# RAZÃO DE ESTOQUE (ver movimentacoes.py)
+# ---------------------------------------------------
+class MovimentacaoEstoque(Base):
+    __tablename__ = "MovimentacoesEstoque"
+    __table_args__ = (
+        Index("idx_movimentacoes_produto_data", "IDProduto", "DataMovimentacao"),
+        Index("idx_movimentacoes_data", "DataMovimentacao"),
+    )
+
+    IDMovimentacao = Column(Integer, primary_key=True, autoincrement=True)
+    IDProduto = Column(Integer, ForeignKey("Produtos.IDProduto"), nullable=False)
+    TipoMovimentacao = Column(Enum("Entrada", "Saída"), nullable=False)
+    Quantidade = Column(Integer, nullable=False)
+    DataMovimentacao = Column(TIMESTAMP, default=datetime.utcnow)
+
+
+class SnapshotEstoque(Base):
+    __tablename__ = "SnapshotsEstoque"
+
+    IDProduto = Column(Integer, ForeignKey("Produtos.IDProduto", ondelete="CASCADE"), primary_key=True)
+    DataSnapshot = Column(DateTime, primary_key=True)
+    Estoque = Column(Integer, nullable=False)
+
+
+# ---------------------------------------------------
+# ARQUIVO DE VENDAS (ver arquivamento.py; particionado por mês no MySQL)
+# ---------------------------------------------------
+class VendaArquivada(Base):
+    __tablename__ = "VendasArquivo"
+
+    IDVenda = Column(Integer, primary_key=True, autoincrement=False)
+    DataVenda = Column(DateTime, primary_key=True)
+    IDUsuarioCliente = Column(Integer, nullable=False, index=True)
+    IDUsuarioAtendente = Column(Integer, nullable=False, index=True)
+    Total = Column(Double, nullable=False, default=0)
+
+
+class ItemVendaArquivado(Base):
+    __tablename__ = "ItensVendaArquivo"
+
+    IDItem = Column(Integer, primary_key=True, autoincrement=False)
+    DataVenda = Column(DateTime, primary_key=True)
+    IDVenda = Column(Integer, nullable=False, index=True)
+    IDProduto = Column(Integer, nullable=False, index=True)
+    Quantidade = Column(Integer, nullable=False)
+    PrecoUnitario = Column(Double, nullable=False)
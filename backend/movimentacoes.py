@@ -0,0 +1,309 @@
+"""Razão de estoque (MovimentacoesEstoque) e estoque em uma data.
+
+MovimentacoesEstoque recebe uma ``Saída`` por item vendido (trigger
+trg_itensvenda_after_insert) e, pela API, uma ``Entrada`` ou ``Saída`` a
+cada cadastro ou edição de estoque. A tabela nunca é compactada; para
+responder "quanto havia do produto X na data D" sem somar a história toda,
+o job de snapshots grava em SnapshotsEstoque o estoque de cada produto a
+cada corte:
+
+* o corte fica ``ESTOQUE_SNAPSHOT_MARGEM_S`` no passado, para que as
+  transações com movimentações até ele já tenham terminado
+* cada produto movimentado desde o último snapshot ganha um novo, igual ao
+  anterior mais o saldo das movimentações do intervalo; o primeiro de cada
+  produto parte de Produtos.Estoque, descontado o que veio depois do corte
+
+``estoque_em`` parte do snapshot mais próximo antes de D e soma as
+movimentações entre ele e D (índice (IDProduto, DataMovimentacao)): o custo
+é o de um intervalo entre snapshots, qualquer que seja a idade da loja.
+Para uma data anterior ao primeiro snapshot do produto, volta a partir
+dele.
+
+``reconciliar`` compara Produtos.Estoque com o último snapshot mais as
+movimentações posteriores e lista as divergências (estoque alterado fora da
+API, direto no banco); com ``corrigir``, lança a diferença como
+movimentação de ajuste.
+
+As datas são UTC, como DataVenda: a API grava ``datetime.utcnow()`` e o
+trigger de ItensVenda, ``UTC_TIMESTAMP()`` (nunca o CURRENT_TIMESTAMP do
+padrão da coluna, que segue o fuso da sessão do MySQL).
+
+    python -m backend.movimentacoes snapshot [--a-cada 3600]
+    python -m backend.movimentacoes historico --periodo-h 24   # snapshots retroativos (tabela vazia)
+    python -m backend.movimentacoes reconciliar [--corrigir]
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, case, delete, exists, func, insert, select
+from sqlalchemy.orm import Session
+
+from . import config, models
+
+ENTRADA, SAIDA = "Entrada", "Saída"
+LOTE_INSERT = 5000
+
+
+def _saldo():
+    m = models.MovimentacaoEstoque
+    return func.coalesce(func.sum(case((m.TipoMovimentacao == ENTRADA, m.Quantidade), else_=-m.Quantidade)), 0)
+
+
+def _utc(data: datetime) -> datetime:
+    if data.tzinfo is not None:
+        data = data.astimezone(timezone.utc).replace(tzinfo=None)
+    return data
+
+
+def _corte_padrao() -> datetime:
+    return datetime.utcnow().replace(microsecond=0) - timedelta(seconds=config.ESTOQUE_SNAPSHOT_MARGEM_S)
+
+
+# ---------------------------------------------------------
+# REGISTRO (chamado pelos caminhos de escrita, antes do commit)
+# ---------------------------------------------------------
+def registrar(db: Session, id_produto: int, antes, depois):
+    """Lança a diferença de estoque de um cadastro ou edição."""
+    diferenca = (depois or 0) - (antes or 0)
+    if diferenca:
+        db.add(models.MovimentacaoEstoque(
+            IDProduto=id_produto,
+            TipoMovimentacao=ENTRADA if diferenca > 0 else SAIDA,
+            Quantidade=abs(diferenca),
+        ))
+
+
+def apagar(db: Session, id_produto: int):
+    """Remove o razão e os snapshots de um produto que vai ser excluído."""
+    db.execute(delete(models.SnapshotEstoque).where(models.SnapshotEstoque.IDProduto == id_produto))
+    db.execute(delete(models.MovimentacaoEstoque).where(models.MovimentacaoEstoque.IDProduto == id_produto))
+
+
+# ---------------------------------------------------------
+# SNAPSHOTS
+# ---------------------------------------------------------
+def tirar_snapshots(db: Session, corte: datetime = None) -> int:
+    """Grava os snapshots do corte (padrão: agora menos a margem); devolve quantos."""
+    corte = corte or _corte_padrao()
+    m, s, p = models.MovimentacaoEstoque, models.SnapshotEstoque, models.Produto
+
+    ultimo = (
+        select(s.IDProduto, func.max(s.DataSnapshot).label("data"))
+        .where(s.DataSnapshot <= corte)
+        .group_by(s.IDProduto)
+        .subquery()
+    )
+    anterior = (
+        select(s.IDProduto, s.DataSnapshot, s.Estoque)
+        .join(ultimo, and_(s.IDProduto == ultimo.c.IDProduto, s.DataSnapshot == ultimo.c.data))
+        .subquery()
+    )
+    # Com snapshot: só os movimentados desde ele
+    rolados = db.execute(
+        select(anterior.c.IDProduto, anterior.c.Estoque + _saldo())
+        .join(m, and_(
+            m.IDProduto == anterior.c.IDProduto,
+            m.DataMovimentacao > anterior.c.DataSnapshot,
+            m.DataMovimentacao <= corte,
+        ))
+        .group_by(anterior.c.IDProduto, anterior.c.Estoque)
+    ).all()
+
+    # Sem snapshot: estoque atual menos o que veio depois do corte (mesma
+    # transação, então as duas leituras são do mesmo instante)
+    depois = (
+        select(m.IDProduto, _saldo().label("saldo"))
+        .where(m.DataMovimentacao > corte)
+        .group_by(m.IDProduto)
+        .subquery()
+    )
+    novos = db.execute(
+        select(p.IDProduto, p.Estoque - func.coalesce(depois.c.saldo, 0))
+        .outerjoin(depois, depois.c.IDProduto == p.IDProduto)
+        .where(~exists().where(s.IDProduto == p.IDProduto))
+    ).all()
+
+    linhas = [{"IDProduto": i, "DataSnapshot": corte, "Estoque": int(e)} for i, e in (*rolados, *novos)]
+    for inicio in range(0, len(linhas), LOTE_INSERT):
+        db.execute(insert(s), linhas[inicio:inicio + LOTE_INSERT])
+    db.commit()
+    return len(linhas)
+
+
+def preencher_historico(db: Session, periodo: timedelta, corte: datetime = None) -> int:
+    """Snapshots retroativos, um por ``periodo`` desde a primeira movimentação.
+
+    Só com SnapshotsEstoque vazia. O estoque anterior à primeira movimentação
+    sai de Produtos.Estoque menos o saldo de todo o razão; a partir dele, as
+    movimentações são somadas em ordem, numa única leitura.
+    """
+    m, s, p = models.MovimentacaoEstoque, models.SnapshotEstoque, models.Produto
+    if db.execute(select(s.IDProduto).limit(1)).first() is not None:
+        raise ValueError("SnapshotsEstoque já tem snapshots: o histórico só é gerado com a tabela vazia.")
+
+    corte = corte or _corte_padrao()
+    inicio = db.scalar(select(func.min(m.DataMovimentacao)))
+    if inicio is None or inicio > corte:
+        return tirar_snapshots(db, corte)
+
+    estoque = dict(db.execute(select(p.IDProduto, p.Estoque)).all())
+    for id_produto, saldo in db.execute(select(m.IDProduto, _saldo()).group_by(m.IDProduto)):
+        if id_produto in estoque:
+            estoque[id_produto] -= int(saldo)
+
+    linhas, movidos = [], set()
+
+    def fechar(data):
+        linhas.extend({"IDProduto": i, "DataSnapshot": data, "Estoque": estoque[i]} for i in sorted(movidos))
+        movidos.clear()
+
+    proximo = inicio.replace(microsecond=0) + periodo
+    movimentacoes = db.execute(
+        select(m.IDProduto, m.TipoMovimentacao, m.Quantidade, m.DataMovimentacao)
+        .where(m.DataMovimentacao <= corte)
+        .order_by(m.DataMovimentacao, m.IDMovimentacao)
+    )
+    for id_produto, tipo, quantidade, data in movimentacoes:
+        if id_produto not in estoque:
+            continue
+        while data > proximo:
+            fechar(proximo)
+            proximo += periodo
+        estoque[id_produto] += quantidade if tipo == ENTRADA else -quantidade
+        movidos.add(id_produto)
+    fechar(min(proximo, corte))
+
+    for i in range(0, len(linhas), LOTE_INSERT):
+        db.execute(insert(s), linhas[i:i + LOTE_INSERT])
+    # Fecha o corte: rola quem mexeu no último período, ancora quem nunca mexeu
+    return len(linhas) + tirar_snapshots(db, corte)
+
+
+# ---------------------------------------------------------
+# ESTOQUE EM UMA DATA
+# ---------------------------------------------------------
+def _movimentado(db: Session, id_produto: int, apos: datetime, ate: datetime = None):
+    """(saldo, quantidade) das movimentações em (apos, ate]."""
+    m = models.MovimentacaoEstoque
+    consulta = select(_saldo(), func.count()).where(m.IDProduto == id_produto, m.DataMovimentacao > apos)
+    if ate is not None:
+        consulta = consulta.where(m.DataMovimentacao <= ate)
+    saldo, quantidade = db.execute(consulta).one()
+    return int(saldo), quantidade
+
+
+def estoque_em(db: Session, id_produto: int, em: datetime = None):
+    """Estoque do produto na data ``em`` (padrão: o atual); None se não existe."""
+    p, s = models.Produto, models.SnapshotEstoque
+    atual = db.scalar(select(p.Estoque).where(p.IDProduto == id_produto))
+    if atual is None:
+        return None
+    if em is None:
+        return {"id": id_produto, "em": None, "estoque": atual, "base": {"origem": "estoque_atual", "data": None}}
+
+    em = _utc(em)
+    anterior = db.execute(
+        select(s.DataSnapshot, s.Estoque)
+        .where(s.IDProduto == id_produto, s.DataSnapshot <= em)
+        .order_by(s.DataSnapshot.desc())
+        .limit(1)
+    ).first()
+    if anterior is not None:
+        saldo, quantidade = _movimentado(db, id_produto, anterior.DataSnapshot, em)
+        estoque, base = anterior.Estoque + saldo, {"origem": "snapshot", "data": anterior.DataSnapshot}
+    else:
+        # Antes do primeiro snapshot: desfaz as movimentações a partir dele
+        # (ou do estoque atual, se o job ainda não rodou)
+        posterior = db.execute(
+            select(s.DataSnapshot, s.Estoque)
+            .where(s.IDProduto == id_produto, s.DataSnapshot > em)
+            .order_by(s.DataSnapshot)
+            .limit(1)
+        ).first()
+        if posterior is not None:
+            saldo, quantidade = _movimentado(db, id_produto, em, posterior.DataSnapshot)
+            estoque, base = posterior.Estoque - saldo, {"origem": "snapshot", "data": posterior.DataSnapshot}
+        else:
+            saldo, quantidade = _movimentado(db, id_produto, em)
+            estoque, base = atual - saldo, {"origem": "estoque_atual", "data": None}
+
+    if base["data"] is not None:
+        base["data"] = base["data"].isoformat() + "Z"
+    return {
+        "id": id_produto,
+        "em": em.isoformat() + "Z",
+        "estoque": estoque,
+        "base": base,
+        "movimentacoes": quantidade,
+    }
+
+
+# ---------------------------------------------------------
+# RECONCILIAÇÃO
+# ---------------------------------------------------------
+def reconciliar(db: Session, corrigir: bool = False):
+    """Produtos.Estoque x último snapshot + razão posterior."""
+    m, s, p = models.MovimentacaoEstoque, models.SnapshotEstoque, models.Produto
+
+    ultimo = select(s.IDProduto, func.max(s.DataSnapshot).label("data")).group_by(s.IDProduto).subquery()
+    saldo = (
+        select(ultimo.c.IDProduto, _saldo().label("saldo"))
+        .join(m, and_(m.IDProduto == ultimo.c.IDProduto, m.DataMovimentacao > ultimo.c.data))
+        .group_by(ultimo.c.IDProduto)
+        .subquery()
+    )
+    linhas = db.execute(
+        select(p.IDProduto, p.Nome, p.Estoque, s.Estoque + func.coalesce(saldo.c.saldo, 0))
+        .join(ultimo, ultimo.c.IDProduto == p.IDProduto)
+        .join(s, and_(s.IDProduto == ultimo.c.IDProduto, s.DataSnapshot == ultimo.c.data))
+        .outerjoin(saldo, saldo.c.IDProduto == p.IDProduto)
+        .order_by(p.IDProduto)
+    ).all()
+    sem_snapshot = db.scalar(
+        select(func.count()).select_from(p).where(~exists().where(s.IDProduto == p.IDProduto))
+    )
+
+    divergencias = [
+        {"id": i, "nome": nome, "estoque": estoque, "esperado": int(esperado), "diferenca": estoque - int(esperado)}
+        for i, nome, estoque, esperado in linhas
+        if estoque != int(esperado)
+    ]
+    if corrigir and divergencias:
+        for d in divergencias:
+            registrar(db, d["id"], d["esperado"], d["estoque"])
+        db.commit()
+
+    return {
+        "verificados": len(linhas),
+        "sem_snapshot": sem_snapshot,
+        "divergencias": divergencias,
+        "corrigidas": len(divergencias) if corrigir else 0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshots e reconciliação do razão de estoque.")
+    parser.add_argument("comando", choices=["snapshot", "historico", "reconciliar"])
+    parser.add_argument("--a-cada", type=float, help="snapshot: repete a cada N segundos")
+    parser.add_argument("--periodo-h", type=float, default=24, help="historico: horas entre snapshots")
+    parser.add_argument("--corrigir", action="store_true", help="reconciliar: lança as diferenças como ajuste")
+    args = parser.parse_args()
+
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if args.comando == "reconciliar":
+            print(json.dumps(reconciliar(db, args.corrigir), ensure_ascii=False, indent=2))
+        elif args.comando == "historico":
+            print(f"{preencher_historico(db, timedelta(hours=args.periodo_h))} snapshots gravados.")
+        else:
+            while True:
+                print(f"{tirar_snapshots(db)} snapshots gravados.")
+                if not args.a_cada:
+                    break
+                time.sleep(args.a_cada)
+    finally:
+        db.close()
@@ -0,0 +1,161 @@
+"""Reajuste de preços em lote (POST /api/precos/simular e /aplicar).
+
+Os produtos ao alcance das regras (IDProduto, Preco, Categoria) são
+carregados em arrays do NumPy e as regras são aplicadas de uma vez sobre os
+arrays, sem laço produto a produto:
+
+* cada regra vale para uma categoria e/ou lista de ids (ou para todos) e
+  aplica um desconto percentual e/ou um abatimento fixo em R$; as regras
+  se acumulam, na ordem em que vêm
+* o desconto total fica entre 0 e 90% do preço atual, como em
+  ``preco_com_desconto()`` do banco, e nenhum preço passa abaixo de R$ 0,01
+* ``arredondar_90`` leva o preço final dos produtos alcançados por alguma
+  regra ao ``,90`` imediatamente abaixo (89,99 -> 89,90), se isso não
+  violar o limite de 90%
+
+``simular`` devolve só o que muda, sem gravar. ``aplicar`` refaz o cálculo
+com as linhas travadas (FOR UPDATE, na ordem de IDProduto, como em
+estoque.py) e grava tudo numa transação, com ``UPDATE ... SET Preco = CASE
+IDProduto ...`` em blocos de ``LOTE_UPDATE`` ids. A ``assinatura`` da
+simulação garante que o que se grava é o que foi conferido: se algum preço
+mudou nesse meio-tempo, ``aplicar`` recusa.
+
+O NumPy é opcional; sem ele, os endpoints respondem 501.
+"""
+import hashlib
+
+from sqlalchemy import and_, case, or_, select, update
+from sqlalchemy.orm import Session
+
+from . import busca, cache, models, schemas
+
+try:
+    import numpy as np
+except ImportError:  # opcional: só o reajuste em lote usa
+    np = None
+
+DESCONTO_MAX = 90
+LOTE_UPDATE = 1000
+
+
+class PrecosAlterados(Exception):
+    """Os preços mudaram desde a simulação."""
+
+
+def _alcance(ajuste: schemas.AjustePrecos):
+    """WHERE com os produtos que alguma regra alcança; None se for o catálogo todo."""
+    p = models.Produto
+    condicoes = []
+    for regra in ajuste.regras:
+        filtros = []
+        if regra.categoria is not None:
+            filtros.append(p.Categoria == regra.categoria)
+        if regra.ids:
+            filtros.append(p.IDProduto.in_(regra.ids))
+        if not filtros:
+            return None
+        condicoes.append(and_(*filtros))
+    return or_(*condicoes) if condicoes else None
+
+
+def _carregar(db: Session, ajuste: schemas.AjustePrecos, travar: bool = False):
+    """Só as linhas ao alcance das regras: com ``travar``, o FOR UPDATE não
+    pega o catálogo inteiro (vendas de outras categorias seguem livres)."""
+    p = models.Produto
+    consulta = select(p.IDProduto, p.Preco, p.Categoria).order_by(p.IDProduto)
+    alcance = _alcance(ajuste)
+    if alcance is not None:
+        consulta = consulta.where(alcance)
+    if travar:
+        consulta = consulta.with_for_update()
+    linhas = db.execute(consulta).all()
+
+    ids = np.fromiter((l[0] for l in linhas), dtype=np.int64, count=len(linhas))
+    precos = np.fromiter((l[1] for l in linhas), dtype=np.float64, count=len(linhas))
+    categorias = np.array([l[2] for l in linhas], dtype=object)
+    return ids, precos, categorias
+
+
+def calcular(ids, precos, categorias, ajuste: schemas.AjustePrecos):
+    """Novos preços, na mesma ordem de ``precos``."""
+    novos = precos.copy()
+    tocados = np.zeros(len(ids), dtype=bool)
+    for regra in ajuste.regras:
+        alvo = np.ones(len(ids), dtype=bool)
+        if regra.categoria is not None:
+            alvo &= categorias == regra.categoria
+        if regra.ids:
+            alvo &= np.isin(ids, regra.ids)
+        tocados |= alvo
+        percentual = min(max(regra.percentual, 0), DESCONTO_MAX)
+        novos = np.where(alvo, novos * (1 - percentual / 100) - regra.valor, novos)
+
+    piso = np.maximum(np.round(precos * (1 - DESCONTO_MAX / 100), 2), 0.01)
+    novos = np.maximum(np.round(novos, 2), piso)
+    if ajuste.arredondar_90:
+        arredondados = np.round(np.floor(np.round(novos + 0.10, 2)) - 0.10, 2)
+        novos = np.where(tocados & (arredondados >= piso), arredondados, novos)
+    return novos
+
+
+def _assinatura(ids, precos, novos) -> str:
+    return hashlib.sha1(ids.tobytes() + precos.tobytes() + novos.tobytes()).hexdigest()[:16]
+
+
+def _diferenca(db: Session, ajuste: schemas.AjustePrecos, travar: bool = False):
+    ids, precos, categorias = _carregar(db, ajuste, travar)
+    novos = calcular(ids, precos, categorias, ajuste)
+    mudou = np.flatnonzero(np.abs(novos - precos) >= 0.005)
+    ids, precos, categorias, novos = ids[mudou], precos[mudou], categorias[mudou], novos[mudou]
+    return ids, precos, categorias, novos, _assinatura(ids, precos, novos)
+
+
+def simular(db: Session, ajuste: schemas.AjustePrecos):
+    ids, precos, categorias, novos, assinatura = _diferenca(db, ajuste)
+    total_atual, total_novo = float(precos.sum()), float(novos.sum())
+    return {
+        "alterados": len(ids),
+        "assinatura": assinatura,
+        "total_atual": round(total_atual, 2),
+        "total_novo": round(total_novo, 2),
+        "desconto_medio_pct": round((1 - total_novo / total_atual) * 100, 2) if total_atual else 0.0,
+        "itens": [
+            {
+                "id": i,
+                "categoria": c,
+                "preco_atual": atual,
+                "preco_novo": novo,
+                "desconto_pct": round((1 - novo / atual) * 100, 2) if atual else 0.0,
+            }
+            for i, c, atual, novo in zip(ids.tolist(), categorias.tolist(), precos.tolist(), novos.tolist())
+        ],
+    }
+
+
+def aplicar(db: Session, ajuste: schemas.AplicacaoPrecos):
+    """Grava os novos preços numa transação; devolve quantos mudaram."""
+    try:
+        ids, precos, _, novos, assinatura = _diferenca(db, ajuste, travar=True)
+        if ajuste.assinatura is not None and ajuste.assinatura != assinatura:
+            raise PrecosAlterados(assinatura)
+
+        p = models.Produto
+        novos_precos = dict(zip(ids.tolist(), novos.tolist()))
+        ordem = list(novos_precos)
+        for inicio in range(0, len(ordem), LOTE_UPDATE):
+            bloco = {i: novos_precos[i] for i in ordem[inicio:inicio + LOTE_UPDATE]}
+            db.execute(
+                update(p)
+                .where(p.IDProduto.in_(list(bloco)))
+                .values(Preco=case(bloco, value=p.IDProduto))
+                .execution_options(synchronize_session=False)
+            )
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    if novos_precos:
+        cache.produtos_alterados(ordem)
+        busca.indice.atualizar_precos(novos_precos)
+    return {"alterados": len(novos_precos), "assinatura": assinatura}
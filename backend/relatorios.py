@@ -0,0 +1,207 @@
+"""Rollups de vendas (por dia, por produto e por atendente).
+
+As tabelas VendasDiarias, VendasPorProduto e VendasPorAtendente são
+atualizadas na mesma transação de cada venda (``registrar``) e podem ser
+recalculadas do zero a partir de Vendas/ItensVenda:
+
+    python -m backend.relatorios reconstruir
+
+DataVenda é UTC; o dia de VendasDiarias (e o "hoje" das consultas) é o dia
+comercial, no fuso ``FUSO_HORARIO``: uma venda às 22h em São Paulo conta
+no dia dela, não no seguinte.
+"""
+import sys
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from . import arquivamento, config, models
+from .database import SessionLocal, upsert
+
+FUSO = ZoneInfo(config.FUSO_HORARIO)
+
+
+# ---------------------------------------------------------
+# DIA COMERCIAL
+# ---------------------------------------------------------
+def dia_comercial(data: datetime) -> date:
+    """Dia, no fuso da loja, de uma data UTC sem fuso (como DataVenda)."""
+    return data.replace(tzinfo=timezone.utc).astimezone(FUSO).date()
+
+
+def hoje() -> date:
+    return datetime.now(FUSO).date()
+
+
+def inicio_do_dia(dia: date) -> datetime:
+    """Início do dia comercial ``dia`` em UTC sem fuso (para comparar com
+    DataVenda); o fim é ``inicio_do_dia(dia + timedelta(days=1))``."""
+    return datetime.combine(dia, datetime.min.time(), FUSO).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+# ---------------------------------------------------------
+# ATUALIZAÇÃO INCREMENTAL
+# ---------------------------------------------------------
+def registrar(db: Session, vendas):
+    """Soma vendas novas aos rollups (sem commit).
+
+    ``vendas``: lista de (dia comercial, id_atendente, itens), com itens no
+    formato de ``schemas.ItemVenda`` (id, quantidade, preco).
+    """
+    dias = defaultdict(lambda: [0, 0, 0.0])
+    produtos = defaultdict(lambda: [0, 0, 0.0])
+    atendentes = defaultdict(lambda: [0, 0.0])
+
+    for data, id_atendente, itens in vendas:
+        receita = sum(item.preco * item.quantidade for item in itens)
+
+        dia = dias[data]
+        dia[0] += 1
+        dia[1] += sum(item.quantidade for item in itens)
+        dia[2] += receita
+
+        atendente = atendentes[id_atendente]
+        atendente[0] += 1
+        atendente[1] += receita
+
+        for id_produto in {item.id for item in itens}:
+            produtos[id_produto][0] += 1
+        for item in itens:
+            produto = produtos[item.id]
+            produto[1] += item.quantidade
+            produto[2] += item.preco * item.quantidade
+
+    t = models.VendaDiaria.__table__
+    upsert(db, t, [
+        {"Data": d, "QtdVendas": v[0], "QtdItens": v[1], "Receita": v[2]}
+        for d, v in dias.items()
+    ], lambda novos: {
+        "QtdVendas": t.c.QtdVendas + novos.QtdVendas,
+        "QtdItens": t.c.QtdItens + novos.QtdItens,
+        "Receita": t.c.Receita + novos.Receita,
+    })
+
+    tp = models.VendaPorProduto.__table__
+    upsert(db, tp, [
+        {"IDProduto": i, "QtdVendas": v[0], "Quantidade": v[1], "Receita": v[2]}
+        for i, v in sorted(produtos.items())
+    ], lambda novos: {
+        "QtdVendas": tp.c.QtdVendas + novos.QtdVendas,
+        "Quantidade": tp.c.Quantidade + novos.Quantidade,
+        "Receita": tp.c.Receita + novos.Receita,
+    })
+
+    ta = models.VendaPorAtendente.__table__
+    upsert(db, ta, [
+        {"IDUsuarioAtendente": i, "QtdVendas": v[0], "Receita": v[1]}
+        for i, v in sorted(atendentes.items())
+    ], lambda novos: {
+        "QtdVendas": ta.c.QtdVendas + novos.QtdVendas,
+        "Receita": ta.c.Receita + novos.Receita,
+    })
+
+
+# ---------------------------------------------------------
+# RECONSTRUÇÃO
+# ---------------------------------------------------------
+def reconstruir(db: Session):
+    """Recalcula os três rollups a partir de Vendas/ItensVenda e do arquivo."""
+    v = arquivamento.vendas()
+    i = arquivamento.itens()
+    subtotal = i.c.Quantidade * i.c.PrecoUnitario
+
+    for modelo in (models.VendaDiaria, models.VendaPorProduto, models.VendaPorAtendente):
+        db.execute(delete(modelo))
+
+    # Agrupa por hora UTC no banco (no máximo 24 linhas por dia) e junta as
+    # horas no dia comercial aqui: cada venda cai numa hora só, então as
+    # contagens somam sem repetir venda
+    dia, hora = func.date(v.c.DataVenda), func.extract("hour", v.c.DataVenda)
+    dias = defaultdict(lambda: [0, 0, 0.0])
+    for data, h, qtd_vendas, qtd_itens, receita in db.execute(
+        select(dia, hora, func.count(func.distinct(v.c.IDVenda)), func.sum(i.c.Quantidade), func.sum(subtotal))
+        .select_from(v.join(i, i.c.IDVenda == v.c.IDVenda))
+        .group_by(dia, hora)
+    ):
+        if isinstance(data, str):
+            data = date.fromisoformat(data)  # SQLite devolve texto
+        soma = dias[dia_comercial(datetime.combine(data, datetime.min.time()) + timedelta(hours=int(h)))]
+        soma[0] += qtd_vendas
+        soma[1] += qtd_itens
+        soma[2] += receita
+    if dias:
+        db.execute(insert(models.VendaDiaria), [
+            {"Data": d, "QtdVendas": s[0], "QtdItens": s[1], "Receita": s[2]} for d, s in sorted(dias.items())
+        ])
+
+    db.execute(insert(models.VendaPorProduto).from_select(
+        ["IDProduto", "QtdVendas", "Quantidade", "Receita"],
+        select(i.c.IDProduto, func.count(func.distinct(i.c.IDVenda)), func.sum(i.c.Quantidade), func.sum(subtotal))
+        .group_by(i.c.IDProduto)
+    ))
+
+    db.execute(insert(models.VendaPorAtendente).from_select(
+        ["IDUsuarioAtendente", "QtdVendas", "Receita"],
+        select(v.c.IDUsuarioAtendente, func.count(func.distinct(v.c.IDVenda)), func.sum(subtotal))
+        .select_from(v.join(i, i.c.IDVenda == v.c.IDVenda))
+        .group_by(v.c.IDUsuarioAtendente)
+    ))
+
+    db.commit()
+
+
+# ---------------------------------------------------------
+# CONSULTAS (só leem os rollups)
+# ---------------------------------------------------------
+def receita_por_dia(db: Session, inicio: date, fim: date):
+    t = models.VendaDiaria
+    linhas = db.query(t).filter(t.Data >= inicio, t.Data <= fim).order_by(t.Data).all()
+    return [
+        {"data": str(d.Data), "vendas": d.QtdVendas, "itens": d.QtdItens, "receita": d.Receita}
+        for d in linhas
+    ]
+
+
+def top_produtos(db: Session, limite: int, por: str = "receita"):
+    t = models.VendaPorProduto
+    ordem = t.Receita if por == "receita" else t.Quantidade
+    linhas = (
+        db.query(t, models.Produto.Nome)
+        .join(models.Produto, models.Produto.IDProduto == t.IDProduto)
+        .order_by(ordem.desc())
+        .limit(limite)
+        .all()
+    )
+    return [
+        {"id": r.IDProduto, "nome": nome, "vendas": r.QtdVendas, "quantidade": r.Quantidade, "receita": r.Receita}
+        for r, nome in linhas
+    ]
+
+
+def vendas_por_atendente(db: Session):
+    t = models.VendaPorAtendente
+    linhas = (
+        db.query(t, models.Usuario.Nome)
+        .join(models.Usuario, models.Usuario.IDUsuario == t.IDUsuarioAtendente)
+        .order_by(t.Receita.desc())
+        .all()
+    )
+    return [
+        {"id": r.IDUsuarioAtendente, "nome": nome, "vendas": r.QtdVendas, "receita": r.Receita}
+        for r, nome in linhas
+    ]
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["reconstruir"]:
+        sys.exit("uso: python -m backend.relatorios reconstruir")
+
+    db = SessionLocal()
+    try:
+        reconstruir(db)
+        print("Rollups de vendas reconstruídos.")
+    finally:
+        db.close()
@@ -0,0 +1,237 @@
+"""Replicação das vendas do MySQL para a coleção ``vendas`` do Mongo.
+
+Toda venda gravada pela API entra na tabela OutboxVendas na mesma transação
+(``enfileirar``). Um worker separado lê o outbox em lotes, monta o documento
+desnormalizado (o formato de NoSQL/alfaiataria.vendas.json) e grava no Mongo
+com ``bulk_write`` não ordenado, então a requisição da venda nunca espera
+pelo Mongo.
+
+Os eventos replicados saem do outbox na mesma transação que avança o
+checkpoint (CheckpointsReplicacao). Se o worker cair entre o ``bulk_write``
+e o commit, o lote é reaplicado ao voltar, o que é inofensivo: o documento
+é substituído pelo ``id_venda``. Consumir o outbox por exclusão, e não por
+"IDEvento > checkpoint", evita perder um evento cuja transação deu commit
+depois de outra com IDEvento maior.
+
+    python -m backend.replicacao              # roda continuamente
+    python -m backend.replicacao --uma-vez    # esvazia o outbox e sai
+    python -m backend.replicacao reenviar     # enfileira todas as vendas
+"""
+import argparse
+import logging
+import time
+from datetime import datetime
+
+from pymongo import DeleteOne, ReplaceOne
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from . import arquivamento, models
+from .database import SessionLocal
+
+log = logging.getLogger("replicacao")
+
+NOME_CHECKPOINT = "mongo.vendas"
+
+
+# ---------------------------------------------------------
+# OUTBOX (chamado dentro da transação da venda)
+# ---------------------------------------------------------
+def enfileirar(db: Session, ids_vendas):
+    """Registra vendas novas ou alteradas para replicação (sem commit)."""
+    if ids_vendas:
+        db.execute(insert(models.OutboxVenda), [{"IDVenda": i} for i in ids_vendas])
+
+
+def reenviar(db: Session) -> int:
+    """Enfileira todas as vendas existentes (carga inicial ou reparo)."""
+    resultado = db.execute(
+        insert(models.OutboxVenda).from_select(
+            ["IDVenda"], select(arquivamento.vendas().c.IDVenda)
+        )
+    )
+    db.commit()
+    return resultado.rowcount
+
+
+# ---------------------------------------------------------
+# DOCUMENTOS
+# ---------------------------------------------------------
+def montar_documentos(db: Session, ids_vendas) -> dict:
+    """Monta os documentos das vendas com duas consultas; id -> documento.
+
+    Vendas que não existem mais no MySQL ficam de fora (viram exclusão);
+    as arquivadas continuam (arquivamento.py).
+    """
+    v, u = arquivamento.vendas().c, models.Usuario
+    cabecalhos = db.execute(
+        select(v.IDVenda, v.DataVenda, u.Nome)
+        .join(u, u.IDUsuario == v.IDUsuarioCliente)
+        .where(v.IDVenda.in_(ids_vendas))
+    ).all()
+
+    documentos = {
+        id_venda: {
+            "id_venda": id_venda,
+            "cliente": cliente,
+            "data": data,
+            "status": "PAGO",
+            "itens": [],
+            "total": 0.0,
+        }
+        for id_venda, data, cliente in cabecalhos
+    }
+    if not documentos:
+        return documentos
+
+    i, p = arquivamento.itens().c, models.Produto
+    itens = db.execute(
+        select(i.IDVenda, p.Nome, i.Quantidade, i.PrecoUnitario)
+        .join(p, p.IDProduto == i.IDProduto)
+        .where(i.IDVenda.in_(list(documentos)))
+        .order_by(i.IDVenda, i.IDItem)
+    ).all()
+
+    for id_venda, produto, quantidade, preco in itens:
+        documento = documentos[id_venda]
+        documento["itens"].append({"produto": produto, "quantidade": quantidade, "precoUnit": preco})
+        documento["total"] += quantidade * preco
+
+    # Total a partir dos itens, como no restante da coleção
+    for documento in documentos.values():
+        documento["total"] = round(documento["total"], 2)
+
+    return documentos
+
+
+def _operacoes(ids_vendas, documentos):
+    return [
+        ReplaceOne({"id_venda": i}, documentos[i], upsert=True) if i in documentos
+        else DeleteOne({"id_venda": i})
+        for i in ids_vendas
+    ]
+
+
+def preparar_colecao(colecao):
+    """Índice único em id_venda (só nos documentos que vieram do MySQL)."""
+    colecao.create_index(
+        "id_venda", unique=True, name="ux_id_venda",
+        partialFilterExpression={"id_venda": {"$exists": True}},
+    )
+
+
+# ---------------------------------------------------------
+# WORKER
+# ---------------------------------------------------------
+def _checkpoint(db: Session):
+    # FOR UPDATE: dois workers no mesmo outbox se revezam em vez de duplicar lotes
+    checkpoint = db.execute(
+        select(models.CheckpointReplicacao)
+        .where(models.CheckpointReplicacao.Nome == NOME_CHECKPOINT)
+        .with_for_update()
+    ).scalar_one_or_none()
+    if checkpoint is None:
+        checkpoint = models.CheckpointReplicacao(Nome=NOME_CHECKPOINT, UltimoEvento=0)
+        db.add(checkpoint)
+        db.flush()
+    return checkpoint
+
+
+def replicar_lote(db: Session, colecao, limite: int = 500):
+    """Replica até ``limite`` eventos do outbox; devolve as métricas do lote.
+
+    Devolve ``None`` se o outbox estava vazio.
+    """
+    inicio = time.perf_counter()
+    checkpoint = _checkpoint(db)
+
+    o = models.OutboxVenda
+    eventos = db.execute(
+        select(o.IDEvento, o.IDVenda, o.CriadoEm).order_by(o.IDEvento).limit(limite)
+    ).all()
+    if not eventos:
+        db.rollback()
+        return None
+
+    # Várias alterações da mesma venda no lote viram um único documento
+    ids_vendas = list(dict.fromkeys(e.IDVenda for e in eventos))
+    documentos = montar_documentos(db, ids_vendas)
+
+    inicio_mongo = time.perf_counter()
+    resultado = colecao.bulk_write(_operacoes(ids_vendas, documentos), ordered=False)
+    duracao_mongo = time.perf_counter() - inicio_mongo
+
+    ids_eventos = [e.IDEvento for e in eventos]
+    db.execute(delete(o).where(o.IDEvento.in_(ids_eventos)))
+    checkpoint.UltimoEvento = ids_eventos[-1]
+    checkpoint.AtualizadoEm = datetime.utcnow()
+    db.commit()
+
+    duracao = time.perf_counter() - inicio
+    return {
+        "eventos": len(eventos),
+        "vendas": len(ids_vendas),
+        "gravadas": resultado.upserted_count + resultado.modified_count,
+        "excluidas": resultado.deleted_count,
+        "ultimo_evento": checkpoint.UltimoEvento,
+        "atraso_s": round((datetime.utcnow() - min(e.CriadoEm for e in eventos)).total_seconds(), 1),
+        "duracao_ms": round(duracao * 1000, 1),
+        "vendas_s": round(len(ids_vendas) / duracao_mongo, 1) if duracao_mongo else None,
+    }
+
+
+def pendentes(db: Session) -> int:
+    return db.scalar(select(func.count()).select_from(models.OutboxVenda))
+
+
+def executar(colecao, limite: int = 500, intervalo: float = 1.0, uma_vez: bool = False):
+    preparar_colecao(colecao)
+    espera = intervalo
+
+    while True:
+        db = SessionLocal()
+        try:
+            metricas = replicar_lote(db, colecao, limite)
+            espera = intervalo
+            if metricas:
+                metricas["pendentes"] = pendentes(db)
+                log.info(
+                    "lote: %(eventos)d eventos, %(vendas)d vendas (%(gravadas)d gravadas, "
+                    "%(excluidas)d excluídas) em %(duracao_ms)sms, %(vendas_s)s vendas/s no Mongo; "
+                    "atraso %(atraso_s)ss; pendentes %(pendentes)d; checkpoint %(ultimo_evento)d",
+                    metricas,
+                )
+        except Exception:
+            db.rollback()
+            log.exception("falha ao replicar lote; tentando de novo em %.0fs", espera)
+            metricas = None
+            espera = min(espera * 2, 60)
+        finally:
+            db.close()
+
+        if metricas and metricas["eventos"] == limite:
+            continue  # ainda há fila: sem pausa
+        if uma_vez and metricas is None and espera == intervalo:
+            return
+        time.sleep(espera)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replica as vendas do MySQL para o Mongo.")
+    parser.add_argument("comando", nargs="?", choices=["reenviar"], help="enfileira todas as vendas e sai")
+    parser.add_argument("--lote", type=int, default=500, help="eventos por lote")
+    parser.add_argument("--intervalo", type=float, default=1.0, help="pausa (s) com o outbox vazio")
+    parser.add_argument("--uma-vez", action="store_true", help="esvazia o outbox e sai")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    if args.comando == "reenviar":
+        db = SessionLocal()
+        try:
+            print(f"{reenviar(db)} vendas enfileiradas.")
+        finally:
+            db.close()
+    else:
+        from .database_mongo import col_vendas
+        executar(col_vendas, args.lote, args.intervalo, args.uma_vez)
@@ -0,0 +1,310 @@
+"""Réplicas de leitura do MySQL (não confundir com replicacao.py, o CDC
+para o Mongo).
+
+Com ``DB_REPLICAS`` (URLs SQLAlchemy separadas por vírgula), os GETs do
+catálogo, usuários, grupos, relatórios e exportação leem de uma réplica,
+em rodízio; escritas e o login continuam no primário (``get_async_db``).
+
+* Atraso: medido com ``SHOW REPLICA STATUS`` (``SHOW SLAVE STATUS`` em
+  versões antigas) no máximo a cada ``DB_REPLICA_VERIFICACAO_S``. Réplica
+  com atraso acima de ``DB_REPLICA_ATRASO_MAX_S``, com a replicação parada
+  ou fora do ar sai do rodízio até a próxima verificação; sem nenhuma
+  saudável, a leitura vai para o primário.
+* Ler o que acabou de escrever: toda escrita bem-sucedida de um usuário
+  autenticado (id do token de sessão) é anotada no servidor, e por
+  ``DB_PRIMARIO_APOS_ESCRITA_S`` as leituras desse usuário vão para o
+  primário (ex.: a lista de produtos logo depois de cadastrar um, ou o
+  estoque logo depois de uma venda). Não depende de cookie: o frontend é
+  de outra origem e não envia credenciais. A marca é por processo, como a
+  lista de revogação de autenticacao.py: com vários workers, vale no worker
+  que recebeu a escrita.
+
+Para testar localmente: duas instâncias do MySQL com replicação entre
+elas (primário em DB_HOST, réplica em DB_REPLICAS). Uma instância sem
+canal de replicação configurado é tratada como cópia sem atraso; em
+bancos que não são MySQL (ex.: dois arquivos SQLite) o atraso não é
+medido.
+"""
+import itertools
+import threading
+import time
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+from starlette.datastructures import Headers
+
+from . import autenticacao, config, database
+
+# (comando, coluna do atraso): o primeiro é o do MySQL 8.0.22+
+_STATUS_REPLICACAO = (
+    ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+    ("SHOW SLAVE STATUS", "Seconds_Behind_Master"),
+)
+
+
+def medir_atraso(engine) -> Optional[float]:
+    """Segundos de atraso da réplica; None se a replicação está parada."""
+    if engine.dialect.name != "mysql":
+        return 0.0
+
+    with engine.connect() as conn:
+        for comando, coluna in _STATUS_REPLICACAO:
+            try:
+                status = conn.exec_driver_sql(comando).mappings().first()
+            except exc.ProgrammingError:
+                continue  # sintaxe não suportada nesta versão
+            if status is None:
+                return 0.0  # sem canal de replicação: cópia estática
+            atraso = status.get(coluna)
+            return None if atraso is None else float(atraso)
+    return None
+
+
+class Replica:
+    def __init__(self, url: str):
+        self.url = make_url(url)
+        self.nome = self.url.render_as_string(hide_password=True)
+
+        self._lock = threading.Lock()
+        self._verificando = threading.Lock()
+        self._engine = None
+        self._async_engine = None
+        self._sessoes = None
+        self._sessoes_async = None
+
+        self.atraso: Optional[float] = None
+        self.erro: Optional[str] = None
+        self.verificado_em = 0.0  # time.monotonic(); 0 = nunca
+
+    # -----------------------------------------------------
+    # ENGINES (criados no primeiro uso, como os do primário)
+    # -----------------------------------------------------
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    argumentos = {}
+                    if self.url.get_backend_name() == "mysql":
+                        # Réplica fora do ar não pode segurar a requisição
+                        argumentos["connect_args"] = {"connect_timeout": 3}
+                    self._engine = create_engine(
+                        self.url, echo=config.DB_ECHO, poolclass=database.PoolMedido,
+                        **argumentos, **database.OPCOES_POOL
+                    )
+                    self._sessoes = sessionmaker(bind=self._engine, autoflush=False, autocommit=False)
+        return self._engine
+
+    def sessao(self):
+        self.engine
+        return self._sessoes()
+
+    def sessao_async(self):
+        if self._async_engine is None:
+            from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+            with self._lock:
+                if self._async_engine is None:
+                    url = self.url
+                    if url.drivername == "mysql+pymysql":
+                        url = url.set(drivername="mysql+aiomysql")
+                    self._async_engine = create_async_engine(
+                        url, echo=config.DB_ECHO, poolclass=database.PoolMedidoAsync, **database.OPCOES_POOL
+                    )
+                    self._sessoes_async = async_sessionmaker(
+                        bind=self._async_engine, autoflush=False, expire_on_commit=False
+                    )
+        return self._sessoes_async()
+
+    # -----------------------------------------------------
+    # ATRASO
+    # -----------------------------------------------------
+    @property
+    def saudavel(self) -> bool:
+        return self.atraso is not None and self.atraso <= config.DB_REPLICA_ATRASO_MAX_S
+
+    @property
+    def vencida(self) -> bool:
+        return time.monotonic() - self.verificado_em >= config.DB_REPLICA_VERIFICACAO_S
+
+    def verificar(self):
+        # Uma verificação por vez; as outras requisições usam a última medida
+        if not self._verificando.acquire(blocking=False):
+            return
+        try:
+            self.atraso = medir_atraso(self.engine)
+            self.erro = None if self.atraso is not None else "replicação parada"
+        except Exception as e:
+            self.atraso, self.erro = None, str(e).splitlines()[0][:200]
+        finally:
+            self.verificado_em = time.monotonic()
+            self._verificando.release()
+
+    def estado(self):
+        return {
+            "replica": self.nome,
+            "saudavel": self.saudavel,
+            "atraso_s": self.atraso,
+            "erro": self.erro,
+            "verificada_ha_s": round(time.monotonic() - self.verificado_em, 1) if self.verificado_em else None,
+        }
+
+    def encerrar(self):
+        if self._engine is not None:
+            self._engine.dispose()
+
+
+# ---------------------------------------------------------
+# ESCOLHA DA RÉPLICA
+# ---------------------------------------------------------
+_replicas = [Replica(url) for url in config.DB_REPLICAS]
+_rodizio = itertools.count()
+
+
+def _verificar_vencidas():
+    for replica in _replicas:
+        if replica.vencida:
+            replica.verificar()
+
+
+def _proxima() -> Optional[Replica]:
+    saudaveis = [r for r in _replicas if r.saudavel]
+    if not saudaveis:
+        return None
+    return saudaveis[next(_rodizio) % len(saudaveis)]
+
+
+def usar_primario(request: Request) -> bool:
+    """True se o usuário da requisição escreveu há pouco."""
+    id_usuario = _id_usuario(request.headers)
+    return id_usuario is not None and escritas.recente(id_usuario)
+
+
+def escolher(request: Request) -> Optional[Replica]:
+    """Réplica para esta leitura, ou None para o primário (código síncrono)."""
+    if not _replicas or usar_primario(request):
+        return None
+    _verificar_vencidas()
+    return _proxima()
+
+
+async def escolher_async(request: Request) -> Optional[Replica]:
+    if not _replicas or usar_primario(request):
+        return None
+    if any(r.vencida for r in _replicas):
+        await run_in_threadpool(_verificar_vencidas)
+    return _proxima()
+
+
+def estado():
+    return {
+        "replicas": [r.estado() for r in _replicas],
+        "atraso_max_s": config.DB_REPLICA_ATRASO_MAX_S,
+        "primario_apos_escrita_s": config.DB_PRIMARIO_APOS_ESCRITA_S,
+    }
+
+
+def encerrar():
+    for replica in _replicas:
+        replica.encerrar()
+
+
+# ---------------------------------------------------------
+# DEPENDÊNCIAS DE LEITURA
+# ---------------------------------------------------------
+async def get_async_db_leitura(request: Request):
+    """Como ``database.get_async_db``, mas numa réplica, se houver."""
+    replica = await escolher_async(request)
+
+    if config.DB_ASYNC:
+        if replica is None:
+            database.obter_async_engine()
+        async with (replica.sessao_async() if replica else database.AsyncSessionLocal()) as db:
+            yield db
+    else:
+        db = replica.sessao() if replica else database.SessionLocal()
+        try:
+            yield database.SessaoSync(db)
+        finally:
+            await run_in_threadpool(db.close)
+
+
+def get_raw_db_leitura(request: Request):
+    """Como ``database.get_raw_db``, mas numa réplica, se houver."""
+    replica = escolher(request)
+    conn = (replica.engine if replica else database.obter_engine()).raw_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def engine_leitura(request: Request):
+    replica = escolher(request)
+    return replica.engine if replica else database.obter_engine()
+
+
+# ---------------------------------------------------------
+# PRIMÁRIO DEPOIS DE ESCREVER
+# ---------------------------------------------------------
+def _id_usuario(headers) -> Optional[int]:
+    """Id do usuário do token Bearer, ou None (sem token ou inválido)."""
+    esquema, _, token = headers.get("authorization", "").partition(" ")
+    if esquema.lower() != "bearer" or not token:
+        return None
+    try:
+        return autenticacao.verificar(token).id
+    except HTTPException:
+        return None
+
+
+class Escritas:
+    """Usuários que escreveram há pouco -> até quando ler do primário."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._usuarios = {}
+
+    def marcar(self, id_usuario: int):
+        agora = time.time()
+        with self._lock:
+            self._usuarios = {u: ate for u, ate in self._usuarios.items() if ate > agora}
+            self._usuarios[id_usuario] = agora + config.DB_PRIMARIO_APOS_ESCRITA_S
+
+    def recente(self, id_usuario: int) -> bool:
+        # Leitura sem lock: o dict só é trocado inteiro ou ganha chaves
+        return self._usuarios.get(id_usuario, 0) > time.time()
+
+    def __len__(self):
+        return len(self._usuarios)
+
+
+escritas = Escritas()
+
+
+class MiddlewarePrimarioAposEscrita:
+    """Anota quem acabou de escrever (id do token de sessão)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+
+        id_usuario = _id_usuario(Headers(scope=scope))
+        if id_usuario is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start" and mensagem["status"] < 400:
+                escritas.marcar(id_usuario)
+            await send(mensagem)
+
+        await self.app(scope, receive, enviar)
@@ -0,0 +1,69 @@
+"""Serialização JSON das respostas.
+
+O caminho padrão do FastAPI passa todo valor devolvido pelo
+``jsonable_encoder`` (e pelo ``response_model``, quando há), item a item,
+antes de gerar o JSON. Nas listas grandes isso é quase todo o custo da
+requisição. Os endpoints de listagem devolvem ``json(...)``, uma Response
+já renderizada a partir de dicts montados direto das linhas do banco:
+sem validação nem conversão por item.
+
+Com ``API_JSON_RAPIDO=1`` (e o pacote ``orjson`` instalado), a renderização
+usa orjson, inclusive na classe de resposta padrão do app.
+"""
+import json as _json
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+from . import config
+
+try:
+    import orjson
+except ImportError:  # opcional: sem ele, json da biblioteca padrão
+    orjson = None
+
+log = logging.getLogger(__name__)
+
+RAPIDO = config.API_JSON_RAPIDO and orjson is not None
+if config.API_JSON_RAPIDO and orjson is None:
+    log.warning("API_JSON_RAPIDO=1, mas o orjson não está instalado; usando json da biblioteca padrão.")
+
+
+def _padrao(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return str(valor)
+
+
+def renderizar(conteudo) -> bytes:
+    if RAPIDO:
+        return orjson.dumps(conteudo, default=_padrao, option=orjson.OPT_NON_STR_KEYS)
+    return _json.dumps(
+        conteudo, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_padrao
+    ).encode("utf-8")
+
+
+class RespostaJSON(JSONResponse):
+    """JSONResponse que usa ``renderizar`` (orjson, se ligado)."""
+
+    def render(self, content) -> bytes:
+        return renderizar(content)
+
+
+# Classe padrão do app: com orjson, também os endpoints que não usam json()
+RESPOSTA_PADRAO = RespostaJSON if RAPIDO else JSONResponse
+
+
+def json(conteudo, status_code: int = 200, headers=None) -> Response:
+    """Response pronta: o FastAPI a devolve sem validar nem converter."""
+    return RespostaJSON(conteudo, status_code=status_code, headers=headers)
+
+
+def bruta(corpo: bytes, status_code: int = 200, headers=None) -> Response:
+    """Response de um JSON já renderizado (ex.: guardado no cache)."""
+    return Response(corpo, status_code=status_code, headers=headers, media_type="application/json")
@@ -0,0 +1,61 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import autenticacao, avaliacoes, cache, crud
+from ..database import get_async_db
+from ..schemas import AvaliacaoCreate
+
+router = APIRouter(prefix="/api/produtos", tags=["Avaliações"])
+
+
+# ---------------------------------------------------------
+# LISTAR AVALIAÇÕES DE UM PRODUTO
+# ---------------------------------------------------------
+@router.get("/{produto_id}/avaliacoes", dependencies=[Depends(autenticacao.autenticado)])
+async def listar_avaliacoes(
+    produto_id: int,
+    cursor: Optional[str] = None,
+    limite: int = Query(20, ge=1, le=100),
+):
+    try:
+        pagina = await avaliacoes.consultar(avaliacoes.listar, produto_id, cursor, limite)
+    except avaliacoes.CursorInvalido:
+        raise HTTPException(status_code=400, detail="Cursor inválido.")
+
+    resumo = await avaliacoes.consultar(avaliacoes.resumo, produto_id)
+    return {"produto": produto_id, "resumo": resumo, **pagina}
+
+
+# ---------------------------------------------------------
+# AVALIAR UM PRODUTO
+# ---------------------------------------------------------
+@router.post("/{produto_id}/avaliacoes", status_code=201)
+async def avaliar_produto(
+    produto_id: int,
+    payload: AvaliacaoCreate,
+    sessao: autenticacao.Sessao = Depends(autenticacao.autenticado),
+    db: AsyncSession = Depends(get_async_db),
+):
+    produto = await db.run_sync(crud.buscar_produto, produto_id)
+    if not produto:
+        raise HTTPException(status_code=404, detail="Produto não encontrado")
+
+    # O cliente é quem está logado, não um nome enviado no corpo
+    usuario = await db.run_sync(crud.buscar_usuario_por_id, sessao.id)
+    if not usuario:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+
+    avaliacao = await avaliacoes.consultar(
+        avaliacoes.avaliar, produto_id, produto.Nome, usuario.Nome, payload.nota, payload.comentario
+    )
+
+    # O resumo vai embutido nas listagens do catálogo em cache
+    cache.produto_alterado(produto_id)
+
+    return {
+        "mensagem": "Avaliação registrada!",
+        "avaliacao": avaliacao,
+        "resumo": await avaliacoes.consultar(avaliacoes.resumo, produto_id),
+    }
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import autenticacao, cache, config, dashboard
+from ..replicas import get_async_db_leitura
+
+router = APIRouter(prefix="/api/dashboard", tags=["Painel"])
+
+# Um cálculo a cada DASHBOARD_TTL_S por processo, com quantos painéis
+# estiverem abertos
+resumo = cache.ValorTemporario(config.DASHBOARD_TTL_S)
+
+
+# ---------------------------------------------------------
+# RESUMO DO PAINEL
+# ---------------------------------------------------------
+@router.get("", dependencies=[Depends(autenticacao.equipe)])
+async def obter_resumo(db: AsyncSession = Depends(get_async_db_leitura)):
+    return await resumo.obter(lambda: db.run_sync(dashboard.resumo))
@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import autenticacao, movimentacoes
+from ..database import get_async_db
+from ..replicas import get_async_db_leitura
+
+router = APIRouter(prefix="/api/estoque", tags=["Estoque"])
+
+
+# ---------------------------------------------------------
+# RECONCILIAÇÃO E SNAPSHOTS (gerência)
+# ---------------------------------------------------------
+@router.get("/reconciliacao", dependencies=[Depends(autenticacao.gerencia)])
+async def reconciliar(db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(movimentacoes.reconciliar)
+
+
+@router.post("/snapshots", dependencies=[Depends(autenticacao.gerencia)])
+async def tirar_snapshots(db: AsyncSession = Depends(get_async_db)):
+    return {"snapshots": await db.run_sync(movimentacoes.tirar_snapshots)}
+
+
+# ---------------------------------------------------------
+# ESTOQUE DE UM PRODUTO (atual ou em uma data)
+# ---------------------------------------------------------
+@router.get("/{id_produto}", dependencies=[Depends(autenticacao.equipe)])
+async def estoque_em(
+    id_produto: int,
+    em: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db_leitura),
+):
+    resultado = await db.run_sync(movimentacoes.estoque_em, id_produto, em)
+    if resultado is None:
+        raise HTTPException(status_code=404, detail="Produto não encontrado")
+    return resultado
@@ -0,0 +1,30 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header
+from fastapi.responses import StreamingResponse
+
+from .. import autenticacao, eventos
+
+router = APIRouter(prefix="/api/eventos", tags=["Eventos"])
+
+
+# ---------------------------------------------------------
+# ESTOQUE (Server-Sent Events)
+# ---------------------------------------------------------
+@router.get("/estoque")
+async def eventos_estoque(
+    sessao: autenticacao.Sessao = Depends(autenticacao.equipe_stream),
+    last_event_id: Optional[int] = Header(None),
+):
+    assinante = eventos.estoque.assinar(last_event_id)
+    return StreamingResponse(
+        eventos.transmitir(eventos.estoque, assinante, expira=sessao.expira),
+        media_type="text/event-stream",
+        # Sem buffer em proxies (nginx), para o evento sair na hora
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/status")
+async def status_eventos():
+    return eventos.estoque.estatisticas()
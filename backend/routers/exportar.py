@@ -0,0 +1,50 @@
+from datetime import date
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+from .. import autenticacao, exportacao, replicas
+
+# Exporta o histórico inteiro de vendas: só a gerência
+router = APIRouter(prefix="/api/exportar", tags=["Exportação"], dependencies=[Depends(autenticacao.gerencia)])
+
+
+# ---------------------------------------------------------
+# VENDAS (pedidos ou itens) EM CSV / NDJSON / PARQUET
+# ---------------------------------------------------------
+@router.get("/vendas")
+def exportar_vendas(
+    request: Request,
+    tipo: Literal["pedidos", "itens"] = "itens",
+    formato: Literal["csv", "ndjson", "parquet"] = "csv",
+    inicio: Optional[date] = None,
+    fim: Optional[date] = None,
+    gzip: bool = False,
+):
+    if inicio and fim and inicio > fim:
+        raise HTTPException(status_code=400, detail="Data inicial maior que a final.")
+
+    if formato == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Exportação em Parquet requer o pacote pyarrow.")
+
+    tipo_conteudo, extensao = exportacao.FORMATOS[formato]
+    nome = f"vendas_{tipo}"
+    if inicio:
+        nome += f"_{inicio}"
+    if fim:
+        nome += f"_a_{fim}"
+    nome += f".{extensao}"
+
+    if gzip and formato != "parquet":
+        tipo_conteudo = "application/gzip"
+        nome += ".gz"
+
+    return StreamingResponse(
+        exportacao.exportar(tipo, formato, inicio, fim, gzip, bind=replicas.engine_leitura(request)),
+        media_type=tipo_conteudo,
+        headers={"Content-Disposition": f'attachment; filename="{nome}"'},
+    )
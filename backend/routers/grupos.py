@@ -1,21 +1,12 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from ..database import get_db
-from ..models import GrupoUsuario
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..replicas import get_async_db_leitura
+from .. import crud, respostas
 
 router = APIRouter(prefix="/api/grupos", tags=["Grupos"])
 
 @router.get("/")
-def listar_grupos(db: Session = Depends(get_db)):
-    grupos = db.query(GrupoUsuario).all()
+async def listar_grupos(db: AsyncSession = Depends(get_async_db_leitura)):
+    grupos = await db.run_sync(crud.listar_grupos)
 
-    return {
-        "grupos": [
-            {
-                "id": g.IDGrupo,
-                "nome": g.NomeGrupo,
-                "descricao": g.Descricao
-            }
-            for g in grupos
-        ]
-    }
+    return respostas.json({"grupos": grupos})
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import autenticacao, precos
+from ..database import get_async_db
+from ..schemas import AjustePrecos, AplicacaoPrecos
+
+router = APIRouter(prefix="/api/precos", tags=["Preços"], dependencies=[Depends(autenticacao.gerencia)])
+
+
+def _exigir_numpy():
+    if precos.np is None:
+        raise HTTPException(status_code=501, detail="Reajuste de preços em lote requer o pacote numpy.")
+
+
+# ---------------------------------------------------------
+# SIMULAR (não grava)
+# ---------------------------------------------------------
+@router.post("/simular")
+async def simular(ajuste: AjustePrecos, db: AsyncSession = Depends(get_async_db)):
+    _exigir_numpy()
+    return await db.run_sync(precos.simular, ajuste)
+
+
+# ---------------------------------------------------------
+# APLICAR
+# ---------------------------------------------------------
+@router.post("/aplicar")
+async def aplicar(ajuste: AplicacaoPrecos, db: AsyncSession = Depends(get_async_db)):
+    _exigir_numpy()
+    try:
+        return await db.run_sync(precos.aplicar, ajuste)
+    except precos.PrecosAlterados:
+        raise HTTPException(status_code=409, detail="Os preços mudaram desde a simulação. Simule de novo.")
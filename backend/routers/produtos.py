@@ -1,105 +1,143 @@
-from fastapi import APIRouter, HTTPException, Depends
-from mysql.connector import MySQLConnection
-from backend.database_mysql import get_db
+from datetime import datetime
+
+from fastapi import APIRouter, HTTPException, Depends, Request
+from sqlalchemy.pool import PoolProxiedConnection
+from backend import database
+from backend.database import get_raw_db
+from backend.replicas import get_raw_db_leitura
 from backend.schemas import ProdutoCreate, ProdutoOut
+from backend import cache, busca, autenticacao, eventos
 
 router = APIRouter(prefix="/api/produtos", tags=["Produtos"])
 
+COLUNAS = "IDProduto AS id, Nome AS nome, Categoria AS categoria, Preco AS preco, Estoque AS estoque"
+
+
+def _sql(texto):
+    # SQL escrito com %s (pymysql); o sqlite3 dos benchmarks usa ?
+    if database.engine.dialect.paramstyle == "qmark":
+        return texto.replace("%s", "?")
+    return texto
+
+
+def _como_dicts(cursor):
+    colunas = [c[0] for c in cursor.description]
+    return [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
+
 
 # ---------------------------------------------------------
 # LISTAR PRODUTOS
 # ---------------------------------------------------------
-@router.get("/", response_model=list[ProdutoOut])
-def listar(db: MySQLConnection = Depends(get_db)):
-    cursor = db.cursor(dictionary=True)
-    cursor.execute("SELECT id, nome, categoria, preco FROM produtos")
-    produtos = cursor.fetchall()
-    cursor.close()
+@router.get("/", response_model=list[ProdutoOut], dependencies=[Depends(autenticacao.autenticado)])
+def listar(request: Request, db: PoolProxiedConnection = Depends(get_raw_db_leitura)):
+    def carregar():
+        cursor = db.cursor()
+        cursor.execute(f"SELECT {COLUNAS} FROM Produtos")
+        produtos = _como_dicts(cursor)
+        cursor.close()
+        return produtos
 
-    return produtos
+    entrada = cache.catalogo.obter(("router.produtos",), carregar, ("catalogo",))
+    return cache.responder(request, entrada)
 
 
 # ---------------------------------------------------------
 # BUSCAR PRODUTO POR ID
 # ---------------------------------------------------------
-@router.get("/{produto_id}", response_model=ProdutoOut)
-def buscar(produto_id: int, db: MySQLConnection = Depends(get_db)):
-    cursor = db.cursor(dictionary=True)
-    cursor.execute("SELECT id, nome, categoria, preco FROM produtos WHERE id = %s", (produto_id,))
-    produto = cursor.fetchone()
-    cursor.close()
+@router.get("/{produto_id}", response_model=ProdutoOut, dependencies=[Depends(autenticacao.autenticado)])
+def buscar(produto_id: int, request: Request, db: PoolProxiedConnection = Depends(get_raw_db_leitura)):
+    def carregar():
+        cursor = db.cursor()
+        cursor.execute(_sql(f"SELECT {COLUNAS} FROM Produtos WHERE IDProduto = %s"), (produto_id,))
+        produtos = _como_dicts(cursor)
+        cursor.close()
+        return produtos[0] if produtos else None
 
-    if not produto:
+    entrada = cache.catalogo.obter(("router.produto", produto_id), carregar, (f"produto:{produto_id}",))
+
+    if not entrada.valor:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
 
-    return produto
+    return cache.responder(request, entrada)
 
 
 # ---------------------------------------------------------
 # CRIAR PRODUTO
 # ---------------------------------------------------------
-@router.post("/", response_model=ProdutoOut)
-def criar(produto: ProdutoCreate, db: MySQLConnection = Depends(get_db)):
+@router.post("/", response_model=ProdutoOut, dependencies=[Depends(autenticacao.equipe)])
+def criar(produto: ProdutoCreate, db: PoolProxiedConnection = Depends(get_raw_db)):
     cursor = db.cursor()
     sql = """
-        INSERT INTO produtos (nome, categoria, preco)
-        VALUES (%s, %s, %s)
+        INSERT INTO Produtos (Nome, Categoria, Preco, Estoque)
+        VALUES (%s, %s, %s, %s)
     """
-    valores = (produto.nome, produto.categoria, produto.preco)
-    cursor.execute(sql, valores)
-    db.commit()
-
+    valores = (produto.nome, produto.categoria, produto.preco, produto.estoque or 0)
+    cursor.execute(_sql(sql), valores)
     novo_id = cursor.lastrowid
+    if produto.estoque:
+        cursor.execute(_sql("""
+            INSERT INTO MovimentacoesEstoque (IDProduto, TipoMovimentacao, Quantidade, DataMovimentacao)
+            VALUES (%s, 'Entrada', %s, %s)
+        """), (novo_id, produto.estoque, datetime.utcnow()))
+    db.commit()
     cursor.close()
+    cache.produto_criado(produto.categoria, novo_id)
+    busca.indice.indexar(novo_id, produto.nome, produto.categoria, produto.preco)
+    eventos.estoque_alterado(novo_id, produto.nome, None, produto.estoque or 0)
 
     return {
         "id": novo_id,
         "nome": produto.nome,
         "categoria": produto.categoria,
-        "preco": produto.preco
+        "preco": produto.preco,
+        "estoque": produto.estoque or 0
     }
 
 
 # ---------------------------------------------------------
 # ATUALIZAR PRODUTO
 # ---------------------------------------------------------
-@router.put("/{produto_id}", response_model=ProdutoOut)
-def atualizar(produto_id: int, produto: ProdutoCreate, db: MySQLConnection = Depends(get_db)):
+@router.put("/{produto_id}", response_model=ProdutoOut, dependencies=[Depends(autenticacao.equipe)])
+def atualizar(produto_id: int, produto: ProdutoCreate, db: PoolProxiedConnection = Depends(get_raw_db)):
     cursor = db.cursor()
 
     # Verificar se existe
-    cursor.execute("SELECT id FROM produtos WHERE id = %s", (produto_id,))
-    if not cursor.fetchone():
+    cursor.execute(_sql("SELECT Estoque FROM Produtos WHERE IDProduto = %s"), (produto_id,))
+    atual = cursor.fetchone()
+    if not atual:
         cursor.close()
         raise HTTPException(status_code=404, detail="Produto não encontrado")
 
     sql = """
-        UPDATE produtos
-        SET nome = %s, categoria = %s, preco = %s
-        WHERE id = %s
+        UPDATE Produtos
+        SET Nome = %s, Categoria = %s, Preco = %s
+        WHERE IDProduto = %s
     """
     valores = (produto.nome, produto.categoria, produto.preco, produto_id)
-    cursor.execute(sql, valores)
+    cursor.execute(_sql(sql), valores)
     db.commit()
     cursor.close()
+    cache.produto_alterado(produto_id, produto.categoria)
+    busca.indice.indexar(produto_id, produto.nome, produto.categoria, produto.preco)
 
     return {
         "id": produto_id,
         "nome": produto.nome,
         "categoria": produto.categoria,
-        "preco": produto.preco
+        "preco": produto.preco,
+        "estoque": atual[0]
     }
 
 
 # ---------------------------------------------------------
 # REMOVER PRODUTO (com verificação de vendas)
 # ---------------------------------------------------------
-@router.delete("/{produto_id}")
-def remover(produto_id: int, db: MySQLConnection = Depends(get_db)):
-    cursor = db.cursor(dictionary=True)
+@router.delete("/{produto_id}", dependencies=[Depends(autenticacao.gerencia)])
+def remover(produto_id: int, db: PoolProxiedConnection = Depends(get_raw_db)):
+    cursor = db.cursor()
 
     # 1) Verificar se existe o produto
-    cursor.execute("SELECT id FROM produtos WHERE id = %s", (produto_id,))
+    cursor.execute(_sql("SELECT IDProduto, Nome FROM Produtos WHERE IDProduto = %s"), (produto_id,))
     produto = cursor.fetchone()
 
     if not produto:
@@ -107,12 +145,12 @@ def remover(produto_id: int, db: MySQLConnection = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Produto não encontrado")
 
     # 2) Verificar se o produto já foi vendido (impede exclusão)
-    cursor.execute("""
-        SELECT id 
-        FROM itensvenda 
-        WHERE IDProduto = %s 
+    cursor.execute(_sql("""
+        SELECT IDItem FROM ItensVenda WHERE IDProduto = %s
+        UNION ALL
+        SELECT IDItem FROM ItensVendaArquivo WHERE IDProduto = %s
         LIMIT 1
-    """, (produto_id,))
+    """), (produto_id, produto_id))
     
     venda = cursor.fetchone()
 
@@ -123,9 +161,15 @@ def remover(produto_id: int, db: MySQLConnection = Depends(get_db)):
             detail="Este produto já foi vendido e não pode ser excluído."
         )
 
-    # 3) Se não tem vendas, pode excluir
-    cursor.execute("DELETE FROM produtos WHERE id = %s", (produto_id,))
+    # 3) Se não tem vendas, pode excluir (com o razão de estoque, que então
+    #    só tem entradas e ajustes)
+    cursor.execute(_sql("DELETE FROM SnapshotsEstoque WHERE IDProduto = %s"), (produto_id,))
+    cursor.execute(_sql("DELETE FROM MovimentacoesEstoque WHERE IDProduto = %s"), (produto_id,))
+    cursor.execute(_sql("DELETE FROM Produtos WHERE IDProduto = %s"), (produto_id,))
     db.commit()
 
     cursor.close()
+    cache.produto_alterado(produto_id)
+    busca.indice.remover(produto_id)
+    eventos.produto_removido(produto_id, produto[1])
     return {"message": "Produto removido com sucesso!"}
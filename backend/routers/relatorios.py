@@ -0,0 +1,61 @@
+from datetime import date, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..replicas import get_async_db_leitura
+from .. import autenticacao, relatorios
+
+# Receita e desempenho por atendente: só a gerência
+router = APIRouter(prefix="/api/relatorios", tags=["Relatórios"], dependencies=[Depends(autenticacao.gerencia)])
+
+MAX_DIAS = 366
+
+
+# ---------------------------------------------------------
+# RECEITA POR DIA
+# ---------------------------------------------------------
+@router.get("/receita")
+async def receita(
+    inicio: Optional[date] = None,
+    fim: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db_leitura)
+):
+    fim = fim or relatorios.hoje()
+    inicio = inicio or fim - timedelta(days=29)
+
+    if inicio > fim:
+        raise HTTPException(status_code=400, detail="Data inicial maior que a final.")
+    if (fim - inicio).days >= MAX_DIAS:
+        raise HTTPException(status_code=400, detail=f"Intervalo máximo de {MAX_DIAS} dias.")
+
+    dias = await db.run_sync(relatorios.receita_por_dia, inicio, fim)
+
+    return {
+        "inicio": str(inicio),
+        "fim": str(fim),
+        "receita_total": sum(d["receita"] for d in dias),
+        "vendas": sum(d["vendas"] for d in dias),
+        "dias": dias
+    }
+
+
+# ---------------------------------------------------------
+# PRODUTOS MAIS VENDIDOS
+# ---------------------------------------------------------
+@router.get("/produtos/top")
+async def top_produtos(
+    limite: int = Query(10, ge=1, le=100),
+    por: str = Query("receita", pattern="^(receita|quantidade)$"),
+    db: AsyncSession = Depends(get_async_db_leitura)
+):
+    return {"produtos": await db.run_sync(relatorios.top_produtos, limite, por)}
+
+
+# ---------------------------------------------------------
+# VENDAS POR ATENDENTE
+# ---------------------------------------------------------
+@router.get("/atendentes")
+async def atendentes(db: AsyncSession = Depends(get_async_db_leitura)):
+    return {"atendentes": await db.run_sync(relatorios.vendas_por_atendente)}
@@ -2,42 +2,36 @@ from fastapi import APIRouter, HTTPException, Depends, status
 from sqlalchemy.orm import Session
 from typing import List
 
-from ..database import SessionLocal
-from .. import models, schemas, security
+from sqlalchemy.ext.asyncio import AsyncSession
 
-router = APIRouter()
+from ..database import get_async_db
+from ..replicas import get_async_db_leitura
+from .. import models, schemas, security, crud, autenticacao, respostas, arquivamento
 
-# Dependência do banco
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+router = APIRouter()
 
 # -----------------------------------------------
 # LISTAR USUÁRIOS
 # -----------------------------------------------
-@router.get("/usuarios", response_model=List[schemas.UsuarioOut])
-def listar_usuarios(db: Session = Depends(get_db)):
-    usuarios = db.query(models.Usuario).all()
-
-    return [
-        schemas.UsuarioOut(
-            id=u.IDUsuario,
-            nome=u.Nome,
-            email=u.Email,
-            grupo_id=u.IDGrupo
-        )
-        for u in usuarios
-    ]
+@router.get("/usuarios", response_model=List[schemas.UsuarioOut], dependencies=[Depends(autenticacao.gerencia)])
+async def listar_usuarios(db: AsyncSession = Depends(get_async_db_leitura)):
+    # Linhas do banco já no formato de UsuarioOut: o response_model fica
+    # só para a documentação, a Response pronta não é validada de novo
+    return respostas.json(await db.run_sync(crud.listar_usuarios))
 
 # -----------------------------------------------
 # CRIAR USUÁRIO
 # -----------------------------------------------
-@router.post("/usuarios", response_model=schemas.UsuarioOut, status_code=201)
-def criar_usuario(payload: schemas.UsuarioCreate, db: Session = Depends(get_db)):
-    
+@router.post(
+    "/usuarios", response_model=schemas.UsuarioOut, status_code=201, dependencies=[Depends(autenticacao.gerencia)]
+)
+async def criar_usuario(payload: schemas.UsuarioCreate, db: AsyncSession = Depends(get_async_db)):
+    senha_hash = await security.servico.hash(payload.senha)
+    return await db.run_sync(_criar_usuario, payload, senha_hash)
+
+
+def _criar_usuario(db: Session, payload: schemas.UsuarioCreate, senha_hash: str):
+
     # Verifica grupo existente
     grupo = db.query(models.GrupoUsuario).filter(
         models.GrupoUsuario.IDGrupo == payload.grupo_id
@@ -58,7 +52,7 @@ def criar_usuario(payload: schemas.UsuarioCreate, db: Session = Depends(get_db))
     novo = models.Usuario(
         Nome=payload.nome,
         Email=payload.email,
-        SenhaHash=security.hash_password(payload.senha),
+        SenhaHash=senha_hash,
         IDGrupo=payload.grupo_id
     )
 
@@ -77,8 +71,12 @@ def criar_usuario(payload: schemas.UsuarioCreate, db: Session = Depends(get_db))
 # -----------------------------------------------
 # EXCLUIR USUÁRIO
 # -----------------------------------------------
-@router.delete("/usuarios/{id}", status_code=200)
-def excluir_usuario(id: int, db: Session = Depends(get_db)):
+@router.delete("/usuarios/{id}", status_code=200, dependencies=[Depends(autenticacao.gerencia)])
+async def excluir_usuario(id: int, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(_excluir_usuario, id)
+
+
+def _excluir_usuario(db: Session, id: int):
     usuario = db.query(models.Usuario).filter(
         models.Usuario.IDUsuario == id
     ).first()
@@ -86,7 +84,12 @@ def excluir_usuario(id: int, db: Session = Depends(get_db)):
     if not usuario:
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
 
+    # O arquivo de vendas não tem FK: a checagem é feita aqui
+    if arquivamento.usuario_arquivado(db, id):
+        raise HTTPException(status_code=400, detail="Usuário com vendas arquivadas não pode ser excluído.")
+
     db.delete(usuario)
     db.commit()
+    autenticacao.revogacoes.revogar_usuario(id)
 
     return {"message": "Usuário excluído com sucesso!"}
@@ -1,25 +1,100 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import List, Optional
 
-from ..database import SessionLocal
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import arquivamento, autenticacao, config, fila_vendas, respostas
+from ..database import get_async_db
+from ..replicas import get_async_db_leitura
 from ..schemas import VendaCreate
-from ..crud import criar_venda
+from ..crud import criar_venda, criar_vendas_lote, validar_venda, MAX_VENDAS_LOTE
+from ..estoque import EstoqueInsuficiente
 
-router = APIRouter()
+# Só a equipe (gerência e funcionários) registra vendas
+router = APIRouter(dependencies=[Depends(autenticacao.equipe)])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+
+# Situação no diário -> status da resposta a um POST repetido
+STATUS_SITUACAO = {fila_vendas.PENDENTE: 202, fila_vendas.REGISTRADA: 200, fila_vendas.RECUSADA: 409}
 
 
 @router.post("/vendas")
-def registrar_venda(venda: VendaCreate, db: Session = Depends(get_db)):
+async def registrar_venda(
+    venda: VendaCreate,
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=64),
+):
+    if config.VENDAS_ASSINCRONAS:
+        return await receber_venda(venda, idempotency_key or fila_vendas.nova_chave())
+
     try:
-        nova = criar_venda(db, venda)
-        return {"mensagem": "Venda registrada!", "id_venda": nova.IDVenda}
+        id_venda = await db.run_sync(lambda s: criar_venda(s, venda).IDVenda)
+        return {"mensagem": "Venda registrada!", "id_venda": id_venda}
+
+    except EstoqueInsuficiente as e:
+        raise HTTPException(409, {"mensagem": str(e), "itens": e.faltas})
 
     except Exception as e:
         raise HTTPException(400, f"Erro ao registrar venda: {e}")
+
+
+async def receber_venda(venda: VendaCreate, chave: str):
+    # O que dá para checar sem o banco falha já; o resto, na drenagem
+    erro = validar_venda(venda)
+    if erro:
+        raise HTTPException(400, f"Erro ao registrar venda: {erro}")
+
+    try:
+        nova, situacao = await run_in_threadpool(fila_vendas.receber, venda, chave)
+    except fila_vendas.ChaveEmUso:
+        raise HTTPException(422, "Idempotency-Key já usada com outra venda.")
+
+    mensagem = "Venda recebida; será registrada em instantes." if nova else "Venda já recebida."
+    return respostas.json(
+        {"mensagem": mensagem, **situacao},
+        status_code=STATUS_SITUACAO[situacao["situacao"]],
+        headers={"Location": f"/api/vendas/pendentes/{chave}"},
+    )
+
+
+@router.get("/vendas/fila")
+async def estado_fila():
+    estatisticas = await run_in_threadpool(fila_vendas.diario.estatisticas)
+    return {"ativa": config.VENDAS_ASSINCRONAS, **estatisticas, "drenador": fila_vendas.drenador.estatisticas()}
+
+
+@router.get("/vendas/pendentes/{chave}")
+async def situacao_venda(chave: str):
+    situacao = await run_in_threadpool(fila_vendas.diario.situacao, chave)
+    if situacao is None:
+        raise HTTPException(404, "Venda não encontrada no diário.")
+    return situacao
+
+
+@router.get("/vendas/{id_venda}")
+async def obter_venda(id_venda: int, db: AsyncSession = Depends(get_async_db_leitura)):
+    # Das tabelas quentes ou do arquivo (arquivamento.py)
+    venda = await db.run_sync(arquivamento.buscar_venda, id_venda)
+    if venda is None:
+        raise HTTPException(404, "Venda não encontrada.")
+    return venda
+
+
+@router.post("/vendas/lote")
+async def registrar_vendas_lote(vendas: List[VendaCreate], db: AsyncSession = Depends(get_async_db)):
+    if not vendas:
+        raise HTTPException(400, "Nenhuma venda enviada.")
+
+    if len(vendas) > MAX_VENDAS_LOTE:
+        raise HTTPException(413, f"Lote excede o limite de {MAX_VENDAS_LOTE} vendas.")
+
+    resultados = await db.run_sync(criar_vendas_lote, vendas)
+    registradas = sum(1 for r in resultados if r["id_venda"] is not None)
+
+    return {
+        "mensagem": f"{registradas} de {len(vendas)} venda(s) registrada(s).",
+        "registradas": registradas,
+        "falhas": len(vendas) - registradas,
+        "resultados": resultados
+    }
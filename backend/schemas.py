@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List
 
 
@@ -36,6 +36,14 @@ class ProdutoCreate(ProdutoBase):
     pass
 
 
+class ProdutoImportacao(ProdutoBase):
+    """Linha de importação em lote: com ``id`` atualiza, sem ``id`` insere."""
+    id: Optional[int] = Field(None, ge=1)
+    preco: float = Field(ge=0)
+    descricao: Optional[str] = None
+    estoque: Optional[int] = Field(None, ge=0)  # ausente: mantém o atual
+
+
 class ProdutoOut(ProdutoBase):
     id: int
 
@@ -68,3 +76,32 @@ class ItemVenda(BaseModel):
 class VendaCreate(BaseModel):
     id_usuario: int
     itens: List[ItemVenda]
+
+
+# -------------------------------
+# AVALIAÇÕES
+# -------------------------------
+class AvaliacaoCreate(BaseModel):
+    nota: int = Field(..., ge=1, le=5)
+    comentario: Optional[str] = Field(None, max_length=1000)
+
+
+# -------------------------------
+# PREÇOS EM LOTE (ver precos.py)
+# -------------------------------
+class RegraPreco(BaseModel):
+    # Sem categoria nem ids, a regra vale para todo o catálogo
+    categoria: Optional[str] = None
+    ids: Optional[List[int]] = None
+    percentual: float = 0                   # desconto em %; fora de 0–90 é limitado
+    valor: float = Field(0, ge=0)           # abatimento fixo em R$
+
+
+class AjustePrecos(BaseModel):
+    regras: List[RegraPreco] = Field(..., min_length=1, max_length=50)
+    arredondar_90: bool = False             # preço final terminado em ,90 (para baixo)
+
+
+class AplicacaoPrecos(AjustePrecos):
+    # Assinatura devolvida pela simulação: se os preços mudaram desde então, 409
+    assinatura: Optional[str] = None
@@ -1,9 +1,194 @@
+import asyncio
+import base64
 import hashlib
+import hmac
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-def hash_password(password: str) -> str:
+from fastapi import HTTPException
+
+from . import config
+
+
+# ---------------------------------------------------------
+# KDF (scrypt, com salt)
+# ---------------------------------------------------------
+# Formato gravado em SenhaHash: scrypt$<n>$<r>$<p>$<salt b64>$<hash b64>
+# Hashes antigos (SHA-256 hex, sem salt) ainda são aceitos no login e
+# trocados pelo formato novo assim que o usuário entra.
+
+PREFIXO = "scrypt"
+TAMANHO_SALT = 16
+TAMANHO_HASH = 32
+
+
+def _b64(dados: bytes) -> str:
+    return base64.b64encode(dados).decode("ascii")
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+        maxmem=128 * r * (n + p + 2) + 1024 * 1024, dklen=TAMANHO_HASH
+    )
+
+
+def _legado(password: str) -> str:
+    return hashlib.sha256(password.encode("utf-8")).hexdigest()
+
+
+def _eh_legado(password_hash: str) -> bool:
+    return len(password_hash) == 64 and "$" not in password_hash
+
+
+def hash_password(password: str, n: int = None, r: int = None, p: int = None) -> str:
     if password is None:
         return ""
-    return hashlib.sha256(password.encode("utf-8")).hexdigest()
+    n = n or config.HASH_SCRYPT_N
+    r = r or config.HASH_SCRYPT_R
+    p = p or config.HASH_SCRYPT_P
+    salt = os.urandom(TAMANHO_SALT)
+    return f"{PREFIXO}${n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, n, r, p))}"
+
 
 def verify_password(password: str, password_hash: str) -> bool:
-    return hash_password(password) == password_hash
+    if not password_hash or password is None:
+        return False
+
+    if _eh_legado(password_hash):
+        return hmac.compare_digest(_legado(password), password_hash)
+
+    try:
+        prefixo, n, r, p, salt, esperado = password_hash.split("$")
+        if prefixo != PREFIXO:
+            return False
+        calculado = _scrypt(password, base64.b64decode(salt), int(n), int(r), int(p))
+        esperado = base64.b64decode(esperado)
+    except ValueError:  # hash malformado (binascii.Error também é ValueError)
+        return False
+
+    return hmac.compare_digest(calculado, esperado)
+
+
+def precisa_rehash(password_hash: str) -> bool:
+    """True se o hash é legado ou foi gerado com outros parâmetros."""
+    if not password_hash or _eh_legado(password_hash):
+        return True
+    partes = password_hash.split("$")
+    return partes[:4] != [PREFIXO, str(config.HASH_SCRYPT_N), str(config.HASH_SCRYPT_R), str(config.HASH_SCRYPT_P)]
+
+
+# Executados dentro dos processos do pool: devolvem também o tempo gasto
+def _hash_medido(password, n, r, p):
+    inicio = time.perf_counter()
+    return hash_password(password, n, r, p), time.perf_counter() - inicio
+
+
+def _verify_medido(password, password_hash):
+    inicio = time.perf_counter()
+    return verify_password(password, password_hash), time.perf_counter() - inicio
+
+
+# ---------------------------------------------------------
+# SERVIÇO DE HASH (fora do event loop)
+# ---------------------------------------------------------
+class ServicoHash:
+    """Roda o KDF num pool de processos limitado.
+
+    Acima de ``fila_max`` chamadas pendentes recusa com 503, em vez de
+    acumular logins esperando atrás de um pool saturado.
+    """
+
+    def __init__(self, n=None, r=None, p=None, workers=None, fila_max=None, timeout=None):
+        self.n = n or config.HASH_SCRYPT_N
+        self.r = r or config.HASH_SCRYPT_R
+        self.p = p or config.HASH_SCRYPT_P
+        self.workers = workers or config.HASH_WORKERS
+        self.fila_max = fila_max or config.HASH_FILA_MAX
+        self.timeout = timeout or config.HASH_TIMEOUT
+
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pendentes = 0
+        self.chamadas = 0
+        self.rejeitadas = 0
+        self.timeouts = 0
+        self.tempo_total = 0.0
+        self.tempo_kdf = 0.0
+        self.tempo_max = 0.0
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self._executor
+
+    async def _executar(self, fn, *args):
+        with self._lock:
+            if self.pendentes >= self.fila_max:
+                self.rejeitadas += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Servidor ocupado, tente novamente.",
+                    headers={"Retry-After": "1"},
+                )
+            self.pendentes += 1
+
+        inicio = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            resultado, kdf = await asyncio.wait_for(
+                loop.run_in_executor(self._pool(), fn, *args), self.timeout
+            )
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise HTTPException(status_code=503, detail="Tempo esgotado ao verificar a senha.")
+        finally:
+            with self._lock:
+                self.pendentes -= 1
+
+        decorrido = time.perf_counter() - inicio
+        with self._lock:
+            self.chamadas += 1
+            self.tempo_total += decorrido
+            self.tempo_kdf += kdf
+            self.tempo_max = max(self.tempo_max, decorrido)
+        return resultado
+
+    async def hash(self, password: str) -> str:
+        if password is None:
+            return ""
+        return await self._executar(_hash_medido, password, self.n, self.r, self.p)
+
+    async def verificar(self, password: str, password_hash: str) -> bool:
+        # Hash legado é só um SHA-256: não vale a ida ao pool
+        if not password_hash or _eh_legado(password_hash):
+            return verify_password(password, password_hash)
+        return await self._executar(_verify_medido, password, password_hash)
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "kdf": f"{PREFIXO} n={self.n} r={self.r} p={self.p}",
+                "workers": self.workers,
+                "fila_max": self.fila_max,
+                "pendentes": self.pendentes,
+                "chamadas": self.chamadas,
+                "rejeitadas": self.rejeitadas,
+                "timeouts": self.timeouts,
+                "tempo_medio_ms": round(self.tempo_total / self.chamadas * 1000, 2) if self.chamadas else 0.0,
+                "kdf_medio_ms": round(self.tempo_kdf / self.chamadas * 1000, 2) if self.chamadas else 0.0,
+                "tempo_max_ms": round(self.tempo_max * 1000, 2),
+            }
+
+    def encerrar(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+servico = ServicoHash()
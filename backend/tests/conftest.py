@@ -0,0 +1,47 @@
+"""Fixtures dos testes: a API inteira sobre um SQLite em memória.
+
+Rode da raiz do repositório:
+    python -m pytest backend/tests
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from backend import database, models, security
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    database.definir_engine(engine)
+    models.Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        grupo = models.GrupoUsuario(NomeGrupo="GERENCIA")
+        db.add(grupo)
+        db.flush()
+        db.add(models.Usuario(
+            Nome="Gerente", Email="gerente@alfaiataria.com", IDGrupo=grupo.IDGrupo,
+            SenhaHash=security.hash_password("123"),
+        ))
+        db.add_all([
+            models.Produto(Nome=f"Calça {i}", Categoria="Calças", Preco=100.0 + i, Estoque=5)
+            for i in range(1, 4)
+        ])
+        db.commit()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def cliente(engine):
+    from backend.app import app
+    return TestClient(app)
+
+
+@pytest.fixture
+def gerente(cliente):
+    """Cabeçalhos com o token de um usuário da gerência (id 1)."""
+    resposta = cliente.post("/api/login", json={"usuario": "gerente@alfaiataria.com", "senha": "123"})
+    return {"Authorization": f"Bearer {resposta.json()['token']}"}
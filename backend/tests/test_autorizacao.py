@@ -0,0 +1,27 @@
+import pytest
+
+ROTAS_GERENCIA = [
+    "/api/exportar/vendas",
+    "/api/relatorios/receita",
+    "/api/relatorios/produtos/top",
+    "/api/relatorios/atendentes",
+]
+
+
+@pytest.mark.parametrize("rota", ROTAS_GERENCIA)
+def test_sem_token_responde_401(cliente, rota):
+    resposta = cliente.get(rota)
+    assert resposta.status_code == 401
+    assert resposta.headers["WWW-Authenticate"] == "Bearer"
+
+
+@pytest.mark.parametrize("rota", ROTAS_GERENCIA)
+def test_token_invalido_responde_401(cliente, rota):
+    resposta = cliente.get(rota, headers={"Authorization": "Bearer invalido"})
+    assert resposta.status_code == 401
+
+
+def test_exportacao_com_token_da_gerencia(cliente, gerente):
+    resposta = cliente.get("/api/exportar/vendas", headers=gerente)
+    assert resposta.status_code == 200
+    assert resposta.headers["content-type"].startswith("text/csv")
@@ -0,0 +1,35 @@
+from backend.busca import IndiceProdutos
+
+
+class BancoLento:
+    """Devolve ``linhas`` e, no meio da consulta, roda ``durante``."""
+
+    def __init__(self, linhas, durante):
+        self.linhas, self.durante = linhas, durante
+
+    def execute(self, consulta):
+        for i, linha in enumerate(self.linhas):
+            if i == 1:
+                self.durante()
+            yield linha
+
+
+def test_escritas_durante_a_recarga_nao_se_perdem():
+    indice = IndiceProdutos()
+    indice.indexar(2, "Colete social", "Coletes", 80.0)
+
+    def escritas():
+        indice.indexar(9, "Gravata borboleta", "Acessórios", 30.0)   # criado agora
+        indice.remover(2)                                            # excluído agora
+        indice.atualizar_precos({1: 99.0})
+
+    linhas = [(1, "Calça de linho", "Calças", None, 120.0), (2, "Colete social", "Coletes", None, 80.0)]
+    indice.carregar(BancoLento(linhas, escritas))
+
+    assert [p["id"] for p in indice.buscar("gravata")] == [9]
+    assert indice.buscar("colete") == []
+    assert indice.buscar("linho")[0]["preco"] == 99.0
+
+    # Fora de uma recarga, nada fica anotado
+    indice.indexar(10, "Suspensório", "Acessórios", 40.0)
+    assert indice._durante_recarga is None
@@ -0,0 +1,30 @@
+from datetime import date, datetime
+
+from sqlalchemy.orm import Session
+
+from backend import dashboard, models, relatorios
+
+
+def test_vendas_de_hoje_no_dia_comercial(engine, monkeypatch):
+    monkeypatch.setattr(relatorios, "hoje", lambda: date(2026, 3, 10))
+    with Session(engine) as db:
+        db.add_all([
+            models.Venda(IDUsuarioCliente=1, IDUsuarioAtendente=1, Total=t, DataVenda=quando)
+            for t, quando in (
+                (1.0, datetime(2026, 3, 10, 2, 59)),    # 23:59 do dia 9 em São Paulo
+                (10.0, datetime(2026, 3, 10, 3, 0)),    # 00:00 do dia 10
+                (20.0, datetime(2026, 3, 11, 2, 30)),   # 23:30 do dia 10
+                (40.0, datetime(2026, 3, 11, 3, 0)),    # já é dia 11
+            )
+        ])
+        db.add(models.AvisoEstoque(IDProduto=1, Mensagem="Estoque zerado", DataAviso=datetime(2026, 3, 10, 12, 0)))
+        db.commit()
+
+        resumo = dashboard.resumo(db)
+
+    assert resumo["vendas_hoje"] == {"data": "2026-03-10", "quantidade": 2, "receita": 30.0}
+    assert resumo["avisos"][0]["data"] == "2026-03-10T12:00:00Z"
+
+
+def test_inicio_do_dia_em_utc():
+    assert relatorios.inicio_do_dia(date(2026, 3, 10)) == datetime(2026, 3, 10, 3, 0)
@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from backend import cache, crud, eventos, models, schemas
+
+
+class Gravador(eventos.Barramento):
+    """Barramento com um assinante fictício que guarda o que foi publicado."""
+
+    def __init__(self):
+        super().__init__()
+        self.eventos = []
+
+    @property
+    def assinantes(self):
+        return 1
+
+    def publicar(self, tipo, dados):
+        self.eventos.append((tipo, dados["id_produto"], dados.get("estoque")))
+
+
+@pytest.fixture
+def publicados(monkeypatch):
+    gravador = Gravador()
+    monkeypatch.setattr(eventos, "estoque", gravador)
+    return gravador.eventos
+
+
+def _venda(id_produto, quantidade):
+    return schemas.VendaCreate.model_validate(
+        {"id_usuario": 1, "itens": [{"id": id_produto, "quantidade": quantidade, "preco": 1.0, "total": 1.0}]}
+    )
+
+
+def test_zerado_vem_da_reserva_e_nao_de_releitura(engine, publicados, monkeypatch):
+    # Outra venda baixa o resto do estoque logo depois do commit desta
+    original = cache.produtos_alterados
+
+    def venda_concorrente(ids):
+        with Session(engine) as db:
+            db.execute(update(models.Produto).where(models.Produto.IDProduto == 1).values(Estoque=0))
+            db.commit()
+        original(ids)
+
+    monkeypatch.setattr(cache, "produtos_alterados", venda_concorrente)
+    with Session(engine) as db:
+        crud.criar_venda(db, _venda(1, 2))
+
+    assert publicados == [("estoque", 1, 3)]
+
+
+def test_zerado_uma_vez_no_lote(engine, publicados):
+    with Session(engine) as db:
+        crud.criar_vendas_lote(db, [_venda(2, 3), _venda(2, 2), _venda(2, 1)])
+
+    assert publicados == [("estoque", 2, 0), ("estoque_zerado", 2, 0)]
+
+
+def test_cadastro_publica_estoque_e_exclusao_nao_e_estoque_zerado(cliente, gerente, publicados):
+    resposta = cliente.post("/api/produtos", json={"nome": "Colete", "preco": 90.0, "estoque": 4}, headers=gerente)
+    id_produto = resposta.json()["produto"]["id"]
+    assert cliente.delete(f"/api/produtos/{id_produto}", headers=gerente).status_code == 200
+
+    assert publicados == [("estoque", id_produto, 4), ("produto_removido", id_produto, None)]
+
+
+def test_exclusao_pelo_roteador_de_produtos_publica_remocao(cliente, gerente, publicados):
+    # O roteador (SQL direto) está montado em /api/api/produtos
+    assert cliente.delete("/api/api/produtos/3", headers=gerente).status_code == 200
+    assert publicados == [("produto_removido", 3, None)]
@@ -0,0 +1,80 @@
+import pytest
+from sqlalchemy import exc
+
+from backend import config, crud, fila_vendas, schemas
+
+
+def _venda(preco):
+    return schemas.VendaCreate.model_validate(
+        {"id_usuario": 1, "itens": [{"id": 1, "quantidade": 1, "preco": preco, "total": preco}]}
+    )
+
+
+@pytest.fixture
+def diario(engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "VENDAS_MAX_TENTATIVAS", 2)
+
+    # A venda de R$ 13 derruba qualquer transação em que entrar; a de R$ 14
+    # cai em deadlock enquanto ``deadlocks`` não zerar
+    original = crud.criar_vendas_lote
+    deadlocks = [0]
+
+    def criar_vendas_lote(db, vendas, chaves=None):
+        precos = {item.preco for venda in vendas for item in venda.itens}
+        if 13.0 in precos:
+            raise ValueError("venda envenenada")
+        if 14.0 in precos and deadlocks[0]:
+            deadlocks[0] -= 1
+            raise exc.OperationalError("INSERT ...", None, Exception(1213, "Deadlock found when trying to get lock"))
+        return original(db, vendas, chaves)
+
+    monkeypatch.setattr(crud, "criar_vendas_lote", criar_vendas_lote)
+    diario = fila_vendas.Diario(str(tmp_path / "vendas.db"))
+    diario.deadlocks = deadlocks
+    yield diario
+    diario.fechar()
+
+
+def test_venda_que_sempre_falha_nao_trava_a_fila(diario):
+    for chave, preco in (("a", 10.0), ("ruim", 13.0), ("b", 11.0)):
+        diario.acrescentar(chave, _venda(preco))
+
+    # O lote falha, é refeito venda a venda e só a culpada fica pendente
+    assert fila_vendas.drenar_lote(diario, 10)["registradas"] == 2
+    assert diario.situacao("a")["situacao"] == fila_vendas.REGISTRADA
+    assert diario.situacao("b")["situacao"] == fila_vendas.REGISTRADA
+    ruim = diario.situacao("ruim")
+    assert (ruim["situacao"], ruim["tentativas"]) == (fila_vendas.PENDENTE, 1)
+
+    # Na tentativa seguinte ela chega ao limite e é recusada com o erro
+    fila_vendas.drenar_lote(diario, 10)
+    ruim = diario.situacao("ruim")
+    assert (ruim["situacao"], ruim["tentativas"]) == (fila_vendas.RECUSADA, 2)
+    assert "venda envenenada" in ruim["erro"]
+
+    diario.acrescentar("c", _venda(12.0))
+    assert fila_vendas.drenar_lote(diario, 10)["registradas"] == 1
+    assert fila_vendas.drenar_lote(diario, 10) is None
+
+
+def test_venda_ilegivel_no_diario_e_recusada(diario):
+    diario.acrescentar("a", _venda(10.0))
+    diario._conexao().execute("UPDATE vendas SET venda = '{}' WHERE chave = 'a'")
+    diario.acrescentar("b", _venda(11.0))
+
+    assert fila_vendas.drenar_lote(diario, 10)["registradas"] == 1
+    assert diario.situacao("a")["situacao"] == fila_vendas.RECUSADA
+
+
+def test_deadlock_nao_conta_tentativa(diario):
+    diario.deadlocks[0] = 5     # mais que VENDAS_MAX_TENTATIVAS
+    diario.acrescentar("disputada", _venda(14.0))
+
+    for _ in range(5):
+        with pytest.raises(exc.OperationalError):
+            fila_vendas.drenar_lote(diario, 10)
+    situacao = diario.situacao("disputada")
+    assert (situacao["situacao"], situacao["tentativas"]) == (fila_vendas.PENDENTE, 0)
+
+    assert fila_vendas.drenar_lote(diario, 10)["registradas"] == 1
+    assert diario.situacao("disputada")["situacao"] == fila_vendas.REGISTRADA
@@ -0,0 +1,35 @@
+import io
+
+from sqlalchemy.orm import Session
+
+from backend import busca, cache, eventos, importacao, models
+
+
+def test_importacao_lanca_estoque_e_reindexa_so_o_importado(engine, monkeypatch):
+    publicados, invalidadas = [], []
+    monkeypatch.setattr(eventos, "estoque_alterado", lambda *a: publicados.append(a))
+    monkeypatch.setattr(cache.catalogo, "invalidar", lambda *tags: invalidadas.extend(tags))
+    monkeypatch.setattr(busca.indice, "carregar", lambda db: (_ for _ in ()).throw(AssertionError("recarga")))
+
+    arquivo = io.BytesIO(
+        "id,nome,preco,estoque\n"
+        "1,Calça 1,101,0\n"
+        ",Colete,80,3\n"
+        ",Colete,85,\n"
+        ",Gravata,30,2\n".encode()
+    )
+    with Session(engine) as db:
+        relatorio = importacao.importar(db, arquivo, "csv")
+        assert (relatorio["inseridos"], relatorio["atualizados"]) == (3, 1)
+
+        # Um INSERT por combinação de colunas: com estoque, depois sem
+        novos = db.query(models.Produto).filter(models.Produto.IDProduto > 3).order_by(models.Produto.IDProduto)
+        assert [(p.IDProduto, p.Nome, p.Estoque) for p in novos] == [(4, "Colete", 3), (5, "Gravata", 2), (6, "Colete", 0)]
+        movimentos = db.query(models.MovimentacaoEstoque).order_by(models.MovimentacaoEstoque.IDProduto)
+        assert [(m.IDProduto, m.TipoMovimentacao, m.Quantidade) for m in movimentos] == [
+            (1, "Saída", 5), (4, "Entrada", 3), (5, "Entrada", 2),
+        ]
+
+    assert [(a[0], a[3]) for a in publicados] == [(1, 0), (4, 3), (5, 2)]
+    assert {"catalogo", "produto:1", "produto:4", "produto:5", "produto:6"} <= set(invalidadas)
+    assert [p["id"] for p in busca.indice.buscar("gravata")] == [5]
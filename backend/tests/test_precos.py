@@ -0,0 +1,32 @@
+import pytest
+from sqlalchemy.orm import Session
+
+from backend import models, precos, schemas
+
+np = pytest.importorskip("numpy")
+
+
+def _ajuste(*regras, arredondar_90=False):
+    return schemas.AjustePrecos(regras=list(regras), arredondar_90=arredondar_90)
+
+
+def test_arredondar_90_leva_ao_90_imediatamente_abaixo():
+    novos = precos.calcular(
+        np.array([1, 2]), np.array([89.99, 50.0]), np.array(["A", "B"], dtype=object),
+        _ajuste({"categoria": "A"}, arredondar_90=True),
+    )
+    assert novos.tolist() == [89.90, 50.0]
+
+
+def test_carrega_e_trava_so_o_alcance_das_regras(engine):
+    with Session(engine) as db:
+        db.add(models.Produto(Nome="Colete", Categoria="Coletes", Preco=80.0, Estoque=1))
+        db.commit()
+
+        ids, _, categorias = precos._carregar(db, _ajuste({"categoria": "Coletes"}, {"ids": [1]}), travar=True)
+        assert ids.tolist() == [1, 4]
+        assert categorias.tolist() == ["Calças", "Coletes"]
+
+        # Uma regra sem filtro alcança o catálogo todo
+        ids, _, _ = precos._carregar(db, _ajuste({"categoria": "Coletes"}, {"percentual": 5}))
+        assert ids.tolist() == [1, 2, 3, 4]
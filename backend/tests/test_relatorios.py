@@ -0,0 +1,34 @@
+from datetime import date, datetime
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from backend import crud, models, relatorios, schemas
+
+
+def _venda(preco):
+    return schemas.VendaCreate.model_validate(
+        {"id_usuario": 1, "itens": [{"id": 1, "quantidade": 1, "preco": preco, "total": preco}]}
+    )
+
+
+def _dias(db):
+    return [(d.Data, d.QtdVendas, d.Receita) for d in db.query(models.VendaDiaria).order_by(models.VendaDiaria.Data)]
+
+
+def test_dia_comercial_no_fuso_da_loja():
+    # 01:30 UTC ainda é o dia anterior em São Paulo (UTC-3)
+    assert relatorios.dia_comercial(datetime(2026, 3, 11, 1, 30)) == date(2026, 3, 10)
+    assert relatorios.dia_comercial(datetime(2026, 3, 11, 3, 0)) == date(2026, 3, 11)
+
+
+def test_reconstruir_usa_o_mesmo_dia_que_o_registro(engine, monkeypatch):
+    with Session(engine) as db:
+        for preco, quando in ((10.0, datetime(2026, 3, 11, 1, 30)), (20.0, datetime(2026, 3, 11, 15, 0))):
+            venda = crud.criar_venda(db, _venda(preco))
+            db.execute(update(models.Venda).where(models.Venda.IDVenda == venda.IDVenda).values(DataVenda=quando))
+            db.commit()
+
+        # O incremental usou a hora do commit; o recálculo parte da DataVenda
+        relatorios.reconstruir(db)
+        assert _dias(db) == [(date(2026, 3, 10), 1, 10.0), (date(2026, 3, 11), 1, 20.0)]
@@ -0,0 +1,45 @@
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from backend import autenticacao, replicas
+
+
+def _app():
+    app = FastAPI()
+    app.add_middleware(replicas.MiddlewarePrimarioAposEscrita)
+
+    @app.post("/escrever")
+    def escrever(falhar: bool = False):
+        if falhar:
+            raise HTTPException(status_code=409)
+        return {}
+
+    @app.get("/ler")
+    def ler(request: Request):
+        return {"primario": replicas.usar_primario(request)}
+
+    return TestClient(app)
+
+
+def _cabecalhos(id_usuario):
+    token = autenticacao.emitir(id_usuario, autenticacao.GERENCIA, 1)["token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_le_do_primario_depois_de_escrever():
+    cliente, quem_escreveu, outro = _app(), _cabecalhos(41), _cabecalhos(42)
+
+    assert cliente.get("/ler", headers=quem_escreveu).json() == {"primario": False}
+    assert cliente.post("/escrever", headers=quem_escreveu).status_code == 200
+
+    # Sem cookie: a marca fica no servidor, pelo id do token
+    assert not cliente.cookies
+    assert cliente.get("/ler", headers=quem_escreveu).json() == {"primario": True}
+    assert cliente.get("/ler", headers=outro).json() == {"primario": False}
+    assert cliente.get("/ler").json() == {"primario": False}
+
+
+def test_escrita_recusada_nao_marca():
+    cliente, cabecalhos = _app(), _cabecalhos(43)
+    assert cliente.post("/escrever?falhar=true", headers=cabecalhos).status_code == 409
+    assert cliente.get("/ler", headers=cabecalhos).json() == {"primario": False}
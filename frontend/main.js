@@ -6,13 +6,26 @@ const API_URL = "http://127.0.0.1:8000/api";
 // ============================================================
 async function apiRequest(url, options = {}) {
     try {
+        const token = localStorage.getItem("token");
         const response = await fetch(url, {
-            headers: { "Content-Type": "application/json", ...(options.headers || {}) },
-            ...options
+            ...options,
+            headers: {
+                "Content-Type": "application/json",
+                ...(token ? { Authorization: `Bearer ${token}` } : {}),
+                ...(options.headers || {})
+            }
         });
 
         const data = await response.json().catch(() => null);
 
+        // Token ausente, expirado ou revogado: volta para o login
+        if (response.status === 401) {
+            localStorage.removeItem("usuario");
+            localStorage.removeItem("token");
+            window.location.href = "index.html";
+            return null;
+        }
+
         if (!response.ok) {
             throw new Error(data?.detail || data?.message || "Erro na requisição.");
         }
@@ -371,7 +384,16 @@ document.addEventListener("DOMContentLoaded", () => {
     // logout
     document.querySelectorAll(".logout").forEach(btn => {
         btn.addEventListener("click", () => {
+            const token = localStorage.getItem("token");
+            if (token) {
+                fetch(`${API_URL}/logout`, {
+                    method: "POST",
+                    headers: { Authorization: `Bearer ${token}` },
+                    keepalive: true
+                }).catch(() => {});
+            }
             localStorage.removeItem("usuario");
+            localStorage.removeItem("token");
             window.location.href = "index.html";
         });
     });
@@ -1,5 +1,11 @@
 const API = "http://127.0.0.1:8000/api";
 
+// Token emitido no login (ver backend/autenticacao.py)
+function authHeaders(extra = {}) {
+    const token = localStorage.getItem("token");
+    return token ? { ...extra, Authorization: `Bearer ${token}` } : extra;
+}
+
 let produtos = [];
 let itens = [];
 
@@ -15,7 +21,7 @@ document.addEventListener("DOMContentLoaded", () => {
         usuario = null;
     }
 
-    if (!usuario) {
+    if (!usuario || !localStorage.getItem("token")) {
         alert("Você precisa estar logado!");
         window.location.href = "index.html";
         return;
@@ -37,6 +43,7 @@ document.addEventListener("DOMContentLoaded", () => {
     if (menuVendas) menuVendas.style.display = "block";
 
     // Eventos da página
+    document.getElementById("busca-produto").addEventListener("input", agendarBusca);
     document.getElementById("add-item").addEventListener("click", adicionarItem);
     document.getElementById("finalizar-venda").addEventListener("click", finalizarVenda);
 });
@@ -45,13 +52,34 @@ document.addEventListener("DOMContentLoaded", () => {
 // Carregar produtos
 // ===================================
 async function carregarProdutos() {
-    const resp = await fetch(`${API}/produtos`);
-    produtos = await resp.json();
+    // Busca em páginas (cursor por ID) só os campos usados na tela
+    produtos = [];
+    let cursor = null;
+
+    do {
+        const params = new URLSearchParams({ fields: "id,nome,preco", limit: "500" });
+        if (cursor !== null) params.set("cursor", cursor);
+
+        const resp = await fetch(`${API}/produtos?${params}`, { headers: authHeaders() });
+        const pagina = await resp.json();
+
+        produtos.push(...pagina.produtos);
+        cursor = pagina.proximo_cursor;
+    } while (cursor !== null);
+
+    preencherSelect(produtos);
+}
 
+function preencherSelect(lista, rotulo = "Selecione um produto") {
     const select = document.getElementById("produto-select");
-    select.innerHTML = '<option value="">Selecione um produto</option>';
+    select.innerHTML = "";
 
-    produtos.forEach(p => {
+    const vazio = document.createElement("option");
+    vazio.value = "";
+    vazio.textContent = rotulo;
+    select.appendChild(vazio);
+
+    lista.forEach(p => {
         const opt = document.createElement("option");
         opt.value = p.id;
         opt.textContent = `${p.nome} — R$ ${p.preco.toFixed(2)}`;
@@ -59,6 +87,49 @@ async function carregarProdutos() {
     });
 }
 
+// ===================================
+// Buscar produtos (nome, categoria ou descrição; tolera erro de digitação)
+// ===================================
+let buscaTimer = null;
+let buscaAtual = 0;
+
+function agendarBusca() {
+    clearTimeout(buscaTimer);
+    buscaTimer = setTimeout(buscarProdutos, 200);
+}
+
+async function buscarProdutos() {
+    const termo = document.getElementById("busca-produto").value.trim();
+    const minhaBusca = ++buscaAtual;
+
+    if (!termo) {
+        preencherSelect(produtos);
+        return;
+    }
+
+    const params = new URLSearchParams({ q: termo, limite: "50" });
+    const resp = await fetch(`${API}/produtos/busca?${params}`, { headers: authHeaders() });
+    const resultado = await resp.json();
+
+    // Uma busca mais nova já respondeu ou está a caminho
+    if (minhaBusca !== buscaAtual) return;
+
+    // Produtos cadastrados depois da carga da página também podem ser vendidos
+    resultado.produtos.forEach(p => {
+        if (!produtos.some(x => x.id === p.id)) produtos.push(p);
+    });
+
+    const selecione = resultado.produtos.length
+        ? `${resultado.produtos.length} produto(s) encontrado(s)`
+        : "Nenhum produto encontrado";
+    preencherSelect(resultado.produtos, selecione);
+
+    // Um único resultado já fica selecionado
+    if (resultado.produtos.length === 1) {
+        document.getElementById("produto-select").value = resultado.produtos[0].id;
+    }
+}
+
 // ===================================
 // Adicionar item
 // ===================================
@@ -121,6 +192,13 @@ function removerItem(index) {
 // ===================================
 // Finalizar venda
 // ===================================
+let chaveVenda = null;
+
+function novaChave() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID().replace(/-/g, "");
+    return Date.now().toString(16) + Math.random().toString(16).slice(2);
+}
+
 async function finalizarVenda() {
 
     let usuario = JSON.parse(localStorage.getItem("usuario"));
@@ -140,19 +218,25 @@ async function finalizarVenda() {
         itens: itens
     };
 
+    // Mesma chave se o envio for repetido (clique duplo, rede caiu): a
+    // venda não é registrada duas vezes
+    chaveVenda = chaveVenda || novaChave();
+
     const resp = await fetch(`${API}/vendas`, {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers: authHeaders({ "Content-Type": "application/json", "Idempotency-Key": chaveVenda }),
         body: JSON.stringify(payload)
     });
 
     const data = await resp.json();
 
     if (resp.ok) {
-        alert("Venda registrada com sucesso!");
+        alert(resp.status === 202 ? "Venda recebida! Será registrada em instantes." : "Venda registrada com sucesso!");
+        chaveVenda = null;
         itens = [];
         renderTabela();
     } else {
-        alert("Erro ao registrar venda: " + (data.detail || "desconhecido"));
+        chaveVenda = null;
+        alert("Erro ao registrar venda: " + (data.detail?.mensagem || data.detail || "desconhecido"));
     }
 }